@@ -6,6 +6,7 @@ from .models import User, Profile
 @admin.register(User)
 class CustomUserAdmin(BaseUserAdmin):
     list_display = ('phone_number', 'role', 'is_active', 'profile_completed')
+    list_select_related = ('student_profile',)
     ordering = ('phone_number',)
     search_fields = ('phone_number', 'email', 'role')
 
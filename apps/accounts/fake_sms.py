@@ -0,0 +1,81 @@
+"""
+A local stand-in for Kavenegar's verify/lookup API, for tests and
+benchmarks: point settings.SMS_API_BASE_URL at `FakeSMSServer.url`.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeSMSServer:
+    """
+    Answers GET /v1/<api key>/verify/lookup.json after `latency` seconds,
+    with a 503 for a `fail_rate` share of the requests. The received
+    messages are kept in `messages`.
+    """
+
+    def __init__(self, latency=0.0, fail_rate=0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.messages = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f'http://{host}:{port}'
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                url = urlparse(self.path)
+                if not url.path.endswith('/verify/lookup.json'):
+                    return self._reply(404, {'return': {'status': 404, 'message': 'not found'}})
+                if random.random() < server.fail_rate:
+                    return self._reply(503, {'return': {'status': 503, 'message': 'unavailable'}})
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                with server._lock:
+                    server.messages.append(params)
+                self._reply(200, {
+                    'return': {'status': 200, 'message': 'تایید شد'},
+                    'entries': [{'receptor': params.get('receptor'), 'status': 5}],
+                })
+
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,95 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from apps.accounts.models import RoleTextChoices, User
+from apps.accounts.otp import create_token_for_user
+from utils.auth import CustomRefreshToken, StatelessJWTAuthentication, verified_tokens
+from utils.permissions import IsStudentPermission
+
+
+class RollbackBenchmark(Exception):
+    """Raised to discard the synthetic user created for a benchmark run."""
+
+
+def legacy_has_permission(request, allowed_roles):
+    """
+    The previous RoleBasedPermission: the token is decoded a second time
+    and the role checked against both the claim and the fetched user.
+    """
+    token = request.headers.get("Authorization", "").split(" ")[1]
+    payload = CustomRefreshToken.decode_token(token)
+    return payload.get("role") in allowed_roles and request.user.role in allowed_roles
+
+
+class Command(BaseCommand):
+    help = (
+        "Microbenchmark of the authentication + role permission overhead of "
+        "one request: simplejwt's JWTAuthentication with the previous "
+        "permission check against StatelessJWTAuthentication, with a cold "
+        "and a warm verified-token cache."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=2000,
+            help='Authenticated requests per variant'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self._run(options['requests'])
+                raise RollbackBenchmark
+        except RollbackBenchmark:
+            pass
+        finally:
+            verified_tokens.clear()
+
+    def _measure(self, label, authenticate, requests):
+        factory = RequestFactory()
+        samples = []
+        with CaptureQueriesContext(connection) as captured:
+            for _ in range(requests):
+                request = factory.get('/', HTTP_AUTHORIZATION=self.header)
+                start = time.perf_counter()
+                authenticate(request)
+                samples.append((time.perf_counter() - start) * 1_000_000)
+        samples.sort()
+        self.stdout.write(
+            f'{label:<32} mean={statistics.fmean(samples):8.1f}us '
+            f'p50={samples[len(samples) // 2]:8.1f}us '
+            f'p99={samples[min(len(samples) - 1, int(len(samples) * 0.99))]:8.1f}us '
+            f'queries/request={len(captured) / requests:.2f}'
+        )
+
+    def _run(self, requests):
+        user = User.objects.create(phone_number='09000000000', role=RoleTextChoices.STUDENT, is_active=True)
+        self.header = 'Bearer ' + create_token_for_user(user)['access']
+        permission = IsStudentPermission()
+        legacy = JWTAuthentication()
+        stateless = StatelessJWTAuthentication()
+
+        def legacy_request(request):
+            request.user, request.auth = legacy.authenticate(request)
+            assert legacy_has_permission(request, permission.allowed_roles)
+
+        def stateless_request(request):
+            request.user, request.auth = stateless.authenticate(request)
+            assert permission.has_permission(request, None)
+
+        def cold_stateless_request(request):
+            verified_tokens.clear()
+            stateless_request(request)
+
+        self._measure('JWTAuthentication + decode', legacy_request, requests)
+        self._measure('stateless, cold token cache', cold_stateless_request, requests)
+        verified_tokens.clear()
+        self._measure('stateless, warm token cache', stateless_request, requests)
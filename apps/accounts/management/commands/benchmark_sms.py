@@ -0,0 +1,81 @@
+import time
+
+import httpx
+from django.core.management.base import BaseCommand
+
+from apps.accounts.fake_sms import FakeSMSServer
+from apps.accounts.sms import KavenegarProvider, SMSMessage, deliver_messages
+from apps.journies.management.commands.benchmark_question_sampler import timed
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark SMS sending against a local fake provider: a new "
+        "connection per message (the previous httpx.get) against the pooled "
+        "client, and the retry of temporarily failed messages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=200,
+            help='Messages per variant'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.05,
+            help='Seconds the fake provider takes to answer'
+        )
+        parser.add_argument(
+            '--fail-rate',
+            type=float,
+            default=0.2,
+            help='Share of the requests the fake provider answers with 503 in the retry run'
+        )
+
+    def handle(self, *args, **options):
+        messages = [
+            SMSMessage(receptor=f'0912{i:07d}', template='otp', token=str(10000 + i))
+            for i in range(options['messages'])
+        ]
+        with FakeSMSServer(latency=options['latency']) as server:
+            url = f'{server.url}/v1/key/verify/lookup.json'
+            legacy_messages = iter(messages)
+            legacy = timed(
+                lambda: httpx.get(url, params=next(legacy_messages).to_dict()).raise_for_status(),
+                len(messages)
+            )
+            legacy_connections, server.connections = server.connections, 0
+
+            provider = KavenegarProvider(api_key='key', base_url=server.url)
+            pooled_messages = iter(messages)
+            pooled = timed(lambda: provider.send(next(pooled_messages)), len(messages))
+            provider.close()
+            self.stdout.write(self.style.SUCCESS(
+                f'[latency {options["latency"] * 1000:.0f}ms] '
+                f'httpx.get mean={legacy["mean"]:.2f}ms p99={legacy["p99"]:.2f}ms '
+                f'({legacy_connections} connections) | '
+                f'pooled mean={pooled["mean"]:.2f}ms p99={pooled["p99"]:.2f}ms '
+                f'({server.connections} connections)'
+            ))
+
+        with FakeSMSServer(latency=options['latency'], fail_rate=options['fail_rate']) as server:
+            from apps.accounts import sms
+
+            sms._provider = KavenegarProvider(api_key='key', base_url=server.url)
+            try:
+                start = time.perf_counter()
+                pending, attempts = messages, 0
+                while pending and attempts < 10:
+                    pending = deliver_messages(pending)
+                    attempts += 1
+                elapsed = time.perf_counter() - start
+            finally:
+                sms.reset_sms_provider()
+            delivered = {message['receptor'] for message in server.messages}
+            self.stdout.write(self.style.SUCCESS(
+                f'[fail rate {options["fail_rate"]:.0%}] {len(delivered)}/{len(messages)} delivered '
+                f'after {attempts} attempts in {elapsed:.2f}s (without backoff)'
+            ))
@@ -1,10 +1,10 @@
 import random
 import re
+from dataclasses import asdict
 from typing import Optional
 
 from django.utils import timezone
 from django.conf import settings
-from django.core.cache import cache
 from datetime import datetime
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -34,11 +34,15 @@ from apps.accounts.data_class_objects import (
     RequestOtpStructureDTO
 )
 from utils.auth import CustomRefreshToken
+from utils.cache import JSON_CODEC, CacheNamespace
 from rest_framework_simplejwt.token_blacklist.models import (
     BlacklistedToken,
     OutstandingToken,
 )
 
+# OTPs are shared by every worker and stored as JSON, not pickles.
+otp_cache = CacheNamespace("otp", codec=JSON_CODEC)
+
 
 def validate_phone_number_format(phone_number: str) -> None:
     rule = re.compile(r"^((\+98|0|0098)9\d{9})$")
@@ -74,23 +78,31 @@ def make_otp_output_structure(
     )
 
 
+def get_otp_from_cache(key, _cache) -> Optional[OtpStructureDTO]:
+    data = _cache.get(key)
+    return OtpStructureDTO(**data) if data else None
+
+
 def set_otp_in_cache(key, otp, expiry_time, _cache) -> RequestOtpStructureDTO:
-    if _cache.get(key):
-        return make_otp_output_structure(
-            otp_structure_dto=_cache.get(key),
-            is_send_before=True,
-            expiry_time=expiry_time,
-        )
-    else:
-        otp_structure_dto = OtpStructureDTO(
-            otp=otp, created_time=convert_datetime_into_str(datetime.now())
-        )
-        _cache.set(key, otp_structure_dto, expiry_time)
-        return make_otp_output_structure(
-            otp_structure_dto=otp_structure_dto,
-            is_send_before=False,
-            expiry_time=expiry_time,
-        )
+    otp_structure_dto = OtpStructureDTO(
+        otp=otp, created_time=convert_datetime_into_str(datetime.now())
+    )
+    # add() is atomic, so concurrent requests on different workers send one OTP.
+    if not _cache.add(key, asdict(otp_structure_dto), expiry_time):
+        sent_otp_structure_dto = get_otp_from_cache(key, _cache)
+        if sent_otp_structure_dto:
+            return make_otp_output_structure(
+                otp_structure_dto=sent_otp_structure_dto,
+                is_send_before=True,
+                expiry_time=expiry_time,
+            )
+        # expired in between
+        _cache.set(key, asdict(otp_structure_dto), expiry_time)
+    return make_otp_output_structure(
+        otp_structure_dto=otp_structure_dto,
+        is_send_before=False,
+        expiry_time=expiry_time,
+    )
 
 
 def send_otp_by_sms(receiver_number, otp_code) -> None:
@@ -99,7 +111,7 @@ def send_otp_by_sms(receiver_number, otp_code) -> None:
 
 
 def confirm_otp(key: str, otp: str, _cache) -> None:
-    otp_structure_dto: OtpStructureDTO = _cache.get(key)
+    otp_structure_dto = get_otp_from_cache(key, _cache)
 
     if not otp_structure_dto:
         raise CustomNotFoundError(
@@ -120,28 +132,16 @@ def generate_otp_to_login_or_signup_and_send_to_user(
     otp = 11111 if settings.DEBUG else generate_otp()
     # otp = generate_otp()
 
-
-    # TODO: This cache is not cross-process, so you will need to reconfigure it later.
     request_otp_structure_dto = set_otp_in_cache(
         key=unify_phone_number(phone_number),
         otp=otp,
         expiry_time=EXPIRE_TIME,
-        _cache=cache,
+        _cache=otp_cache,
     )
     if not request_otp_structure_dto.is_send_before:
-        # send_sms(phone_number, otp)
+        # queued on the "sms" Celery queue, the request does not wait for the provider
         if not settings.DEBUG:
             send_sms(phone_number, otp)
-        # send_otp_by_sms(
-        #     receiver_number=phone_number,
-        #     otp_code=otp,
-        # )
-
-        # Send sms to celery
-        # if not settings.DEBUG:
-        #     send_sms_task.delay(
-        #         phone_number, settings.SMS_TEMPLATE_CODES["OTP"], {"otp": otp}
-        #     )
     return request_otp_structure_dto
 
 
@@ -0,0 +1,39 @@
+"""
+Cached dashboard profile of a user (UserProfileView).
+
+The rendered JSON body of UserProfileSerializer is kept per user in the
+shared cache, so a warm dashboard load runs no query at all. Every write
+to the user or its Profile drops the entry once the transaction commits
+(see apps.accounts.signals), and the next load renders it again with a
+single query.
+"""
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from apps.accounts.models import User
+from utils.cache import CacheNamespace
+
+PROFILE_CACHE_TIMEOUT = 60 * 60 * 24
+
+profile_cache = CacheNamespace('user_profile', timeout=PROFILE_CACHE_TIMEOUT)
+
+
+def get_profile_json(user_id):
+    """
+    Return the UserProfileSerializer body of the user as JSON bytes, None
+    when the user does not exist.
+    """
+    from apps.accounts.serializers.user import UserProfileSerializer
+
+    content = profile_cache.get(user_id)
+    if content is None:
+        user = User.objects.select_related('student_profile').filter(pk=user_id).first()
+        if user is None:
+            return None
+        content = JSONRenderer().render(UserProfileSerializer(user).data)
+        profile_cache.set(user_id, content)
+    return content
+
+
+def invalidate_user_profile(user_id):
+    transaction.on_commit(lambda: profile_cache.delete(user_id))
@@ -1,7 +1,6 @@
 from typing import Dict
 from rest_framework import serializers, status
 from django.db import transaction
-from django.core.cache import cache
 
 from apps.accounts.models import (
     User,
@@ -11,7 +10,9 @@ from apps.accounts.models import (
 
 from apps.accounts.otp import (
     confirm_otp,
-    delete_otp_from_cache
+    delete_otp_from_cache,
+    otp_cache,
+    unify_phone_number,
 )
 from apps.accounts.general_validators import validate_phone_number_format
 
@@ -46,8 +47,9 @@ class InputOtpLoginOrSignupSerializer(serializers.Serializer):
         phone_number = data["phone_number"]
         otp = data["otp"]
 
-        confirm_otp(key=phone_number, otp=otp, _cache=cache)
-        delete_otp_from_cache(phone_number, _cache=cache)
+        key = unify_phone_number(phone_number)
+        confirm_otp(key=key, otp=otp, _cache=otp_cache)
+        delete_otp_from_cache(key, _cache=otp_cache)
 
         try:
             user = User.objects.get(phone_number=phone_number)
@@ -257,9 +259,8 @@ class ProfileSaveSerializer(serializers.Serializer):
         # Remove phone_number from validated_data because Profile doesn't have this field.
         validated_data.pop('phone_number', None)
         # Update or create the profile associated with this user.
+        # profile_completed is derived from the profile fields
         profile, created = Profile.objects.update_or_create(user=user, defaults=validated_data)
-        user.profile_completed = True
-        user.save()
         return profile
 
     def update(self, instance, validated_data):
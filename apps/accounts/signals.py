@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Profile, User
+from .profile_cache import invalidate_user_profile
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_profile_on_user_change(sender, instance, **kwargs):
+    invalidate_user_profile(instance.pk)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_profile_on_profile_change(sender, instance, **kwargs):
+    invalidate_user_profile(instance.user_id)
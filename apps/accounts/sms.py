@@ -1,50 +1,181 @@
-from typing import Dict, Optional, Any
+"""
+SMS delivery.
+
+Messages are sent by the `send_sms_messages` Celery task (apps.accounts.tasks),
+never in the request: the OTP view only queues the message. The task hands
+them to the provider configured by settings.SMS_PROVIDER, a dotted path to an
+SMSProvider subclass, built once per process so its HTTP client (and the
+keep-alive connections to the provider) is reused by every message.
+
+A provider reports a message it may deliver later (network errors, timeouts,
+429 and 5xx responses) with SMSTemporaryError, which the task retries with
+exponential backoff; any other SMSError is permanent and only logged.
+"""
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
 import httpx
 from django.conf import settings
+from django.utils.module_loading import import_string
+
 from utils.logger import CustomLogger
 
 
 logger = CustomLogger(__name__).get_logger()
 
-class SMS:
-    def __init__(self, api_key: str, template: str):
-        self.api_key = api_key
-        self.url = f"https://api.kavenegar.com/v1/{self.api_key}/verify/lookup.json"
-        self.template = template
 
-    def send(self, phone_number: str, token: int) -> Optional[
-        Dict[str, Any]]:
+@dataclass
+class SMSMessage:
+    receptor: str
+    template: str
+    token: str
+
+    def to_dict(self) -> Dict[str, str]:
+        return asdict(self)
+
+
+class SMSError(Exception):
+    """The provider rejected the message; sending it again will not help."""
+
+
+class SMSTemporaryError(SMSError):
+    """The message may be delivered by a later attempt."""
 
-        """Send SMS to phone number."""
-        params = {
-            "receptor": phone_number,
-            "template": self.template,
-            "token": str(token)
-        }
 
-        logger.info(f"Sending SMS with params: {params}")
+class SMSProvider(ABC):
+    """
+    Interface of the SMS providers.
+    """
 
+    @abstractmethod
+    def send(self, message: SMSMessage) -> Optional[Dict[str, Any]]:
+        """
+        Deliver one message, returning the provider's response. Raises
+        SMSTemporaryError or SMSError when it is not delivered.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class KavenegarProvider(SMSProvider):
+    """
+    Kavenegar's verify/lookup API over one pooled httpx.Client. The base URL
+    comes from settings.SMS_API_BASE_URL, so a local fake server can stand
+    in for the provider.
+    """
+
+    def __init__(self, api_key: str = None, base_url: str = None):
+        self.api_key = api_key or settings.SMS_API_KEY
+        self.base_url = (base_url or settings.SMS_API_BASE_URL).rstrip("/")
+        self.client = httpx.Client(
+            base_url=f"{self.base_url}/v1/{self.api_key}/",
+            timeout=httpx.Timeout(
+                settings.SMS_HTTP_TIMEOUT,
+                connect=settings.SMS_HTTP_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.SMS_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SMS_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.SMS_HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    def send(self, message: SMSMessage) -> Optional[Dict[str, Any]]:
         try:
-            # Send GET request with query parameters
-            response = httpx.get(self.url, params=params)
-            response.raise_for_status()  # Raise an error for 4xx/5xx responses
-            return response.json()
+            response = self.client.get("verify/lookup.json", params=message.to_dict())
         except httpx.RequestError as error:
-            logger.error(f"Request error occurred for phone {phone_number}: {error}")
-        except httpx.HTTPStatusError as error:
-            logger.error(f"HTTP error occurred for phone {phone_number}: {error}")
-        except Exception as error:
-            logger.error(f"Unexpected error: {error}")
+            raise SMSTemporaryError(f"Request error: {error!r}") from error
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise SMSTemporaryError(f"HTTP {response.status_code}: {response.text[:200]}")
+        if response.is_error:
+            raise SMSError(f"HTTP {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    def close(self) -> None:
+        self.client.close()
 
-        return None
+
+class ConsoleProvider(SMSProvider):
+    """
+    Logs the messages instead of sending them, for local development.
+    """
+
+    def send(self, message: SMSMessage) -> Optional[Dict[str, Any]]:
+        logger.info(f"SMS to {message.receptor} ({message.template}): {message.token}")
+        return {"return": {"status": 200, "message": "logged"}}
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_sms_provider() -> SMSProvider:
+    """
+    The process-wide provider of settings.SMS_PROVIDER, built on first use
+    (after the Celery worker forked, so no connection is shared between
+    processes).
+    """
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = import_string(settings.SMS_PROVIDER)()
+    return _provider
+
+
+def reset_sms_provider() -> None:
+    """
+    Close the provider's connections; the next message builds it again.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is not None:
+            _provider.close()
+        _provider = None
+
+
+def deliver_messages(messages: List[SMSMessage]) -> List[SMSMessage]:
+    """
+    Send `messages` one after the other over the provider's pooled
+    connection and return those that failed temporarily.
+    """
+    provider = get_sms_provider()
+    failed = []
+    for message in messages:
+        try:
+            response = provider.send(message)
+        except SMSTemporaryError as error:
+            logger.warning(f"SMS to {message.receptor} failed, will retry: {error}")
+            failed.append(message)
+        except SMSError as error:
+            logger.error(f"SMS to {message.receptor} rejected with template {message.template}: {error}")
+        else:
+            logger.info(f"SMS sent to {message.receptor} with template {message.template}: {response}")
+    return failed
+
+
+def queue_sms(messages: List[SMSMessage]) -> None:
+    """
+    Queue `messages` for delivery, settings.SMS_BATCH_SIZE per task.
+    """
+    from apps.accounts.tasks import send_sms_messages
+
+    for start in range(0, len(messages), settings.SMS_BATCH_SIZE):
+        batch = messages[start:start + settings.SMS_BATCH_SIZE]
+        try:
+            send_sms_messages.delay([message.to_dict() for message in batch])
+        except Exception as error:
+            receptors = ", ".join(message.receptor for message in batch)
+            logger.error(f"Failed to queue SMS to {receptors}: {error!r}")
 
 
-def send_sms(receiver: str, token: str):
-    template_id = settings.OTP_TEMPLATE
-    api_key = settings.SMS_API_KEY
-    sms = SMS(api_key, template_id)
-    response = sms.send(receiver, token)
-    if response:
-        logger.info(f"SMS sent to {receiver} with template {template_id}: {response}")
-    else:
-        logger.error(f"Failed to send SMS to {receiver} with template {template_id}")
+def send_sms(receiver: str, token: str) -> None:
+    """
+    Queue the OTP `token` for `receiver`; the request does not wait for the
+    provider.
+    """
+    queue_sms([SMSMessage(receptor=receiver, template=settings.OTP_TEMPLATE, token=str(token))])
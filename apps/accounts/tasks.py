@@ -0,0 +1,31 @@
+import random
+
+from celery import shared_task
+from django.conf import settings
+
+from apps.accounts.sms import SMSMessage, deliver_messages
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__).get_logger()
+
+
+@shared_task(bind=True, ignore_result=True)
+def send_sms_messages(self, messages):
+    """
+    Send a batch of SMS messages (SMSMessage dicts). The messages that failed
+    temporarily are retried together, with exponential backoff and jitter,
+    at most settings.SMS_MAX_RETRIES times.
+    """
+    failed = deliver_messages([SMSMessage(**message) for message in messages])
+    if not failed:
+        return
+    if self.request.retries >= settings.SMS_MAX_RETRIES:
+        receptors = ", ".join(message.receptor for message in failed)
+        logger.error(f"send_sms_messages gave up on {receptors}")
+        return
+    backoff = min(settings.SMS_RETRY_BACKOFF * 2 ** self.request.retries, settings.SMS_RETRY_BACKOFF_MAX)
+    raise self.retry(
+        args=[[message.to_dict() for message in failed]],
+        countdown=random.uniform(backoff / 2, backoff),
+        max_retries=settings.SMS_MAX_RETRIES,
+    )
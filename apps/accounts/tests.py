@@ -1,3 +1,198 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.accounts.models import User, RoleTextChoices
+from apps.accounts.otp import create_token_for_user
+from utils.auth import StatelessJWTAuthentication, VerifiedTokenCache, verified_tokens
+from utils.throttling import local_buckets, throttle_cache, _shared_wait, _window_keys, hit
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+NOW = 300 * 100000.0  # the start of a 300 and of a 600 second window
+TEST_THROTTLE_RULES = {
+    'otp-request-phone': (3, 600),
+    'otp-request-ip': (5, 600),
+    'otp-verify-phone': (5, 300),
+    'otp-verify-ip': (60, 600),
+}
+
+
+# setUp clears the cache, which must never be the shared Redis
+@override_settings(CACHES=LOCMEM_CACHES, THROTTLE_RULES=TEST_THROTTLE_RULES)
+@mock.patch('apps.accounts.otp.send_sms')
+@mock.patch('utils.throttling.time')
+class OtpRequestThrottleTests(TestCase):
+    """
+    The OTP request endpoint rejects a phone number or an IP over its rule
+    with a 429 and a Retry-After, before any database work.
+    """
+
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+        self.client = APIClient()
+
+    def request_otp(self, phone_number):
+        return self.client.post(reverse('otp_request_login'), {'phone_number': phone_number}, format='json')
+
+    def ip_hits(self):
+        current_key, _, _ = _window_keys('otp-request-ip', '127.0.0.1', 600, NOW)
+        return throttle_cache.get(current_key)
+
+    def test_phone_rule_rejects_with_retry_after(self, mocked_time, send_sms):
+        mocked_time.time.return_value = NOW
+        statuses = [self.request_otp('09121111111').status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        response = self.request_otp('09121111111')
+        self.assertEqual(response.status_code, 429)
+        # the current window becomes the previous one and decays to 2 hits
+        self.assertEqual(response['Retry-After'], '800')
+        self.assertEqual(send_sms.call_count, 1)
+
+    def test_ip_rule_rejects_with_retry_after(self, mocked_time, send_sms):
+        mocked_time.time.return_value = NOW
+        statuses = [self.request_otp(f'0912000000{index}').status_code for index in range(6)]
+
+        self.assertEqual(statuses, [200] * 5 + [429])
+        self.assertEqual(self.request_otp('09120000009')['Retry-After'], '720')
+
+    def test_phone_rejection_refunds_the_ip_hit(self, mocked_time, send_sms):
+        mocked_time.time.return_value = NOW
+        for _ in range(3):
+            self.request_otp('09122222222')
+        self.assertEqual(self.ip_hits(), 3)
+
+        self.assertEqual(self.request_otp('09122222222').status_code, 429)
+        self.assertEqual(self.request_otp('09122222222').status_code, 429)
+        self.assertEqual(self.ip_hits(), 3)
+        # the refunded hits leave the IP its quota for other numbers
+        self.assertEqual(self.request_otp('09123333333').status_code, 200)
+        self.assertEqual(self.request_otp('09124444444').status_code, 200)
+        self.assertEqual(self.request_otp('09125555555').status_code, 429)
+
+    def test_malformed_phone_number_is_left_to_the_serializer(self, mocked_time, send_sms):
+        mocked_time.time.return_value = NOW
+        statuses = [self.request_otp('12345').status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [400] * 4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SlidingWindowTests(SimpleTestCase):
+    """
+    Waits of a rule of 5 hits per 300 seconds.
+    """
+
+    def setUp(self):
+        cache.clear()
+        local_buckets.clear()
+
+    def test_shared_wait(self):
+        # room left in the current window
+        self.assertEqual(_shared_wait(0, 4, 10, 5, 300), 0)
+        # the full current window has to decay as the previous one
+        self.assertEqual(_shared_wait(0, 5, 10, 5, 300), 350)
+        # 8 previous hits decay to 2 once 225 seconds of the window elapsed
+        self.assertEqual(_shared_wait(8, 2, 60, 5, 300), 165)
+        self.assertEqual(_shared_wait(8, 2, 225, 5, 300), 0)
+
+    def test_hit(self):
+        waits = [hit('test', 'key', 5, 300, NOW + second) for second in range(5)]
+        self.assertEqual(waits, [0] * 5)
+
+        self.assertEqual(hit('test', 'key', 5, 300, NOW + 10), 350)
+        # remembered locally until the window frees up
+        self.assertEqual(hit('test', 'key', 5, 300, NOW + 11), 349)
+        self.assertEqual(hit('test', 'key', 5, 300, NOW + 360), 0)
+        # the previous window's 5 hits decay to 3 at NOW + 420
+        self.assertEqual(hit('test', 'key', 5, 300, NOW + 361), 59)
+
+
+class StatelessJWTAuthenticationTests(TestCase):
+    """
+    request.user is built from the token's claims, without a query.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(
+            phone_number='09120000003', role=RoleTextChoices.STUDENT, is_active=True
+        )
+
+    def setUp(self):
+        verified_tokens.clear()
+
+    def authenticate(self, raw_token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {raw_token}')
+        return StatelessJWTAuthentication().authenticate(request)
+
+    def test_user_is_built_from_the_claims(self):
+        raw_token = create_token_for_user(self.student)['access']
+
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate(raw_token)
+
+        self.assertEqual(user, self.student)
+        self.assertEqual(user.role, RoleTextChoices.STUDENT)
+        self.assertEqual(user.phone_number, '09120000003')
+        # the other fields are deferred
+        with self.assertNumQueries(1):
+            self.assertTrue(user.is_active)
+
+    def test_token_without_claims_loads_the_user(self):
+        raw_token = str(AccessToken.for_user(self.student))
+
+        with self.assertNumQueries(1):
+            user, _ = self.authenticate(raw_token)
+
+        self.assertEqual(user, self.student)
+        self.assertEqual(user.role, RoleTextChoices.STUDENT)
+
+    def test_verified_token_is_reused(self):
+        raw_token = create_token_for_user(self.student)['access']
+        self.authenticate(raw_token)
+
+        with mock.patch('rest_framework_simplejwt.authentication.JWTAuthentication.get_validated_token') as verify:
+            user, _ = self.authenticate(raw_token)
+
+        verify.assert_not_called()
+        self.assertEqual(user, self.student)
+
+
+@mock.patch('utils.auth.time')
+class VerifiedTokenCacheTests(SimpleTestCase):
+
+    def test_entry_expires_with_the_token(self, mocked_time):
+        tokens = VerifiedTokenCache(maxsize=10, ttl=60)
+        mocked_time.time.return_value = NOW
+        tokens.set('raw', {'exp': NOW + 30})
+        self.assertEqual(tokens.get('raw'), {'exp': NOW + 30})
+
+        mocked_time.time.return_value = NOW + 30
+        self.assertIsNone(tokens.get('raw'))
+        self.assertNotIn('raw', tokens._entries)
+
+    def test_entry_expires_after_the_ttl(self, mocked_time):
+        tokens = VerifiedTokenCache(maxsize=10, ttl=60)
+        mocked_time.time.return_value = NOW
+        tokens.set('raw', {'exp': NOW + 3600})
+
+        mocked_time.time.return_value = NOW + 60
+        self.assertIsNone(tokens.get('raw'))
+        self.assertNotIn('raw', tokens._entries)
+
+    def test_least_recently_used_entry_is_evicted(self, mocked_time):
+        tokens = VerifiedTokenCache(maxsize=2, ttl=60)
+        mocked_time.time.return_value = NOW
+        for raw in ('first', 'second'):
+            tokens.set(raw, {'exp': NOW + 3600})
+        tokens.get('first')
+        tokens.set('third', {'exp': NOW + 3600})
+
+        self.assertIsNone(tokens.get('second'))
+        self.assertIsNotNone(tokens.get('first'))
+        self.assertIsNotNone(tokens.get('third'))
@@ -0,0 +1,35 @@
+import re
+
+from apps.accounts.otp import unify_phone_number
+from utils.throttling import CacheRateThrottle
+
+PHONE_NUMBER_RULE = re.compile(r"^((\+98|0|0098)9\d{9})$")
+
+
+class PhoneNumberRateThrottle(CacheRateThrottle):
+    """
+    Throttles by the phone number of the request body. Malformed numbers
+    are left to the serializer, which rejects them without any database work.
+    """
+
+    def get_ident(self, request):
+        phone_number = request.data.get("phone_number")
+        if not isinstance(phone_number, str) or not PHONE_NUMBER_RULE.search(phone_number):
+            return None
+        return unify_phone_number(phone_number)
+
+
+class OtpRequestIPThrottle(CacheRateThrottle):
+    scope = "otp-request-ip"
+
+
+class OtpRequestPhoneThrottle(PhoneNumberRateThrottle):
+    scope = "otp-request-phone"
+
+
+class OtpVerifyIPThrottle(CacheRateThrottle):
+    scope = "otp-verify-ip"
+
+
+class OtpVerifyPhoneThrottle(PhoneNumberRateThrottle):
+    scope = "otp-verify-phone"
@@ -4,6 +4,7 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
 )
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
@@ -19,6 +20,13 @@ from apps.accounts.otp import (
 )
 from apps.accounts.serializers.user import *
 from apps.accounts.models import User
+from apps.accounts.profile_cache import get_profile_json
+from apps.accounts.throttles import (
+    OtpRequestIPThrottle,
+    OtpRequestPhoneThrottle,
+    OtpVerifyIPThrottle,
+    OtpVerifyPhoneThrottle,
+)
 from apps.accounts.data_class_objects import (
     OutputRequestOtpSerializer,
     MessageOutputSerializer
@@ -32,6 +40,8 @@ from utils.permissions import *
 
 
 class OtpRequestLoginOrSignupView(APIView):
+    throttle_classes = [OtpRequestIPThrottle, OtpRequestPhoneThrottle]
+
     @extend_schema(
         summary="Request OTP code to login/signup",
         tags=["Otp"],
@@ -39,6 +49,7 @@ class OtpRequestLoginOrSignupView(APIView):
         responses={
             201: OpenApiResponse(OutputRequestOtpSerializer, description="OTP sent successfully."),
             400: OpenApiResponse(description="Invalid or Bad Request"),
+            429: OpenApiResponse(description="Too many OTP requests for the phone number or IP."),
         },
     )
     def post(self, request):
@@ -65,6 +76,8 @@ class OtpRequestLoginOrSignupView(APIView):
         )
 
 class OtpLoginOrSignupView(APIView):
+    throttle_classes = [OtpVerifyIPThrottle, OtpVerifyPhoneThrottle]
+
     @extend_schema(
         summary="Verify and Signup with OTP code",
         description="""Note: For registration, Frontend must specify the role field. For login,
@@ -77,6 +90,7 @@ class OtpLoginOrSignupView(APIView):
                 description="""User create/retrieve successfully.""",
             ),
             400: OpenApiResponse(description="Invalid or Bad Request"),
+            429: OpenApiResponse(description="Too many verification attempts for the phone number or IP."),
         },
     )
     def post(self, request):
@@ -132,16 +146,15 @@ class UserProfileView(APIView):
         },
     )
     def get(self, request, *args, **kwargs):
-        try:
-            user = User.objects.get(phone_number=request.user.phone_number)
-        except User.DoesNotExist:
+        content = get_profile_json(request.user.pk)
+        if content is None:
             return Response(
                 {'message': 'User not found.'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        serializer = UserProfileSerializer(user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # already rendered by JSONRenderer, the only renderer of the API
+        return HttpResponse(content, content_type='application/json', status=status.HTTP_200_OK)
 
     @extend_schema(
         summary="Creating objectof  Profile ",
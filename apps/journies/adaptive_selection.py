@@ -0,0 +1,331 @@
+"""
+Adaptive question selection for training journeys (selection_mode
+"adaptive").
+
+The active questions are kept per process in difficulty buckets: the
+hardness range [1, 10] is split into BUCKET_COUNT equal buckets (never
+answered questions, hardness 0, sit in the middle one), each a compact
+`array` of question ids, once for the whole bank and once per subject
+(the questions tagged with one of settings.ADAPTIVE_SUBJECT_TAGS[subject]
+or their descendants). The next question is drawn from the bucket matching
+the journey's running accuracy, the better the student the harder the
+question, moving to the neighbouring buckets when it is used up; a draw is
+a few random probes, like the uniform sampler.
+
+The buckets are rebuilt from scratch when the question pool version
+(is_active, see `invalidate_question_pool`) or the index version (tags,
+min_required_age, see `invalidate_adaptive_index`) changes, and updated in
+place when the hardness
+version changes: only the questions whose hardness_updated_at moved since
+the last sync are read and moved between buckets.
+"""
+import random
+import threading
+import time
+from array import array
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.journies.question_sampler import (
+    MAX_REJECTIONS,
+    POOL_MAX_AGE_SECONDS,
+    POOL_VERSION_CACHE_KEY,
+    sampler_cache,
+)
+from apps.questions.models import Question, Tag
+
+BUCKET_COUNT = 10
+UNRATED_BUCKET = BUCKET_COUNT // 2
+NO_BUCKET = 255
+# scope of the whole bank, used for journeys without a (mapped) subject
+ALL_SUBJECTS = ''
+INDEX_VERSION_CACHE_KEY = 'adaptive_version'
+HARDNESS_VERSION_CACHE_KEY = 'hardness_version'
+# hardness updates committed while the last sync was running are re-read
+HARDNESS_SYNC_OVERLAP = timedelta(minutes=5)
+
+
+def hardness_bucket(hardness) -> int:
+    if not hardness:
+        return UNRATED_BUCKET
+    return min(BUCKET_COUNT - 1, max(0, int((hardness - 1) / 9 * BUCKET_COUNT)))
+
+
+def target_bucket(correct, answered) -> int:
+    """
+    Bucket matching a running accuracy of correct / answered, smoothed so
+    a fresh journey starts in the middle.
+    """
+    accuracy = (correct + 1) / (answered + 2)
+    return min(BUCKET_COUNT - 1, int(accuracy * BUCKET_COUNT))
+
+
+def bucket_order(target):
+    """
+    The target bucket, then its neighbours alternating harder and easier.
+    """
+    yield target
+    for distance in range(1, BUCKET_COUNT):
+        if target + distance < BUCKET_COUNT:
+            yield target + distance
+        if target - distance >= 0:
+            yield target - distance
+
+
+class DifficultyIndex:
+    """
+    Difficulty buckets of the active questions, per subject scope.
+    Readers are never locked: updates replace the bucket arrays instead
+    of mutating them.
+    """
+
+    def __init__(self, rows, scopes=None):
+        """
+        `rows` yields (question_id, hardness, min_required_age) of the active
+        questions, `scopes` maps a subject to the set of its question ids.
+        """
+        scopes = scopes or {}
+        self.bucket_of = bytearray()
+        # only the few questions with an age restriction
+        self.min_age = {}
+        self.buckets = {
+            scope: [array('q') for _ in range(BUCKET_COUNT)]
+            for scope in (ALL_SUBJECTS, *scopes)
+        }
+        for question_id, hardness, min_age in rows:
+            bucket = hardness_bucket(hardness)
+            self._set_bucket(question_id, bucket)
+            if min_age:
+                self.min_age[question_id] = min_age
+            self.buckets[ALL_SUBJECTS][bucket].append(question_id)
+            for scope, members in scopes.items():
+                if question_id in members:
+                    self.buckets[scope][bucket].append(question_id)
+
+    def _set_bucket(self, question_id, bucket):
+        if question_id >= len(self.bucket_of):
+            self.bucket_of.extend(b'\xff' * (question_id + 1 - len(self.bucket_of)))
+        self.bucket_of[question_id] = bucket
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets[ALL_SUBJECTS])
+
+    def apply_hardness(self, rows) -> int:
+        """
+        Move the questions of `rows` ((question_id, hardness) pairs) to the
+        bucket of their new hardness. Questions outside the index are
+        ignored. Returns the number of moved questions.
+        """
+        moves = {}
+        sources = set()
+        for question_id, hardness in rows:
+            if question_id >= len(self.bucket_of) or self.bucket_of[question_id] == NO_BUCKET:
+                continue
+            bucket = hardness_bucket(hardness)
+            if bucket != self.bucket_of[question_id]:
+                sources.add(self.bucket_of[question_id])
+                moves[question_id] = bucket
+                self.bucket_of[question_id] = bucket
+        if not moves:
+            return 0
+
+        for scope, buckets in list(self.buckets.items()):
+            updated = list(buckets)
+            arrivals = [array('q') for _ in range(BUCKET_COUNT)]
+            for index in sources:
+                kept = array('q')
+                for question_id in buckets[index]:
+                    new_bucket = moves.get(question_id)
+                    if new_bucket is None or new_bucket == index:
+                        kept.append(question_id)
+                    else:
+                        arrivals[new_bucket].append(question_id)
+                updated[index] = kept
+            for index, arrived in enumerate(arrivals):
+                if arrived:
+                    updated[index] = updated[index] + arrived
+            self.buckets[scope] = updated
+        return len(moves)
+
+    def _allowed(self, question_id, age):
+        min_age = self.min_age.get(question_id)
+        return min_age is None or (age is not None and age >= min_age)
+
+    def _pick(self, bucket, seen, age):
+        size = len(bucket)
+        for _ in range(MAX_REJECTIONS):
+            question_id = bucket[random.randrange(size)]
+            if question_id not in seen and self._allowed(question_id, age):
+                return question_id
+        remaining = [
+            question_id for question_id in bucket
+            if question_id not in seen and self._allowed(question_id, age)
+        ]
+        return random.choice(remaining) if remaining else None
+
+    def draw(self, subject, target, seen=(), age=None):
+        """
+        Pick a question of `subject` the journey has not seen, as close to
+        the `target` bucket as possible. Age-restricted questions are only
+        drawn for users known to be old enough. Returns None when the
+        subject is used up.
+        """
+        buckets = self.buckets.get(subject or ALL_SUBJECTS)
+        if buckets is None or not any(buckets):
+            buckets = self.buckets[ALL_SUBJECTS]
+        for index in bucket_order(target):
+            if buckets[index]:
+                question_id = self._pick(buckets[index], seen, age)
+                if question_id is not None:
+                    return question_id
+        return None
+
+
+def load_subject_scopes() -> dict:
+    """
+    {subject: set of question ids} of settings.ADAPTIVE_SUBJECT_TAGS.
+    """
+    scopes = {}
+    for subject, tag_names in settings.ADAPTIVE_SUBJECT_TAGS.items():
+        tags = Tag.objects.get_queryset_descendants(
+            Tag.objects.filter(name__in=tag_names),
+            include_self=True
+        )
+        scopes[subject] = set(
+            Question.tags.through.objects
+            .filter(tag__in=tags)
+            .values_list('question_id', flat=True)
+            .iterator(chunk_size=10000)
+        )
+    return scopes
+
+
+class AdaptiveQuestionIndex:
+    """
+    Per-process DifficultyIndex, rebuilt lazily like ActiveQuestionPool and
+    updated incrementally on a hardness version change.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._version = None
+        self._hardness_version = None
+        self._synced_at = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _versions(self):
+        versions = sampler_cache.get_many([
+            POOL_VERSION_CACHE_KEY,
+            INDEX_VERSION_CACHE_KEY,
+            HARDNESS_VERSION_CACHE_KEY,
+        ])
+        return (
+            (versions.get(POOL_VERSION_CACHE_KEY), versions.get(INDEX_VERSION_CACHE_KEY)),
+            versions.get(HARDNESS_VERSION_CACHE_KEY),
+        )
+
+    def _is_stale(self, version):
+        return (
+            self._index is None
+            or version != self._version
+            or time.monotonic() - self._loaded_at > POOL_MAX_AGE_SECONDS
+        )
+
+    def get(self) -> DifficultyIndex:
+        version, hardness_version = self._versions()
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    self.rebuild()
+                    self._version = version
+                    self._hardness_version = hardness_version
+        elif hardness_version != self._hardness_version:
+            with self._lock:
+                if hardness_version != self._hardness_version:
+                    self.sync_hardness()
+                    self._hardness_version = hardness_version
+        return self._index
+
+    def rebuild(self):
+        synced_at = timezone.now()
+        rows = (
+            Question.objects
+            .filter(is_active=True)
+            .order_by()
+            .values_list('id', 'hardness', 'min_required_age')
+            .iterator(chunk_size=10000)
+        )
+        self._index = DifficultyIndex(rows, load_subject_scopes())
+        self._synced_at = synced_at
+        self._loaded_at = time.monotonic()
+
+    def sync_hardness(self) -> int:
+        synced_at = timezone.now()
+        rows = (
+            Question.objects
+            .filter(hardness_updated_at__gte=self._synced_at - HARDNESS_SYNC_OVERLAP)
+            .order_by()
+            .values_list('id', 'hardness')
+            .iterator(chunk_size=10000)
+        )
+        moved = self._index.apply_hardness(rows)
+        self._synced_at = synced_at
+        return moved
+
+    def clear(self):
+        with self._lock:
+            self._index = None
+            self._version = None
+            self._hardness_version = None
+            self._synced_at = None
+            self._loaded_at = 0.0
+
+
+adaptive_index = AdaptiveQuestionIndex()
+
+
+def invalidate_adaptive_index():
+    """
+    Bump the shared index version so every process rebuilds its difficulty
+    buckets on the next draw. Called whenever the tags or the age
+    restriction of a question may have changed.
+    """
+    sampler_cache.set(INDEX_VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def invalidate_hardness_buckets():
+    """
+    Bump the shared hardness version so every process moves the questions
+    whose hardness changed on the next draw.
+    """
+    sampler_cache.set(HARDNESS_VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def age_on(birth_day, today):
+    return today.year - birth_day.year - ((today.month, today.day) < (birth_day.month, birth_day.day))
+
+
+def get_user_age(user_id):
+    from apps.accounts.models import Profile
+
+    birth_day = (
+        Profile.objects
+        .filter(user_id=user_id)
+        .values_list('birth_day', flat=True)
+        .first()
+    )
+    return age_on(birth_day, date.today()) if birth_day else None
+
+
+def draw_adaptive_question_id(journey, seen):
+    """
+    Pick the next question of a training journey from the difficulty
+    buckets, by the journey's subject and running accuracy.
+    """
+    index = adaptive_index.get()
+    target = target_bucket(journey.correct_count or 0, journey.answered_count or 0)
+    age = get_user_age(journey.user_id) if index.min_age else None
+    return index.draw(journey.subject, target, seen=seen, age=age)
@@ -0,0 +1,43 @@
+import math
+import time
+
+from django.conf import settings
+from rest_framework import status
+
+from utils.cache import CacheNamespace
+from utils.exceptions import CustomThrottledError
+
+ADMISSION_SLOT_CACHE_KEY = 'journey_template:{template_id}:{second}'
+ADMISSION_SLOT_TIMEOUT = 60
+
+admission_cache = CacheNamespace('admission', timeout=ADMISSION_SLOT_TIMEOUT)
+
+
+def admit_group_exam_start(template_id):
+    """
+    Admission control for group-exam starts.
+
+    Every second of wall-clock time admits GROUP_EXAM_ADMISSION_RATE starts
+    per template. A start takes a ticket from the counter of its arrival
+    second (one atomic cache incr); the first `rate` tickets are admitted.
+    A later ticket is rejected with CustomThrottledError (429) whose
+    Retry-After is the second its position in the queue would be served
+    at, so the retries of a start_datetime spike spread over the following
+    seconds instead of holding workers open.
+    """
+    rate = settings.GROUP_EXAM_ADMISSION_RATE
+    if not rate:
+        return
+
+    now = time.time()
+    second = int(now)
+    ticket = admission_cache.incr(ADMISSION_SLOT_CACHE_KEY.format(template_id=template_id, second=second))
+    if ticket <= rate:
+        return
+
+    error = CustomThrottledError(
+        "ظرفیت شروع آزمون در حال حاضر تکمیل است، لطفا چند ثانیه دیگر تلاش کنید",
+        code=status.HTTP_429_TOO_MANY_REQUESTS
+    )
+    error.wait = math.ceil(second + (ticket - 1) // rate - now)
+    raise error
@@ -1,21 +1,82 @@
+from bisect import bisect_right
+
 import polars as pl
-from django.db import transaction
-from django.db.models import Count, Q
-from apps.journies.models import Journey, JourneyStepTemplate, JourneyStep, UserAnswer, StaticJourneyType
+from django.conf import settings
+from django.db import connection, transaction
+from apps.journies.journey_counters import recount_journeys
+from apps.journies.leaderboard import get_leaderboard, points_of, score_of
+from apps.journies.models import (
+    CheckpointPhase,
+    GroupExamResultCheckpoint,
+    Journey,
+    JourneyStepTemplate,
+    JourneyTemplate,
+    ResultModeChoices,
+    StaticJourneyType,
+)
+
+
+RESULT_ENGINE_SQL = 'sql'
+RESULT_ENGINE_POLARS = 'polars'
+
+# Score and dense rank of every participant, computed from the journeys'
+# answer counters and persisted with one UPDATE ... FROM, so no row ever
+# travels to Python.
+#   score = (correct - wrong/3) / total_questions * 100, rounded to 2 digits
+GROUP_EXAM_RESULT_SQL = """
+WITH scored AS (
+    SELECT journey_id,
+           user_id,
+           ROUND(((correct_count - wrong_count / 3.0) / %(total_questions)s * 100)::numeric, 2) AS score
+    FROM {journey_table}
+    WHERE journey_static_id = %(template_id)s
+      AND journey_type = %(journey_type)s
+),
+participants AS (
+    SELECT COUNT(DISTINCT user_id) AS total FROM scored
+),
+ranked AS (
+    SELECT journey_id,
+           score,
+           DENSE_RANK() OVER (ORDER BY score DESC) AS rank
+    FROM scored
+)
+UPDATE {journey_table} j
+SET score              = r.score,
+    rank               = r.rank,
+    total_participants = p.total
+FROM ranked r, participants p
+WHERE j.journey_id = r.journey_id
+"""
 
-def calculate_group_exam_result(journey_template_id):
+
+def calculate_group_exam_result(journey_template_id, engine=None, mode=None):
     """
     For the given JourneyTemplate (exam):
-     - Count each participant's answers (correct, wrong, unanswered)
+     - Read each participant's answer counters (maintained on submit)
      - Compute score = (correct - wrong/3) / total_questions * 100
      - Assign a dense rank by score (highest first)
-     - Persist all of that back into each Journey row:
-         answered_count, unanswered_count, correct_count,
-         wrong_count, rank, total_participants
+     - Persist score, rank and total_participants into each Journey row
+    `mode` defaults to the template's result_mode: 'chunked' streams the
+    journeys in bounded, checkpointed batches; 'standard' runs `engine`,
+    the set-based SQL engine ('sql') or the Polars fallback ('polars').
+    Without an explicit engine, the live leaderboard is first reconciled
+    with the database and the engine (settings.GROUP_EXAM_RESULT_ENGINE)
+    only runs when they disagree.
     Returns True on success, False on any error.
     """
     print(f'journey_template_id is {journey_template_id}', flush=True )
+    reconcile = engine is None and settings.GROUP_EXAM_RESULT_RECONCILE
+    engine = engine or settings.GROUP_EXAM_RESULT_ENGINE
     try:
+        if mode is None:
+            mode = (
+                JourneyTemplate.objects
+                .filter(pk=journey_template_id)
+                .values_list('result_mode', flat=True)
+                .first()
+            )
+
         # 1) Total number of questions in the exam
         total_questions = JourneyStepTemplate.objects.filter(
             journey_template_id=journey_template_id
@@ -24,160 +85,276 @@ def calculate_group_exam_result(journey_template_id):
         if total_questions == 0:
             return False
 
-        # 2) Fetch all Journeys for this template and annotate raw counts
-        # journeys_qs = (
-        #     Journey.objects
-        #     .filter(journey_static_id=journey_template_id, journey_type=StaticJourneyType.GROUP_EXAM)
-        #     .select_related('user')
-        #     .annotate(
-        #         correct_count = Count('steps', filter=Q(steps__answer_result=UserAnswer.CORRECT)),
-        #         wrong_count   = Count('steps', filter=Q(steps__answer_result=UserAnswer.FALSE)),
-        #         unanswered_count = Count('steps', filter=Q(steps__answer_result=UserAnswer.NOT_SELECTED)),
-        #     )
-        # )
-
-        journeys_qs = (
-            Journey.objects
-                   .filter(
-                       journey_static_id=journey_template_id,
-                       journey_type=StaticJourneyType.GROUP_EXAM,
-                   )
-                   .select_related('user')
-                   .annotate(
-                       annotated_correct   = Count(
-                           'steps',
-                           filter=Q(steps__answer_result=UserAnswer.CORRECT)
-                       ),
-                       annotated_wrong     = Count(
-                           'steps',
-                           filter=Q(steps__answer_result=UserAnswer.FALSE)
-                       ),
-                       annotated_unanswered= Count(
-                           'steps',
-                           filter=Q(steps__answer_result=UserAnswer.NOT_SELECTED)
-                       ),
-                   )
-        )
-        print('journey_qs passed ', flush=True)
-        actual_journeys = list(journeys_qs)
-        total_participants = len(set(j.user_id for j in actual_journeys))
-        # total_participants = journeys_qs.count()
-        # total_participants = (
-        #     journeys_qs
-        #     .values('user_id')
-        #     .distinct()
-        #     .count()
-        # )
-        print(f'total participant is {total_participants}', flush=True )
-        # 3) Build a Polars DataFrame
-        records = []
-        for j in journeys_qs:
-
-            records.append({
-                'journey_id'      : j.journey_id,
-                'correct_count'   : j.annotated_correct,
-                'wrong_count'     : j.annotated_wrong,
-                'unanswered_count': total_questions - (j.annotated_correct + j.annotated_wrong),
-            })
-        print('passed appending wrong right and unanswered', flush=True)
-        print(f'records {records}', flush=True)
-        # df = pl.DataFrame(records)
-        #
-        # # 4) Compute score and dense rank
-        # df = df.with_columns([
-        #     (
-        #         (pl.col('correct_count') - pl.col('wrong_count') / 3.0)
-        #         / total_questions * 100
-        #     ).round(2).alias('score')
-        # ])
-        # df = df.sort('score', reverse=True)
-        # df = df.with_columns(
-        #     pl.col('score')
-        #     .rank(method='dense', reverse=True)
-        #     .cast(pl.UInt32)
-        #     .alias('rank')
-        # )
-        # print(df.head(5), flush=True)
-        #
-        # # 5) Persist back into Journey rows
-        # journeys_to_update = []
-        # # Build a mapping from journey_id -> (score_row, rank, counts)
-        # for row in df.iter_rows(named=True):
-        #     jid = row['journey_id']
-        #     j = Journey.objects.get(journey_id=jid)
-        #     # answered_count = correct + wrong
-        #     answered = row['correct_count'] + row['wrong_count']
-        #
-        #     j.correct_count      = row['correct_count']
-        #     j.wrong_count        = row['wrong_count']
-        #     j.unanswered_count   = total_questions - answered
-        #     j.answered_count     = answered
-        #     j.rank               = int(row['rank'])
-        #     j.score              = row['score']
-        #     j.total_participants = total_participants
-        #     # (If you had a score field on Journey, you'd set j.score = row['score'])
-        #     journeys_to_update.append(j)
-
-        df = pl.DataFrame(records)
-        print(df.head(5), flush=True)
-
-        # 4) Compute score and dense rank
-        df = df.with_columns([
-            (
-                (pl.col('correct_count') - pl.col('wrong_count') / 3.0)
-                / total_questions * 100
-            ).round(2).alias('score')
-        ])
-
-        print(df.head(5), flush=True)
-
-        df = df.sort('score', descending=True)
-        print(df.head(5), flush=True)
-        df = df.with_columns(
-            pl.col('score')
-              .rank(method='dense', descending=True)
-              .cast(pl.UInt32)
-              .alias('rank')
-        )
-        print(df.head(5), flush=True)
-
-        # 5) Persist back into Journey rows
-        journeys_to_update = []
-
-        # Uniform handling for all rows (even if it's just one)
-        for row in df.iter_rows(named=True):
-            jid = row['journey_id']
-            j = Journey.objects.get(journey_id=jid)
-            answered = row['correct_count'] + row['wrong_count']
-
-            j.correct_count      = row['correct_count']
-            j.wrong_count        = row['wrong_count']
-            j.unanswered_count   = total_questions - answered
-            j.answered_count     = answered
-            j.rank               = int(row['rank'])
-            j.score              = row['score']
-            j.total_participants = total_participants
-            journeys_to_update.append(j)
-
-
-        with transaction.atomic():
-            Journey.objects.bulk_update(
-                journeys_to_update,
-                [
-                    'answered_count',
-                    'unanswered_count',
-                    'correct_count',
-                    'wrong_count',
-                    'rank',
-                    'score',
-                    'total_participants'
-                ]
-            )
+        # journeys started before the counters existed are counted once
+        recount_journeys(_exam_journeys(journey_template_id).filter(
+            correct_count__isnull=True
+        ))
 
-        return True
+        if mode == ResultModeChoices.CHUNKED:
+            return _calculate_chunked(journey_template_id, total_questions)
+        if reconcile and _reconcile_with_leaderboard(
+            journey_template_id, total_questions
+        ):
+            return True
+        if engine == RESULT_ENGINE_POLARS:
+            return _calculate_with_polars(journey_template_id, total_questions)
+        return _calculate_with_sql(journey_template_id, total_questions)
 
     except Exception as exc:
         print(f"An error occurred: {exc}", flush=True)
         import traceback
         traceback.print_exc()
         return False
+
+
+def _exam_journeys(journey_template_id):
+    return Journey.objects.filter(
+        journey_static_id=journey_template_id,
+        journey_type=StaticJourneyType.GROUP_EXAM,
+    )
+
+
+def _calculate_with_sql(journey_template_id, total_questions):
+    """
+    Compute and persist the whole result server-side in a single statement.
+    """
+    sql = GROUP_EXAM_RESULT_SQL.format(journey_table=Journey._meta.db_table)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(sql, {
+            'template_id': journey_template_id,
+            'journey_type': StaticJourneyType.GROUP_EXAM,
+            'total_questions': total_questions,
+        })
+        print(f'updated {cursor.rowcount} journeys', flush=True)
+    return True
+
+
+def _reconcile_with_leaderboard(journey_template_id, total_questions):
+    """
+    Persist the result straight from the live leaderboard when it matches
+    the journeys' counters: the same journeys, each with the same
+    correct/wrong counts.
+    Returns False when the leaderboard is missing or has drifted, so the
+    caller recomputes from scratch.
+    """
+    try:
+        standings = get_leaderboard().export(journey_template_id)
+    except Exception as exc:
+        print(f'leaderboard unavailable ({exc!r}), recomputing', flush=True)
+        return False
+    if not standings:
+        return False
+
+    participants = set()
+    journeys = matched = 0
+    for journey_id, user_id, correct, wrong in (
+        _exam_journeys(journey_template_id)
+        .values_list('journey_id', 'user_id', 'correct_count', 'wrong_count')
+        .iterator(chunk_size=settings.GROUP_EXAM_RESULT_CHUNK_SIZE)
+    ):
+        journeys += 1
+        participants.add(user_id)
+        if standings.get(journey_id) == (correct or 0, wrong or 0):
+            matched += 1
+    # every journey matches its standing, and the leaderboard has no other
+    if not matched == journeys == len(standings):
+        print(
+            f'leaderboard drifted: {matched} of {journeys} journeys match, '
+            f'{len(standings)} on the leaderboard, recomputing',
+            flush=True
+        )
+        return False
+
+    distinct_points = sorted({points_of(*counts) for counts in standings.values()})
+    values = []
+    for journey_id, (correct, wrong) in standings.items():
+        points = points_of(correct, wrong)
+        values.append((
+            journey_id,
+            score_of(points, total_questions),
+            len(distinct_points) - bisect_right(distinct_points, points) + 1,
+        ))
+    chunk_size = settings.GROUP_EXAM_RESULT_CHUNK_SIZE
+    with transaction.atomic():
+        for start in range(0, len(values), chunk_size):
+            _persist_chunk(values[start:start + chunk_size], len(participants))
+    print(f'reconciled {len(values)} journeys from the leaderboard', flush=True)
+    return True
+
+
+def _calculate_with_polars(journey_template_id, total_questions):
+    """
+    Fallback engine: score and rank the journeys' counters in Polars,
+    persist with one bulk_update.
+    """
+    # 2) Fetch all Journeys for this template with their answer counters
+    journeys_qs = _exam_journeys(journey_template_id).only(
+        'journey_id', 'user_id', 'correct_count', 'wrong_count'
+    )
+    actual_journeys = {j.journey_id: j for j in journeys_qs}
+    if not actual_journeys:
+        return True
+    total_participants = len(set(j.user_id for j in actual_journeys.values()))
+    print(f'total participant is {total_participants}', flush=True )
+
+    # 3) Build a Polars DataFrame
+    df = pl.DataFrame([
+        {
+            'journey_id'   : j.journey_id,
+            'correct_count': j.correct_count,
+            'wrong_count'  : j.wrong_count,
+        }
+        for j in actual_journeys.values()
+    ])
+
+    # 4) Compute score and dense rank
+    df = df.with_columns([
+        (
+            (pl.col('correct_count') - pl.col('wrong_count') / 3.0)
+            / total_questions * 100
+        ).round(2).alias('score')
+    ])
+    df = df.with_columns(
+        pl.col('score')
+          .rank(method='dense', descending=True)
+          .cast(pl.UInt32)
+          .alias('rank')
+    )
+    print(df.sort('score', descending=True).head(5), flush=True)
+
+    # 5) Persist back into Journey rows (already loaded above)
+    journeys_to_update = []
+    for row in df.iter_rows(named=True):
+        j = actual_journeys[row['journey_id']]
+        j.rank               = int(row['rank'])
+        j.score              = row['score']
+        j.total_participants = total_participants
+        journeys_to_update.append(j)
+
+    with transaction.atomic():
+        Journey.objects.bulk_update(
+            journeys_to_update,
+            ['rank', 'score', 'total_participants'],
+            batch_size=1000
+        )
+
+    return True
+
+
+# Writes one chunk of (journey_id, score, rank) rows; a VALUES join stays
+# linear where bulk_update's CASE WHEN is quadratic.
+GROUP_EXAM_CHUNK_UPDATE_SQL = """
+UPDATE {journey_table} j
+SET score              = v.score,
+    rank               = v.rank,
+    total_participants = %s
+FROM (VALUES {values}) AS v(journey_id, score, rank)
+WHERE j.journey_id = v.journey_id
+"""
+
+
+def _persist_chunk(values, total_participants):
+    sql = GROUP_EXAM_CHUNK_UPDATE_SQL.format(
+        journey_table=Journey._meta.db_table,
+        values=', '.join(['(%s, %s::double precision, %s)'] * len(values)),
+    )
+    params = [total_participants]
+    for row in values:
+        params.extend(row)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def _next_chunk(journey_template_id, after_journey_id, chunk_size):
+    """
+    Keyset-paginate the exam's journeys on journey_id and return
+    [(journey_id, correct, wrong), ...] for the next chunk.
+    """
+    return list(
+        _exam_journeys(journey_template_id)
+        .filter(journey_id__gt=after_journey_id)
+        .order_by('journey_id')
+        .values_list('journey_id', 'correct_count', 'wrong_count')[:chunk_size]
+    )
+
+
+def _calculate_chunked(journey_template_id, total_questions):
+    """
+    Bounded-memory engine for very large exams, in two resumable passes:
+      1) histogram: stream the journeys chunk by chunk and count
+         participants per points value (points = 3 * correct - wrong);
+      2) persist: stream them again, derive each dense rank from the
+         histogram (number of higher distinct scores + 1) and write the
+         chunk with its own short transaction.
+    Progress is stored in GroupExamResultCheckpoint after every chunk.
+    """
+    chunk_size = settings.GROUP_EXAM_RESULT_CHUNK_SIZE
+    checkpoint, created = GroupExamResultCheckpoint.objects.get_or_create(
+        journey_template_id=journey_template_id,
+        defaults={'total_questions': total_questions},
+    )
+    if (
+        checkpoint.phase == CheckpointPhase.DONE
+        or checkpoint.total_questions != total_questions
+    ):
+        # a fresh run, not a resume
+        checkpoint.phase = CheckpointPhase.HISTOGRAM
+        checkpoint.last_journey_id = 0
+        checkpoint.score_histogram = {}
+        checkpoint.total_questions = total_questions
+        checkpoint.total_participants = 0
+        checkpoint.save()
+    elif not created:
+        print(
+            f'resuming {checkpoint.phase} after journey {checkpoint.last_journey_id}',
+            flush=True
+        )
+
+    if checkpoint.phase == CheckpointPhase.HISTOGRAM:
+        histogram = checkpoint.score_histogram
+        while True:
+            rows = _next_chunk(journey_template_id, checkpoint.last_journey_id, chunk_size)
+            if not rows:
+                break
+            for _, correct, wrong in rows:
+                key = str(points_of(correct, wrong))
+                histogram[key] = histogram.get(key, 0) + 1
+            checkpoint.last_journey_id = rows[-1][0]
+            checkpoint.score_histogram = histogram
+            checkpoint.save(update_fields=['last_journey_id', 'score_histogram', 'updated_at'])
+
+        checkpoint.total_participants = (
+            _exam_journeys(journey_template_id)
+            .values('user_id')
+            .distinct()
+            .count()
+        )
+        checkpoint.phase = CheckpointPhase.PERSIST
+        checkpoint.last_journey_id = 0
+        checkpoint.save(update_fields=[
+            'total_participants', 'phase', 'last_journey_id', 'updated_at'
+        ])
+
+    if checkpoint.phase == CheckpointPhase.PERSIST:
+        distinct_points = sorted(int(points) for points in checkpoint.score_histogram)
+        while True:
+            rows = _next_chunk(journey_template_id, checkpoint.last_journey_id, chunk_size)
+            if not rows:
+                break
+            values = []
+            for journey_id, correct, wrong in rows:
+                points = points_of(correct, wrong)
+                values.append((
+                    journey_id,
+                    score_of(points, total_questions),
+                    len(distinct_points) - bisect_right(distinct_points, points) + 1,
+                ))
+            with transaction.atomic():
+                _persist_chunk(values, checkpoint.total_participants)
+                checkpoint.last_journey_id = rows[-1][0]
+                checkpoint.save(update_fields=['last_journey_id', 'updated_at'])
+
+        checkpoint.phase = CheckpointPhase.DONE
+        checkpoint.save(update_fields=['phase', 'updated_at'])
+
+    return True
@@ -0,0 +1,151 @@
+"""
+Denormalized answer counters of a Journey.
+
+answered_count, correct_count, wrong_count and unanswered_count are kept
+up to date on every step creation and answer submission, so reading a
+journey's result never aggregates its steps:
+
+    answered_count   = correct_count + wrong_count
+    unanswered_count = steps - answered_count
+
+Updates are single UPDATE ... SET x = x + delta statements issued in the
+transaction that changes the steps. Journeys created before the counters
+existed have them NULL; they are recounted from their steps on first touch.
+"""
+from django.db.models import Count, F, Q
+
+from apps.journies.models import Journey, UserAnswer
+from apps.journies.user_stats import invalidate_user_stats
+
+COUNTER_FIELDS = (
+    'answered_count',
+    'unanswered_count',
+    'correct_count',
+    'wrong_count',
+)
+# counter field -> annotation recomputed from the steps (with_actual_counts)
+ACTUAL_COUNTS = {
+    'answered_count': 'actual_answered',
+    'unanswered_count': 'actual_unanswered',
+    'correct_count': 'actual_correct',
+    'wrong_count': 'actual_wrong',
+}
+
+
+def initial_counters(step_count=0) -> dict:
+    """
+    Counter values of a new journey with `step_count` unanswered steps,
+    to be passed to Journey(...) / Journey.objects.create(...).
+    """
+    return {
+        'answered_count': 0,
+        'unanswered_count': step_count,
+        'correct_count': 0,
+        'wrong_count': 0,
+    }
+
+
+def answer_delta(old_result, new_result):
+    """
+    (correct_delta, wrong_delta) of an answer_result change.
+    """
+    correct_delta = (new_result == UserAnswer.CORRECT) - (old_result == UserAnswer.CORRECT)
+    wrong_delta = (new_result == UserAnswer.FALSE) - (old_result == UserAnswer.FALSE)
+    return correct_delta, wrong_delta
+
+
+def add_steps(journey, count=1):
+    """
+    Count `count` newly created (unanswered) steps of the journey.
+    """
+    updated = (
+        Journey.objects
+        .filter(pk=journey.pk, unanswered_count__isnull=False)
+        .update(unanswered_count=F('unanswered_count') + count)
+    )
+    if not updated:
+        recount_journeys(Journey.objects.filter(pk=journey.pk))
+    invalidate_user_stats(journey.user_id)
+
+
+def apply_answer_change(journey, old_result, new_result):
+    """
+    Move the journey's counters from `old_result` to `new_result`.
+    Must run in the transaction saving the step, with the step locked.
+    """
+    apply_answer_deltas(journey, *answer_delta(old_result, new_result))
+
+
+def apply_answer_deltas(journey, correct_delta, wrong_delta):
+    """
+    Add the summed deltas of any number of answer changes to the journey's
+    counters, in one UPDATE. Same transaction requirements as
+    apply_answer_change.
+    """
+    if not (correct_delta or wrong_delta):
+        return
+    answered_delta = correct_delta + wrong_delta
+    updated = (
+        Journey.objects
+        .filter(pk=journey.pk, correct_count__isnull=False)
+        .update(
+            correct_count=F('correct_count') + correct_delta,
+            wrong_count=F('wrong_count') + wrong_delta,
+            answered_count=F('answered_count') + answered_delta,
+            unanswered_count=F('unanswered_count') - answered_delta,
+        )
+    )
+    if not updated:
+        recount_journeys(Journey.objects.filter(pk=journey.pk))
+    invalidate_user_stats(journey.user_id)
+
+
+def with_actual_counts(queryset):
+    """
+    Annotate journeys with the counters recomputed from their steps
+    (actual_answered, actual_unanswered, actual_correct, actual_wrong).
+    """
+    return queryset.annotate(
+        actual_steps=Count('steps'),
+        actual_correct=Count('steps', filter=Q(steps__answer_result=UserAnswer.CORRECT)),
+        actual_wrong=Count('steps', filter=Q(steps__answer_result=UserAnswer.FALSE)),
+    ).annotate(
+        actual_answered=F('actual_correct') + F('actual_wrong'),
+        actual_unanswered=F('actual_steps') - F('actual_correct') - F('actual_wrong'),
+    )
+
+
+def find_counter_drift(queryset) -> list:
+    """
+    Return the journeys of `queryset` whose stored counters differ from
+    their steps, annotated as in with_actual_counts.
+    """
+    return [
+        journey
+        for journey in with_actual_counts(queryset).order_by()
+        if any(
+            getattr(journey, field) != getattr(journey, actual)
+            for field, actual in ACTUAL_COUNTS.items()
+        )
+    ]
+
+
+def repair_counters(drifted, batch_size=1000):
+    """
+    Persist the recomputed counters of journeys returned by find_counter_drift.
+    """
+    for journey in drifted:
+        for field, actual in ACTUAL_COUNTS.items():
+            setattr(journey, field, getattr(journey, actual))
+    Journey.objects.bulk_update(drifted, COUNTER_FIELDS, batch_size=batch_size)
+    invalidate_user_stats(*(journey.user_id for journey in drifted))
+
+
+def recount_journeys(queryset) -> int:
+    """
+    Recompute and persist the counters of every journey in `queryset`.
+    Returns the number of journeys that had drifted.
+    """
+    drifted = find_counter_drift(queryset)
+    repair_counters(drifted)
+    return len(drifted)
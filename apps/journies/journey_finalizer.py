@@ -0,0 +1,78 @@
+"""
+Finalization of individual (non group-exam) journeys.
+
+A journey ends either explicitly (FinishJourneyAPIView sets finished_at and
+queues finalize_journey) or silently, when its time_minutes_limit runs out;
+the periodic sweeper closes the latter by setting finished_at to the
+deadline. Finalizing also recounts journeys whose answer counters predate
+their incremental maintenance, so read paths never aggregate steps.
+Group exams are finalized by process_journey_template instead.
+"""
+from datetime import timedelta
+
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.utils import timezone
+
+from apps.journies.journey_counters import recount_journeys
+from apps.journies.models import Journey, StaticJourneyType
+from apps.journies.user_stats import invalidate_user_stats
+
+
+def _deadline():
+    return ExpressionWrapper(
+        F('created_at') + F('time_minutes_limit') * timedelta(minutes=1),
+        output_field=DateTimeField()
+    )
+
+
+def _individual_journeys():
+    return Journey.objects.exclude(journey_type=StaticJourneyType.GROUP_EXAM)
+
+
+def finalize_journey(journey_id) -> bool:
+    """
+    Recount a finished journey whose counters are missing.
+    Returns False if the journey does not exist or is not finished.
+    """
+    journey = (
+        _individual_journeys()
+        .filter(pk=journey_id, finished_at__lte=timezone.now())
+        .only('journey_id', 'answered_count')
+        .first()
+    )
+    if journey is None:
+        return False
+    if journey.answered_count is None:
+        recount_journeys(Journey.objects.filter(pk=journey_id))
+    return True
+
+
+def sweep_expired_journeys(batch_size=1000) -> int:
+    """
+    Close the time-limited journeys whose deadline passed without an
+    explicit finish, and recount finished journeys without counters.
+    Works in batches of `batch_size`; returns the number of closed journeys.
+    """
+    now = timezone.now()
+    expired = (
+        _individual_journeys()
+        .filter(finished_at__isnull=True, time_minutes_limit__gt=0)
+        .annotate(deadline=_deadline())
+        .filter(deadline__lte=now)
+    )
+    closed = 0
+    while True:
+        batch_ids = list(expired.order_by('journey_id').values_list('journey_id', flat=True)[:batch_size])
+        if not batch_ids:
+            break
+        batch = Journey.objects.filter(journey_id__in=batch_ids)
+        invalidate_user_stats(*batch.values_list('user_id', flat=True).distinct())
+        closed += batch.update(finished_at=_deadline())
+
+    uncounted = _individual_journeys().filter(finished_at__lte=now, answered_count__isnull=True)
+    while True:
+        batch_ids = list(uncounted.order_by('journey_id').values_list('journey_id', flat=True)[:batch_size])
+        if not batch_ids:
+            break
+        recount_journeys(Journey.objects.filter(journey_id__in=batch_ids))
+    return closed
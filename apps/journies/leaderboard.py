@@ -0,0 +1,339 @@
+"""
+Provisional leaderboard of running group exams.
+
+Every participant (journey) of a group exam is ranked by its points,
+points = 3 * correct - wrong, which orders journeys exactly like the final
+score (correct - wrong/3) / total_questions * 100. Answer submissions apply
+(correct, wrong) deltas, so a participant's dense rank and the top-K are
+available in O(log N) while the exam is still running, and the final result
+computation only has to reconcile the leaderboard with the database.
+
+Two backends share the same interface:
+  - RedisLeaderboardBackend: sorted sets shared by all workers (production);
+  - LocalLeaderboardBackend: in-process stand-in for development and tests.
+settings.LEADERBOARD_BACKEND selects one ("redis" or "local").
+"""
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_right, insort
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+from utils.logger import CustomLogger
+
+logger = CustomLogger(__name__).get_logger()
+
+LEADERBOARD_BACKEND_REDIS = 'redis'
+LEADERBOARD_BACKEND_LOCAL = 'local'
+
+
+def points_of(correct, wrong):
+    return 3 * correct - wrong
+
+
+def score_of(points, total_questions):
+    """
+    (correct - wrong/3) / total_questions * 100 from the points, rounded
+    half-up to 2 digits like the SQL result engine.
+    """
+    score = Decimal(points * 100) / Decimal(3 * total_questions)
+    return float(score.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+
+class LeaderboardBackend(ABC):
+    """
+    Interface of a leaderboard backend. Members are journey ids. A backend
+    missing one of the methods cannot be instantiated.
+    """
+
+    @abstractmethod
+    def apply_delta(self, template_id, journey_id, correct_delta=0, wrong_delta=0):
+        """
+        Add the deltas to the journey's counts, registering the journey with
+        0/0 on first use. Returns the journey's new points.
+        """
+
+    @abstractmethod
+    def get_standing(self, template_id, journey_id):
+        """
+        Return {'journey_id', 'correct', 'wrong', 'points', 'rank'} of the
+        journey, or None if it is not on the leaderboard.
+        """
+
+    @abstractmethod
+    def get_top(self, template_id, limit):
+        """
+        Return the standings of the `limit` best journeys, best first.
+        """
+
+    @abstractmethod
+    def count(self, template_id):
+        """
+        Number of journeys on the leaderboard.
+        """
+
+    @abstractmethod
+    def export(self, template_id):
+        """
+        Return {journey_id: (correct, wrong)} of every journey.
+        """
+
+    @abstractmethod
+    def clear(self, template_id):
+        """
+        Drop the leaderboard of the exam.
+        """
+
+
+class _LocalBoard:
+    def __init__(self):
+        self.counts = {}           # journey_id -> [correct, wrong]
+        self.points_members = {}   # points -> {journey_id, ...}
+        self.distinct_points = []  # ascending
+
+
+class LocalLeaderboardBackend(LeaderboardBackend):
+    """
+    Per-process stand-in for development and tests only: it is not shared
+    between workers, and a journey moving to a points value nobody else has
+    updates the sorted distinct points with list.remove / insort, O(N)
+    under the lock. Rank lookups bisect them, so they stay O(log N).
+    Production runs RedisLeaderboardBackend.
+    """
+
+    def __init__(self):
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def _dense_rank(self, board, points):
+        return len(board.distinct_points) - bisect_right(board.distinct_points, points) + 1
+
+    def _standing(self, board, journey_id):
+        correct, wrong = board.counts[journey_id]
+        points = points_of(correct, wrong)
+        return {
+            'journey_id': journey_id,
+            'correct': correct,
+            'wrong': wrong,
+            'points': points,
+            'rank': self._dense_rank(board, points),
+        }
+
+    def apply_delta(self, template_id, journey_id, correct_delta=0, wrong_delta=0):
+        with self._lock:
+            board = self._boards.setdefault(template_id, _LocalBoard())
+            counts = board.counts.get(journey_id)
+            if counts is not None:
+                old_points = points_of(*counts)
+                members = board.points_members[old_points]
+                members.discard(journey_id)
+                if not members:
+                    del board.points_members[old_points]
+                    board.distinct_points.remove(old_points)
+            else:
+                counts = board.counts[journey_id] = [0, 0]
+            counts[0] += correct_delta
+            counts[1] += wrong_delta
+            points = points_of(*counts)
+            if points not in board.points_members:
+                board.points_members[points] = set()
+                insort(board.distinct_points, points)
+            board.points_members[points].add(journey_id)
+            return points
+
+    def get_standing(self, template_id, journey_id):
+        with self._lock:
+            board = self._boards.get(template_id)
+            if board is None or journey_id not in board.counts:
+                return None
+            return self._standing(board, journey_id)
+
+    def get_top(self, template_id, limit):
+        with self._lock:
+            board = self._boards.get(template_id)
+            if board is None:
+                return []
+            top = []
+            for points in reversed(board.distinct_points):
+                for journey_id in sorted(board.points_members[points]):
+                    if len(top) >= limit:
+                        return top
+                    top.append(self._standing(board, journey_id))
+            return top
+
+    def count(self, template_id):
+        with self._lock:
+            board = self._boards.get(template_id)
+            return len(board.counts) if board else 0
+
+    def export(self, template_id):
+        with self._lock:
+            board = self._boards.get(template_id)
+            if board is None:
+                return {}
+            return {journey_id: tuple(counts) for journey_id, counts in board.counts.items()}
+
+    def clear(self, template_id):
+        with self._lock:
+            self._boards.pop(template_id, None)
+
+
+# Atomically moves a member between points values, keeping
+#   members  (zset journey_id -> points),
+#   counts   (hash journey_id -> "correct,wrong"),
+#   distinct (zset of the points values in use) and
+#   tally    (hash points -> number of members)
+# consistent, so the dense rank is one ZCOUNT on `distinct`.
+APPLY_DELTA_LUA = """
+local raw = redis.call('HGET', KEYS[2], ARGV[1])
+local correct, wrong = 0, 0
+if raw then
+    local sep = string.find(raw, ',', 1, true)
+    correct = tonumber(string.sub(raw, 1, sep - 1))
+    wrong = tonumber(string.sub(raw, sep + 1))
+    local old = 3 * correct - wrong
+    if redis.call('HINCRBY', KEYS[4], old, -1) <= 0 then
+        redis.call('HDEL', KEYS[4], old)
+        redis.call('ZREM', KEYS[3], old)
+    end
+end
+correct = correct + tonumber(ARGV[2])
+wrong = wrong + tonumber(ARGV[3])
+local points = 3 * correct - wrong
+redis.call('HSET', KEYS[2], ARGV[1], correct .. ',' .. wrong)
+redis.call('ZADD', KEYS[1], points, ARGV[1])
+redis.call('HINCRBY', KEYS[4], points, 1)
+redis.call('ZADD', KEYS[3], points, points)
+for i = 1, 4 do
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+return points
+"""
+
+
+class RedisLeaderboardBackend(LeaderboardBackend):
+    """
+    Shared leaderboard on Redis sorted sets. The keys of one exam share a
+    hash tag so the Lua script also runs on a Redis Cluster.
+    """
+    KEY = 'leaderboard:{{{template_id}}}:{name}'
+    KEY_NAMES = ('members', 'counts', 'distinct', 'tally')
+
+    def __init__(self, url, ttl):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._apply_delta = self._client.register_script(APPLY_DELTA_LUA)
+        self._ttl = ttl
+
+    def _keys(self, template_id):
+        return [self.KEY.format(template_id=template_id, name=name) for name in self.KEY_NAMES]
+
+    def _rank_of(self, template_id, points):
+        distinct_key = self._keys(template_id)[2]
+        return self._client.zcount(distinct_key, f'({points}', '+inf') + 1
+
+    @staticmethod
+    def _parse_counts(raw):
+        correct, wrong = raw.decode().split(',')
+        return int(correct), int(wrong)
+
+    def apply_delta(self, template_id, journey_id, correct_delta=0, wrong_delta=0):
+        return int(self._apply_delta(
+            keys=self._keys(template_id),
+            args=[journey_id, correct_delta, wrong_delta, self._ttl],
+        ))
+
+    def get_standing(self, template_id, journey_id):
+        counts_key = self._keys(template_id)[1]
+        raw = self._client.hget(counts_key, journey_id)
+        if raw is None:
+            return None
+        correct, wrong = self._parse_counts(raw)
+        points = points_of(correct, wrong)
+        return {
+            'journey_id': journey_id,
+            'correct': correct,
+            'wrong': wrong,
+            'points': points,
+            'rank': self._rank_of(template_id, points),
+        }
+
+    def get_top(self, template_id, limit):
+        members_key, counts_key, _, _ = self._keys(template_id)
+        # best points first, ties by journey id
+        top = self._client.zrange(members_key, 0, limit - 1, desc=True, withscores=True)
+        if not top:
+            return []
+        journey_ids = [int(member) for member, _ in top]
+        counts = self._client.hmget(counts_key, journey_ids)
+        rank = self._rank_of(template_id, int(top[0][1]))
+        previous_points = None
+        standings = []
+        for journey_id, raw, (_, points) in zip(journey_ids, counts, top):
+            points = int(points)
+            if previous_points is not None and points != previous_points:
+                rank += 1
+            previous_points = points
+            correct, wrong = self._parse_counts(raw) if raw else (0, 0)
+            standings.append({
+                'journey_id': journey_id,
+                'correct': correct,
+                'wrong': wrong,
+                'points': points,
+                'rank': rank,
+            })
+        return standings
+
+    def count(self, template_id):
+        return self._client.zcard(self._keys(template_id)[0])
+
+    def export(self, template_id):
+        counts_key = self._keys(template_id)[1]
+        return {
+            int(journey_id): self._parse_counts(raw)
+            for journey_id, raw in self._client.hscan_iter(counts_key, count=5000)
+        }
+
+    def clear(self, template_id):
+        self._client.delete(*self._keys(template_id))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_leaderboard() -> LeaderboardBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if settings.LEADERBOARD_BACKEND == LEADERBOARD_BACKEND_REDIS:
+                    _backend = RedisLeaderboardBackend(
+                        settings.LEADERBOARD_REDIS_URL,
+                        settings.LEADERBOARD_TTL_SECONDS,
+                    )
+                else:
+                    _backend = LocalLeaderboardBackend()
+    return _backend
+
+
+def record_answer_delta(template_id, journey_id, correct_delta=0, wrong_delta=0):
+    """
+    Apply an answer's delta to the leaderboard. The leaderboard is only
+    provisional, so a failure is logged instead of failing the submission;
+    the final computation detects the drift and recomputes from scratch.
+    """
+    try:
+        get_leaderboard().apply_delta(template_id, journey_id, correct_delta, wrong_delta)
+    except Exception as exc:
+        logger.warning(f'leaderboard delta for journey {journey_id} failed: {exc!r}')
+
+
+def register_participant(template_id, journey_id):
+    """
+    Put a freshly started journey on the leaderboard with 0 points so it
+    is ranked (and counted) before its first answer.
+    """
+    record_answer_delta(template_id, journey_id)
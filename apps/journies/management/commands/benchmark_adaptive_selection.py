@@ -0,0 +1,141 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+
+from apps.journies.adaptive_selection import BUCKET_COUNT, adaptive_index, hardness_bucket
+from apps.journies.management.commands.benchmark_question_sampler import RollbackBenchmark, timed
+from apps.questions.models import Question
+
+
+def legacy_draw(bucket, seen):
+    """
+    The same selection done with a query: a random unseen active question
+    of the target hardness range.
+    """
+    low = 1 + 9 * bucket / BUCKET_COUNT
+    return (
+        Question.objects
+        .filter(is_active=True, hardness__gte=low, hardness__lt=low + 9 / BUCKET_COUNT)
+        .exclude(id__in=seen)
+        .order_by('?')
+        .values_list('id', flat=True)
+        .first()
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the adaptive selection buckets: build time, draw latency "
+        "against a per-draw query, and the incremental update after a "
+        "hardness recalculation. Synthetic rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000],
+            help='Question bank sizes to benchmark'
+        )
+        parser.add_argument(
+            '--seen',
+            type=int,
+            default=50,
+            help='Number of questions the benchmark journey has already seen'
+        )
+        parser.add_argument(
+            '--draws',
+            type=int,
+            default=10_000,
+            help='Number of bucket draws per size'
+        )
+        parser.add_argument(
+            '--legacy-draws',
+            type=int,
+            default=20,
+            help='Number of query draws per size'
+        )
+        parser.add_argument(
+            '--changed',
+            type=float,
+            default=0.01,
+            help='Share of the questions whose hardness changes before the incremental update'
+        )
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._run(size, options)
+                    raise RollbackBenchmark
+            except RollbackBenchmark:
+                pass
+            finally:
+                adaptive_index.clear()
+
+    def _run(self, size, options):
+        self.stdout.write(f'Creating {size} synthetic questions...')
+        Question.objects.bulk_create(
+            (
+                Question(
+                    text_body=f'benchmark question {i}',
+                    choice_1='1',
+                    choice_2='2',
+                    choice_3='3',
+                    choice_4='4',
+                    true_choice='choice_1',
+                    hardness=random.uniform(1, 10),
+                )
+                for i in range(size)
+            ),
+            batch_size=5000
+        )
+
+        start = time.perf_counter()
+        adaptive_index.rebuild()
+        build_ms = (time.perf_counter() - start) * 1000
+        index = adaptive_index._index
+        memory_kib = (
+            sum(bucket.itemsize * len(bucket) for buckets in index.buckets.values() for bucket in buckets)
+            + len(index.bucket_of)
+        ) / 1024
+
+        question_ids = [question_id for bucket in index.buckets[''] for question_id in bucket]
+        seen = set(random.sample(question_ids, options['seen']))
+        buckets = [random.randrange(BUCKET_COUNT) for _ in range(options['draws'])]
+        draws = iter(buckets * 2)
+        selection = timed(lambda: index.draw(None, next(draws), seen=seen), options['draws'])
+        legacy = timed(
+            lambda: legacy_draw(random.randrange(BUCKET_COUNT), seen),
+            options['legacy_draws']
+        )
+
+        # a hardness recalculation that changed a share of the bank
+        changed_ids = random.sample(question_ids, int(size * options['changed']))
+        Question.objects.filter(id__in=changed_ids).update(
+            hardness=11 - F('hardness'),
+            hardness_updated_at=Now(),
+        )
+        start = time.perf_counter()
+        moved = adaptive_index.sync_hardness()
+        sync_ms = (time.perf_counter() - start) * 1000
+        expected = {
+            question_id: hardness_bucket(hardness)
+            for question_id, hardness in Question.objects.filter(id__in=changed_ids).values_list('id', 'hardness')
+        }
+        consistent = all(index.bucket_of[question_id] == bucket for question_id, bucket in expected.items())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[{size} questions] '
+            f'query mean={legacy["mean"]:.3f}ms p99={legacy["p99"]:.3f}ms | '
+            f'buckets mean={selection["mean"] * 1000:.1f}us p50={selection["p50"] * 1000:.1f}us '
+            f'p99={selection["p99"] * 1000:.1f}us | '
+            f'build={build_ms:.1f}ms ({memory_kib:.0f} KiB) | '
+            f'incremental update of {len(changed_ids)} changed ({moved} moved)={sync_ms:.1f}ms'
+            + ('' if consistent else ' INCONSISTENT')
+        ))
@@ -0,0 +1,161 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.accounts.models import RoleTextChoices, User
+from apps.journies.group_exam_result import (
+    RESULT_ENGINE_POLARS,
+    RESULT_ENGINE_SQL,
+    calculate_group_exam_result,
+)
+from apps.journies.models import (
+    Journey,
+    ResultModeChoices,
+    JourneyStep,
+    JourneyStepTemplate,
+    JourneyTemplate,
+    StaticJourneyType,
+    UserAnswer,
+)
+from apps.questions.models import Question
+
+BENCHMARK_PHONE_PREFIX = '0998'
+# the chunked result mode, benchmarked next to the single-pass engines
+RESULT_MODE_CHUNKED = ResultModeChoices.CHUNKED.value
+ANSWER_RESULTS = [UserAnswer.CORRECT, UserAnswer.FALSE, UserAnswer.NOT_SELECTED]
+
+
+class RollbackBenchmark(Exception):
+    """Raised to discard the synthetic rows created for a benchmark run."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the group exam result engines (set-based SQL, Polars and "
+        "the chunked mode) "
+        "on synthetic exams. Synthetic rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--participants',
+            type=int,
+            nargs='+',
+            default=[1_000, 10_000, 100_000],
+            help='Exam sizes (number of participants) to benchmark'
+        )
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=20,
+            help='Number of questions in the synthetic exam'
+        )
+        parser.add_argument(
+            '--engines',
+            nargs='+',
+            choices=[RESULT_ENGINE_SQL, RESULT_ENGINE_POLARS, RESULT_MODE_CHUNKED],
+            default=[RESULT_ENGINE_SQL, RESULT_ENGINE_POLARS, RESULT_MODE_CHUNKED],
+            help='Engines to benchmark'
+        )
+
+    def handle(self, *args, **options):
+        for participants in options['participants']:
+            try:
+                with transaction.atomic():
+                    self._run(participants, options)
+                    raise RollbackBenchmark
+            except RollbackBenchmark:
+                pass
+
+    def _run(self, participants, options):
+        self.stdout.write(
+            f'Creating a group exam with {participants} participants '
+            f'and {options["questions"]} questions...'
+        )
+        questions = Question.objects.bulk_create([
+            Question(
+                text_body=f'benchmark question {i}',
+                choice_1='1',
+                choice_2='2',
+                choice_3='3',
+                choice_4='4',
+                true_choice='choice_1',
+            )
+            for i in range(options['questions'])
+        ])
+        # bulk_create skips post_save, so no result task gets scheduled
+        template = JourneyTemplate.objects.bulk_create([
+            JourneyTemplate(
+                name='benchmark group exam',
+                time_minutes_limit=60,
+                start_datetime=timezone.now(),
+                journey_type=StaticJourneyType.GROUP_EXAM,
+            )
+        ])[0]
+        JourneyStepTemplate.objects.bulk_create([
+            JourneyStepTemplate(journey_template=template, question=question)
+            for question in questions
+        ])
+        users = User.objects.bulk_create(
+            (
+                User(
+                    phone_number=f'{BENCHMARK_PHONE_PREFIX}{i:07d}',
+                    role=RoleTextChoices.STUDENT,
+                    is_active=True,
+                )
+                for i in range(participants)
+            ),
+            batch_size=10_000
+        )
+        answers = [
+            [random.choice(ANSWER_RESULTS) for _ in questions]
+            for _ in users
+        ]
+        journeys = Journey.objects.bulk_create(
+            (
+                Journey(
+                    user=user,
+                    journey_type=StaticJourneyType.GROUP_EXAM,
+                    journey_static=template,
+                    answered_count=len(results) - results.count(UserAnswer.NOT_SELECTED),
+                    unanswered_count=results.count(UserAnswer.NOT_SELECTED),
+                    correct_count=results.count(UserAnswer.CORRECT),
+                    wrong_count=results.count(UserAnswer.FALSE),
+                )
+                for user, results in zip(users, answers)
+            ),
+            batch_size=10_000
+        )
+        JourneyStep.objects.bulk_create(
+            (
+                JourneyStep(
+                    journey=journey,
+                    question=question,
+                    answer_result=answer_result,
+                )
+                for journey, results in zip(journeys, answers)
+                for question, answer_result in zip(questions, results)
+            ),
+            batch_size=10_000
+        )
+        # give the planner real statistics for the freshly inserted rows
+        with connection.cursor() as cursor:
+            for model in (Journey, JourneyStep, JourneyStepTemplate):
+                cursor.execute(f'ANALYZE {model._meta.db_table}')
+
+        for engine in options['engines']:
+            start = time.perf_counter()
+            if engine == RESULT_MODE_CHUNKED:
+                success = calculate_group_exam_result(template.pk, mode=ResultModeChoices.CHUNKED)
+            else:
+                success = calculate_group_exam_result(
+                    template.pk, engine=engine, mode=ResultModeChoices.STANDARD
+                )
+            elapsed = time.perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'[{participants} participants] engine={engine} '
+                f'success={success} time={elapsed * 1000:.1f}ms'
+            ))
@@ -0,0 +1,161 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.accounts.models import User
+from apps.journies.models import Journey, JourneyStep
+from apps.journies.next_journey_step import get_next_journey_step
+from apps.journies.question_sampler import (
+    draw_question_id,
+    get_seen_question_ids,
+    invalidate_question_pool,
+    question_pool,
+)
+from apps.questions.models import Question
+
+
+class RollbackBenchmark(Exception):
+    """Raised to discard the synthetic rows created for a benchmark run."""
+
+
+def legacy_next_journey_step(journey_id):
+    """
+    The previous get_next_journey_step for a training journey: full id scan
+    minus seen ids, a second query for the question, then the step insert.
+    """
+    journey = Journey.objects.get(journey_id=journey_id)
+    if not journey.is_active():
+        return None
+    available_ids = list(
+        Question.objects.filter(
+            is_active=True
+        ).exclude(
+            id__in=journey.steps.values_list('question_id', flat=True)
+        ).values_list('id', flat=True)
+    )
+    if not available_ids:
+        return None
+    return JourneyStep.objects.create(
+        journey=journey,
+        question=Question.objects.get(id=random.choice(available_ids))
+    )
+
+
+def timed(func, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark get_next_journey_step with the in-memory question sampler "
+        "against the legacy full-table id scan, end to end (journey read, "
+        "seen set, draw, step insert). Synthetic rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000],
+            help='Question bank sizes to benchmark'
+        )
+        parser.add_argument(
+            '--seen',
+            type=int,
+            default=50,
+            help='Number of questions the benchmark journey has already seen'
+        )
+        parser.add_argument(
+            '--draws',
+            type=int,
+            default=1000,
+            help='Number of sampler steps per size'
+        )
+        parser.add_argument(
+            '--legacy-draws',
+            type=int,
+            default=20,
+            help='Number of legacy steps per size'
+        )
+
+    def handle(self, *args, **options):
+        for size in options['sizes']:
+            try:
+                with transaction.atomic():
+                    self._run(size, options)
+                    raise RollbackBenchmark
+            except RollbackBenchmark:
+                pass
+            finally:
+                question_pool.clear()
+                invalidate_question_pool()
+
+    def _run(self, size, options):
+        self.stdout.write(f'Creating {size} synthetic questions...')
+        Question.objects.bulk_create(
+            (
+                Question(
+                    text_body=f'benchmark question {i}',
+                    choice_1='1',
+                    choice_2='2',
+                    choice_3='3',
+                    choice_4='4',
+                    true_choice='choice_1',
+                )
+                for i in range(size)
+            ),
+            batch_size=5000
+        )
+        user = User.objects.create(phone_number='09000000000')
+        seen_ids = list(Question.objects.order_by('?').values_list('id', flat=True)[:options['seen']])
+        # one journey per path, both starting from the same seen questions
+        journeys = Journey.objects.bulk_create([Journey(user=user), Journey(user=user)])
+        JourneyStep.objects.bulk_create(
+            JourneyStep(journey=journey, question_id=question_id)
+            for journey in journeys
+            for question_id in seen_ids
+        )
+        legacy_journey, sampler_journey = journeys
+
+        legacy = timed(
+            lambda: legacy_next_journey_step(legacy_journey.journey_id),
+            options['legacy_draws']
+        )
+
+        invalidate_question_pool()
+        start = time.perf_counter()
+        question_pool.ids()
+        build_ms = (time.perf_counter() - start) * 1000
+        # the pool is built once per process; the seen set is read per step,
+        # then kept in the shared cache
+        sampler = timed(
+            lambda: get_next_journey_step(sampler_journey.journey_id),
+            options['draws']
+        )
+        seen = get_seen_question_ids(sampler_journey.journey_id)
+        draw_only = timed(
+            lambda: draw_question_id(sampler_journey.journey_id, seen=seen),
+            options['draws']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'[{size} questions, per step] '
+            f'legacy mean={legacy["mean"]:.3f}ms p50={legacy["p50"]:.3f}ms p99={legacy["p99"]:.3f}ms | '
+            f'sampler mean={sampler["mean"]:.3f}ms p50={sampler["p50"]:.3f}ms p99={sampler["p99"]:.3f}ms '
+            f'(draw alone p50={draw_only["p50"]:.4f}ms) | '
+            f'pool build={build_ms:.1f}ms ({len(question_pool.ids()) * 8 / 1024:.0f} KiB)'
+        ))
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand
+
+from apps.journies.journey_counters import (
+    ACTUAL_COUNTS,
+    find_counter_drift,
+    repair_counters,
+)
+from apps.journies.models import Journey
+
+
+class Command(BaseCommand):
+    help = (
+        "Verify the denormalized answer counters of journeys against their "
+        "steps and, with --repair, fix the ones that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Rewrite the counters of drifted journeys'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Journeys checked per query'
+        )
+        parser.add_argument(
+            '--journey-template',
+            type=int,
+            default=None,
+            help='Only check the journeys of this JourneyTemplate'
+        )
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=10,
+            help='Number of drifted journeys to print'
+        )
+
+    def handle(self, *args, **options):
+        journeys = Journey.objects.all()
+        if options['journey_template'] is not None:
+            journeys = journeys.filter(journey_static_id=options['journey_template'])
+
+        checked = drifted = shown = 0
+        last_journey_id = 0
+        while True:
+            batch_ids = list(
+                journeys
+                .filter(journey_id__gt=last_journey_id)
+                .order_by('journey_id')
+                .values_list('journey_id', flat=True)[:options['batch_size']]
+            )
+            if not batch_ids:
+                break
+            last_journey_id = batch_ids[-1]
+            checked += len(batch_ids)
+            batch_drift = find_counter_drift(Journey.objects.filter(journey_id__in=batch_ids))
+            drifted += len(batch_drift)
+
+            for journey in batch_drift:
+                if shown < options['show']:
+                    shown += 1
+                    self.stdout.write(
+                        f'journey {journey.journey_id}: ' + ', '.join(
+                            f'{field} {getattr(journey, field)} != {getattr(journey, actual)}'
+                            for field, actual in ACTUAL_COUNTS.items()
+                            if getattr(journey, field) != getattr(journey, actual)
+                        )
+                    )
+            if options['repair'] and batch_drift:
+                repair_counters(batch_drift)
+
+        message = f'checked {checked} journeys, {drifted} with drifted counters'
+        if drifted and options['repair']:
+            self.stdout.write(self.style.SUCCESS(message + ' (repaired)'))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(message + ' (run with --repair to fix)'))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
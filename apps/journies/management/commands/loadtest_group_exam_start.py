@@ -0,0 +1,157 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import RoleTextChoices, User
+from apps.accounts.otp import create_token_for_user
+from apps.journies.models import (
+    JourneyStepTemplate,
+    JourneyTemplate,
+    StaticJourneyType
+)
+from apps.questions.models import Question
+
+LOADTEST_PHONE_PREFIX = '0999'
+
+
+def percentile(samples, pct):
+    return samples[min(len(samples) - 1, int(len(samples) * pct))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Start N group-exam journeys concurrently through the "
+        "create-journey-template endpoint and report p50/p99 latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--journeys',
+            type=int,
+            default=500,
+            help='Number of students starting the group exam'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=50,
+            help='Number of concurrent clients'
+        )
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=20,
+            help='Number of questions in the group exam'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the generated users, template and journeys'
+        )
+
+    def handle(self, *args, **options):
+        if User.objects.filter(phone_number__startswith=LOADTEST_PHONE_PREFIX).exists():
+            raise CommandError(
+                f'Users with the {LOADTEST_PHONE_PREFIX} prefix already exist; '
+                'remove the previous load-test data first.'
+            )
+
+        template, users, created_question_ids = self._setup(options)
+        url = reverse('create-journey-template')
+        payload = json.dumps({'journey_template_id': template.pk})
+        tokens = [create_token_for_user(user)['access'] for user in users]
+
+        def start(token):
+            client = Client()
+            begin = time.perf_counter()
+            response = client.post(
+                url,
+                payload,
+                content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {token}'
+            )
+            elapsed = (time.perf_counter() - begin) * 1000
+            connection.close()
+            return elapsed, response.status_code
+
+        self.stdout.write(
+            f'Starting {len(tokens)} journeys with concurrency {options["concurrency"]}...'
+        )
+        try:
+            begin = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(start, tokens))
+            wall = time.perf_counter() - begin
+        finally:
+            if not options['keep']:
+                self._teardown(template, created_question_ids)
+
+        latencies = sorted(elapsed for elapsed, _ in results)
+        failures = sum(1 for _, code in results if code != 201)
+        self.stdout.write(self.style.SUCCESS(
+            f'journeys={len(results)} failures={failures} '
+            f'throughput={len(results) / wall:.1f}/s '
+            f'mean={statistics.fmean(latencies):.1f}ms '
+            f'p50={percentile(latencies, 0.50):.1f}ms '
+            f'p99={percentile(latencies, 0.99):.1f}ms '
+            f'max={latencies[-1]:.1f}ms'
+        ))
+
+    def _setup(self, options):
+        question_ids = list(
+            Question.objects
+            .filter(is_active=True)
+            .values_list('id', flat=True)[:options['questions']]
+        )
+        created_question_ids = []
+        missing = options['questions'] - len(question_ids)
+        if missing > 0:
+            created = Question.objects.bulk_create([
+                Question(
+                    text_body=f'load-test question {i}',
+                    choice_1='1',
+                    choice_2='2',
+                    choice_3='3',
+                    choice_4='4',
+                    true_choice='choice_1',
+                )
+                for i in range(missing)
+            ])
+            created_question_ids = [question.id for question in created]
+            question_ids += created_question_ids
+
+        # bulk_create skips post_save, so no result task gets scheduled
+        template = JourneyTemplate.objects.bulk_create([
+            JourneyTemplate(
+                name='load-test group exam',
+                time_minutes_limit=60,
+                start_datetime=timezone.now(),
+                journey_type=StaticJourneyType.GROUP_EXAM,
+            )
+        ])[0]
+        JourneyStepTemplate.objects.bulk_create([
+            JourneyStepTemplate(journey_template=template, question_id=question_id)
+            for question_id in question_ids
+        ])
+
+        users = User.objects.bulk_create([
+            User(
+                phone_number=f'{LOADTEST_PHONE_PREFIX}{i:07d}',
+                role=RoleTextChoices.STUDENT,
+                is_active=True,
+            )
+            for i in range(options['journeys'])
+        ])
+        return template, users, created_question_ids
+
+    def _teardown(self, template, created_question_ids):
+        User.objects.filter(phone_number__startswith=LOADTEST_PHONE_PREFIX).delete()
+        template.delete()
+        Question.objects.filter(id__in=created_question_ids).delete()
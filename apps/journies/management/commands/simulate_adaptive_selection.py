@@ -0,0 +1,99 @@
+import math
+import random
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from apps.journies.adaptive_selection import DifficultyIndex, target_bucket
+
+
+def p_correct(ability, difficulty):
+    """Rasch model: chance that a student of `ability` answers correctly."""
+    return 1 / (1 + math.exp(difficulty - ability))
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate training journeys of synthetic students (Rasch model) to "
+        "compare the adaptive selection with the uniform random one. Runs "
+        "entirely in memory; the database is not touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--questions',
+            type=int,
+            default=20_000,
+            help='Size of the synthetic question bank'
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=2_000,
+            help='Number of simulated students, one journey each'
+        )
+        parser.add_argument(
+            '--length',
+            type=int,
+            default=30,
+            help='Questions per journey'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed'
+        )
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        difficulties = {
+            question_id: random.gauss(0, 1.5)
+            for question_id in range(1, options['questions'] + 1)
+        }
+        # hardness as the hardness job would compute it from an average
+        # population (ability 0) that always answers: 1 if correct, else 10
+        index = DifficultyIndex(
+            (question_id, 10 - 9 * p_correct(0, difficulty), None)
+            for question_id, difficulty in difficulties.items()
+        )
+        question_ids = list(difficulties)
+        abilities = sorted(random.gauss(0, 1) for _ in range(options['students']))
+
+        def uniform(correct, answered, seen):
+            while True:
+                question_id = random.choice(question_ids)
+                if question_id not in seen:
+                    return question_id
+
+        def adaptive(correct, answered, seen):
+            return index.draw(None, target_bucket(correct, answered), seen=seen)
+
+        bands = {
+            'low': abilities[:len(abilities) // 3],
+            'middle': abilities[len(abilities) // 3:2 * len(abilities) // 3],
+            'high': abilities[2 * len(abilities) // 3:],
+        }
+        self.stdout.write(
+            f'{"band":<8} {"mode":<9} {"accuracy":>9} {"information":>12} {"|ability - difficulty|":>23}'
+        )
+        for band, students in bands.items():
+            for mode, select in (('random', uniform), ('adaptive', adaptive)):
+                accuracy, information, distance = [], [], []
+                for ability in students:
+                    correct = answered = 0
+                    seen = set()
+                    for _ in range(options['length']):
+                        question_id = select(correct, answered, seen)
+                        seen.add(question_id)
+                        p = p_correct(ability, difficulties[question_id])
+                        # Fisher information of the item for this student
+                        information.append(p * (1 - p))
+                        distance.append(abs(ability - difficulties[question_id]))
+                        answered += 1
+                        correct += random.random() < p
+                    accuracy.append(correct / answered)
+                self.stdout.write(
+                    f'{band:<8} {mode:<9} {statistics.fmean(accuracy):>9.3f} '
+                    f'{statistics.fmean(information):>12.4f} {statistics.fmean(distance):>23.3f}'
+                )
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journies', '0008_alter_journeystep_question_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journeytemplate',
+            name='result_mode',
+            field=models.CharField(choices=[('standard', 'محاسبه یکجا'), ('chunked', 'محاسبه بخش\u200cبندی\u200cشده')], default='standard', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='GroupExamResultCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phase', models.CharField(choices=[('histogram', 'Building score histogram'), ('persist', 'Persisting results'), ('done', 'Done')], default='histogram', max_length=20)),
+                ('last_journey_id', models.PositiveIntegerField(default=0)),
+                ('score_histogram', models.JSONField(blank=True, default=dict)),
+                ('total_questions', models.PositiveIntegerField(default=0)),
+                ('total_participants', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('journey_template', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='result_checkpoint', to='journies.journeytemplate')),
+            ],
+        ),
+    ]
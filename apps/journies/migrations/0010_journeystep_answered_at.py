@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journies', '0009_journeytemplate_result_mode_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journeystep',
+            name='answered_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journies', '0010_journeystep_answered_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='journey',
+            name='selection_mode',
+            field=models.CharField(choices=[('random', 'تصادفی'), ('adaptive', 'تطبیقی')], default='random', max_length=20),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journies', '0011_journey_selection_mode'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journey',
+            index=models.Index(fields=['user', '-created_at', 'journey_id'], name='journey_user_created_idx'),
+        ),
+    ]
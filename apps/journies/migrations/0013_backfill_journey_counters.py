@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# JourneyStep.answer_result values, frozen
+CORRECT = 'C'
+FALSE = 'F'
+
+
+def backfill_journey_counters(apps, schema_editor):
+    """
+    Count the steps of the journeys created before the answer counters
+    (0006), whose counters are still NULL and would read as 0 in the
+    overall report. One UPDATE with a correlated count per counter.
+    """
+    Journey = apps.get_model('journies', 'Journey')
+    JourneyStep = apps.get_model('journies', 'JourneyStep')
+
+    def step_count(**filters):
+        return Coalesce(
+            Subquery(
+                JourneyStep.objects
+                .filter(journey_id=OuterRef('pk'), **filters)
+                .order_by()
+                .values('journey_id')
+                .annotate(count=Count('pk'))
+                .values('count'),
+                output_field=IntegerField()
+            ),
+            Value(0)
+        )
+
+    correct = step_count(answer_result=CORRECT)
+    wrong = step_count(answer_result=FALSE)
+    Journey.objects.filter(correct_count__isnull=True).update(
+        correct_count=correct,
+        wrong_count=wrong,
+        answered_count=correct + wrong,
+        unanswered_count=step_count() - correct - wrong,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('journies', '0012_journey_journey_user_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_journey_counters, migrations.RunPython.noop),
+    ]
@@ -13,6 +13,11 @@ class StaticJourneyType(models.TextChoices):
     GROUP_EXAM = 'group_exam', 'آزمون استاتیک گروهی'
 
 
+class ResultModeChoices(models.TextChoices):
+    STANDARD = 'standard', 'محاسبه یکجا'
+    CHUNKED = 'chunked', 'محاسبه بخش‌بندی‌شده'
+
+
 class JourneyTemplate(models.Model):
     name = models.CharField(max_length=300)  # konkoor_92
     time_minutes_limit = models.PositiveIntegerField(
@@ -23,11 +28,49 @@ class JourneyTemplate(models.Model):
         choices=StaticJourneyType.choices,
         default=StaticJourneyType.TRAINING
     )
+    # "chunked" streams very large group exams in bounded, resumable batches
+    result_mode = models.CharField(
+        max_length=20,
+        choices=ResultModeChoices.choices,
+        default=ResultModeChoices.STANDARD
+    )
 
     def __str__(self):
         return self.name
 
 
+class CheckpointPhase(models.TextChoices):
+    HISTOGRAM = 'histogram', 'Building score histogram'
+    PERSIST = 'persist', 'Persisting results'
+    DONE = 'done', 'Done'
+
+
+class GroupExamResultCheckpoint(models.Model):
+    """
+    Progress of a chunked group exam result computation, so a crashed
+    worker resumes after the last processed journey instead of restarting.
+    """
+    journey_template = models.OneToOneField(
+        JourneyTemplate,
+        on_delete=models.CASCADE,
+        related_name='result_checkpoint'
+    )
+    phase = models.CharField(
+        max_length=20,
+        choices=CheckpointPhase.choices,
+        default=CheckpointPhase.HISTOGRAM
+    )
+    last_journey_id = models.PositiveIntegerField(default=0)
+    # {points: participants}, points = 3 * correct - wrong
+    score_histogram = models.JSONField(default=dict, blank=True)
+    total_questions = models.PositiveIntegerField(default=0)
+    total_participants = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.journey_template_id} result checkpoint ({self.phase})"
+
+
 class JourneyStepTemplate(models.Model):
     journey_template = models.ForeignKey(JourneyTemplate, on_delete=models.CASCADE, related_name="quiz_steps")
     question = models.ForeignKey(
@@ -49,6 +92,10 @@ class SubjectChoices(models.TextChoices):
     ANALYTICAL_INTELLIGENCE = 'analytical', 'هوش و استعداد تحلیلی'
     SPEED_ACCURACY_FOCUS = 'speed_focus', 'سرعت، دقت و تمرکز'
 
+class SelectionModeChoices(models.TextChoices):
+    RANDOM = 'random', 'تصادفی'
+    ADAPTIVE = 'adaptive', 'تطبیقی'
+
 class Journey(models.Model):
     journey_id = models.AutoField(primary_key=True)
     user = models.ForeignKey(
@@ -92,6 +139,12 @@ class Journey(models.Model):
         blank=True,
         null=True
     )
+    # how the next question of a training journey is picked
+    selection_mode       = models.CharField(
+        max_length=20,
+        choices=SelectionModeChoices.choices,
+        default=SelectionModeChoices.RANDOM
+    )
     last_seen_journey_step = models.ForeignKey(
         'JourneyStep',                # string name, because JourneyStep is below
         on_delete=models.SET_NULL,    # keep the Journey if the step is deleted
@@ -140,6 +193,10 @@ class Journey(models.Model):
 
     class Meta:
         ordering = ['-created_at']  # descending (most recent first)
+        indexes = [
+            # keyset pagination of a user's journeys
+            models.Index(fields=['user', '-created_at', 'journey_id'], name='journey_user_created_idx'),
+        ]
 
     def is_active(self):
         """
@@ -161,8 +218,11 @@ class Journey(models.Model):
 
         # Check if the question count limit is reached.
         if self.question_count_limit:
-            steps = self.steps.all()
-            if steps.count() > self.question_count_limit:
+            if self.answered_count is not None and self.unanswered_count is not None:
+                step_count = self.answered_count + self.unanswered_count
+            else:
+                step_count = self.steps.count()
+            if step_count > self.question_count_limit:
                 return False
 
 
@@ -197,6 +257,8 @@ class JourneyStep(models.Model):
         choices=UserAnswer.choices,
         default=UserAnswer.NOT_SELECTED,
     )
+    # time of the latest answer submission; drives incremental hardness updates
+    answered_at   = models.DateTimeField(blank=True, null=True, db_index=True)
 
     class Meta:
         ordering = ["step_id"]
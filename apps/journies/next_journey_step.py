@@ -1,6 +1,13 @@
-import random
-from apps.questions.models import Question
-from apps.journies.models import Journey, JourneyStep
+from django.db import transaction
+
+from apps.journies.adaptive_selection import draw_adaptive_question_id
+from apps.journies.journey_counters import add_steps
+from apps.journies.models import Journey, JourneyStep, SelectionModeChoices
+from apps.journies.question_sampler import (
+    draw_question_id,
+    get_seen_question_ids,
+    mark_question_seen
+)
 
 
 def get_next_journey_step(journey_id, current_journey_step_id=None):
@@ -24,18 +31,19 @@ def get_next_journey_step(journey_id, current_journey_step_id=None):
         next_journey_step = qs.order_by('step_id').first()
         return next_journey_step  # will be None if no more steps
 
-    available_ids = list(
-        Question.objects.filter(
-            is_active=True
-        ).exclude(
-            id__in=journey.steps.values_list('question_id', flat=True)
-        ).values_list('id', flat=True)
-    )
-
-    if available_ids:
-        journey_step = JourneyStep.objects.create(
-            journey=journey,
-            question=Question.objects.get(id=random.choice(available_ids))
-        )
+    seen = get_seen_question_ids(journey.journey_id)
+    if journey.selection_mode == SelectionModeChoices.ADAPTIVE:
+        question_id = draw_adaptive_question_id(journey, seen)
+    else:
+        question_id = draw_question_id(journey.journey_id, seen=seen)
+
+    if question_id is not None:
+        with transaction.atomic():
+            journey_step = JourneyStep.objects.create(
+                journey=journey,
+                question_id=question_id
+            )
+            add_steps(journey)
+        mark_question_seen(journey.journey_id, question_id, seen=seen)
         return journey_step
     return None
@@ -1,7 +1,18 @@
 from rest_framework.pagination import PageNumberPagination
 
+from utils.pagination import KeysetPagination, OptionalKeysetPagination
+
 
 class CustomPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+
+
+class JourneyKeysetPagination(KeysetPagination):
+    ordering = ('-created_at', 'journey_id')
+
+
+class JourneyListPagination(OptionalKeysetPagination):
+    page_number_pagination_class = CustomPagination
+    keyset_pagination_class = JourneyKeysetPagination
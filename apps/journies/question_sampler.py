@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from array import array
+
+from apps.questions.models import Question
+from utils.cache import CacheNamespace
+
+POOL_VERSION_CACHE_KEY = 'pool_version'
+SEEN_CACHE_KEY = 'seen:{journey_id}'
+SEEN_CACHE_TIMEOUT = 60 * 60 * 6
+# Safety net for processes that never see a version bump (e.g. a per-process cache).
+POOL_MAX_AGE_SECONDS = 60 * 5
+# Random probes before falling back to a scan of the remaining ids.
+MAX_REJECTIONS = 32
+
+sampler_cache = CacheNamespace('question_sampler')
+
+
+class ActiveQuestionPool:
+    """
+    Per-process pool of active question ids backed by a compact `array`.
+
+    The pool is rebuilt lazily whenever the shared pool version changes
+    (see `invalidate_question_pool`) or it becomes older than
+    POOL_MAX_AGE_SECONDS.
+    """
+
+    def __init__(self):
+        self._ids = array('q')
+        self._version = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_stale(self, version):
+        return (
+            version != self._version
+            or time.monotonic() - self._loaded_at > POOL_MAX_AGE_SECONDS
+        )
+
+    def ids(self) -> array:
+        version = sampler_cache.get(POOL_VERSION_CACHE_KEY)
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    self._ids = array(
+                        'q',
+                        Question.objects
+                        .filter(is_active=True)
+                        .order_by()
+                        .values_list('id', flat=True)
+                        .iterator(chunk_size=10000)
+                    )
+                    self._version = version
+                    self._loaded_at = time.monotonic()
+        return self._ids
+
+    def clear(self):
+        with self._lock:
+            self._ids = array('q')
+            self._version = None
+            self._loaded_at = 0.0
+
+
+question_pool = ActiveQuestionPool()
+
+
+def invalidate_question_pool():
+    """
+    Bump the shared pool version so every process rebuilds its pool
+    on the next draw. Called whenever `Question.is_active` may have changed.
+    """
+    sampler_cache.set(POOL_VERSION_CACHE_KEY, time.time_ns(), None)
+
+
+def get_seen_question_ids(journey_id) -> set:
+    """
+    Return the ids of the questions already shown in the journey.
+    Served from the cache; falls back to a single query on a miss.
+    """
+    key = SEEN_CACHE_KEY.format(journey_id=journey_id)
+    seen = sampler_cache.get(key)
+    if seen is None:
+        from apps.journies.models import JourneyStep
+
+        seen = list(
+            JourneyStep.objects
+            .filter(journey_id=journey_id, question_id__isnull=False)
+            .order_by()
+            .values_list('question_id', flat=True)
+        )
+        sampler_cache.set(key, seen, SEEN_CACHE_TIMEOUT)
+    return set(seen)
+
+
+def mark_question_seen(journey_id, question_id, seen=None):
+    """
+    Add `question_id` to the journey's cached seen-set.
+    """
+    if seen is None:
+        seen = get_seen_question_ids(journey_id)
+    seen.add(question_id)
+    sampler_cache.set(
+        SEEN_CACHE_KEY.format(journey_id=journey_id),
+        list(seen),
+        SEEN_CACHE_TIMEOUT
+    )
+
+
+def draw_question_id(journey_id, seen=None):
+    """
+    Pick a random active question the journey has not seen yet.
+
+    Rejection sampling over the pool gives O(1) expected time while the
+    seen-set is small compared to the pool; once most of the pool is used
+    up it falls back to scanning the remaining ids.
+    Returns None when every active question has already been shown.
+    """
+    pool = question_pool.ids()
+    if not pool:
+        return None
+    if seen is None:
+        seen = get_seen_question_ids(journey_id)
+
+    pool_size = len(pool)
+    if len(seen) < pool_size:
+        for _ in range(MAX_REJECTIONS):
+            question_id = pool[random.randrange(pool_size)]
+            if question_id not in seen:
+                return question_id
+
+    remaining = [question_id for question_id in pool if question_id not in seen]
+    if not remaining:
+        return None
+    return random.choice(remaining)
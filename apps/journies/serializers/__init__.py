@@ -1,5 +1,6 @@
 from .user import (
     JourneyStepAnswerSerializer,
+    JourneyStepBatchAnswerSerializer,
     QuestionSerializer,
     JourneyCreateSerializer,
     JourneyFinishSerializer,
@@ -15,11 +16,13 @@ from .user import (
     JourneySerializer,
     JourneyTemplateSerializer,
     UserJourneySummarySerializer,
-    CurrentTimeSerializer
+    CurrentTimeSerializer,
+    GroupExamLeaderboardSerializer
 )
 
 __all__ = [
     JourneyStepAnswerSerializer,
+    JourneyStepBatchAnswerSerializer,
     QuestionSerializer,
     JourneyCreateSerializer,
     JourneyFinishSerializer,
@@ -35,5 +38,6 @@ __all__ = [
     JourneySerializer,
     JourneyTemplateSerializer,
     UserJourneySummarySerializer,
-    CurrentTimeSerializer
+    CurrentTimeSerializer,
+    GroupExamLeaderboardSerializer
 ]
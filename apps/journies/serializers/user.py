@@ -10,9 +10,25 @@ from apps.journies.models import (
     JourneyStep,
     JourneyTemplate,
     JourneyStepTemplate,
+    SelectionModeChoices,
     StaticJourneyType,
     SubjectChoices
 )
+from apps.journies.admission import admit_group_exam_start
+from apps.journies.journey_counters import (
+    answer_delta,
+    apply_answer_change,
+    apply_answer_deltas,
+    initial_counters
+)
+from apps.journies.leaderboard import record_answer_delta, register_participant
+from apps.journies.tasks import finalize_journey
+from apps.journies.user_stats import invalidate_user_stats
+from apps.journies.template_snapshot import (
+    get_template,
+    get_template_question_ids,
+    materialize_journey_steps
+)
 from apps.questions.models import Question
 from apps.questions.serializers import QuestionSerializer
 from utils.exceptions import (
@@ -67,7 +83,7 @@ class JourneyCreateSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         # Assuming the current user is passed via context
         user = self.context["request"].user
-        journey = Journey.objects.create(user=user, **validated_data)
+        journey = Journey.objects.create(user=user, **validated_data, **initial_counters())
 
         return journey
 
@@ -138,6 +154,9 @@ class JourneyFinishSerializer(serializers.Serializer):
         journey.save(update_fields=[
             'finished_at',
         ])
+        invalidate_user_stats(journey.user_id)
+        if journey.journey_type != StaticJourneyType.GROUP_EXAM:
+            transaction.on_commit(lambda: finalize_journey.delay(journey.journey_id))
 
         return journey
 
@@ -226,21 +245,147 @@ class JourneyStepAnswerSerializer(serializers.Serializer):
         return instance
     def create(self, validated_data):
         journey_step = validated_data.pop('journey_step', None)
+        journey = journey_step.journey
 
         user_answer = validated_data['user_answer']
-        # answered_at = validated_data['answered_at']
-        journey_step.user_answer = user_answer
-        # journey_step.answered_at = answered_at
-        journey_step.update_computed_fields()
-        journey_step.save(update_fields=[
-            'user_answer',
-            # 'answered_at',
-            'answer_result',
-            # 'time_taken',
-        ])
+        with transaction.atomic():
+            # re-read the previous result under a row lock so concurrent
+            # submissions of the same step apply consistent deltas
+            previous_result = (
+                JourneyStep.objects
+                .select_for_update()
+                .values_list('answer_result', flat=True)
+                .get(pk=journey_step.pk)
+            )
+            journey_step.user_answer = user_answer
+            journey_step.answered_at = timezone.now()
+            journey_step.update_computed_fields()
+            journey_step.save(update_fields=[
+                'user_answer',
+                'answered_at',
+                'answer_result',
+                # 'time_taken',
+            ])
+            apply_answer_change(journey, previous_result, journey_step.answer_result)
+
+            if journey.journey_type == StaticJourneyType.GROUP_EXAM:
+                correct_delta, wrong_delta = answer_delta(
+                    previous_result, journey_step.answer_result
+                )
+                if correct_delta or wrong_delta:
+                    transaction.on_commit(lambda: record_answer_delta(
+                        journey.journey_static_id,
+                        journey.journey_id,
+                        correct_delta,
+                        wrong_delta
+                    ))
 
         return journey_step
 
+class JourneyStepBatchAnswerItemSerializer(serializers.Serializer):
+    step_id       = serializers.IntegerField()
+    user_answer   = serializers.CharField(
+        max_length=200,
+        allow_blank=True,
+        allow_null=True,
+        required=False,
+    )
+    true_choice   = serializers.CharField(source='question.true_choice', read_only=True)
+    answer        = serializers.CharField(source='question.answer', read_only=True)
+    answer_result = serializers.CharField(read_only=True)
+
+
+class JourneyStepBatchAnswerSerializer(serializers.Serializer):
+    """
+    Several answers of one journey at once, e.g. the answers a client
+    queued while offline. The journey's ownership and activeness are
+    checked once, the steps are read in one query and saved with one
+    bulk_update. When a step appears more than once the last answer wins.
+    """
+    MAX_ANSWERS = 200
+
+    journey_id = serializers.IntegerField()
+    answers    = JourneyStepBatchAnswerItemSerializer(many=True, min_length=1, max_length=MAX_ANSWERS)
+
+    def validate(self, data):
+        journey = (
+            Journey.objects
+            .select_related('journey_static')
+            .filter(journey_id=data['journey_id'], user=self.context['request'].user)
+            .first()
+        )
+        if journey is None or not journey.is_active():
+            raise CustomNotFoundError("journey does not exist...")
+        template = journey.journey_static
+        if template and template.start_datetime:
+            deadline = template.start_datetime + timedelta(
+                minutes=template.time_minutes_limit or 0
+            )
+            if timezone.now() > deadline:
+                raise CustomValidationError(
+                    "the group_exam has finished"
+                )
+        data['journey'] = journey
+        return data
+
+    def create(self, validated_data):
+        journey = validated_data['journey']
+        answers = {
+            answer['step_id']: answer.get('user_answer')
+            for answer in validated_data['answers']
+        }
+        answered_at = timezone.now()
+        with transaction.atomic():
+            # the steps are locked so concurrent submissions of the same
+            # steps apply consistent deltas
+            journey_steps = list(
+                JourneyStep.objects
+                .select_for_update(of=('self',))
+                .select_related('question')
+                .only(
+                    'step_id',
+                    'journey_id',
+                    'user_answer',
+                    'answer_result',
+                    'answered_at',
+                    'question__true_choice',
+                    'question__answer',
+                )
+                .filter(journey=journey, step_id__in=answers)
+                .order_by('step_id')
+            )
+            if len(journey_steps) != len(answers):
+                raise CustomNotFoundError("journey step does not exist...")
+
+            correct_delta = wrong_delta = 0
+            for journey_step in journey_steps:
+                previous_result = journey_step.answer_result
+                journey_step.user_answer = answers[journey_step.step_id]
+                journey_step.answered_at = answered_at
+                journey_step.update_computed_fields()
+                step_correct_delta, step_wrong_delta = answer_delta(
+                    previous_result, journey_step.answer_result
+                )
+                correct_delta += step_correct_delta
+                wrong_delta += step_wrong_delta
+
+            JourneyStep.objects.bulk_update(
+                journey_steps,
+                ['user_answer', 'answered_at', 'answer_result']
+            )
+            apply_answer_deltas(journey, correct_delta, wrong_delta)
+
+            if journey.journey_type == StaticJourneyType.GROUP_EXAM and (correct_delta or wrong_delta):
+                transaction.on_commit(lambda: record_answer_delta(
+                    journey.journey_static_id,
+                    journey.journey_id,
+                    correct_delta,
+                    wrong_delta
+                ))
+
+        return {'journey_id': journey.journey_id, 'answers': journey_steps}
+
+
 # class JourneyStepAnswerSerializer(serializers.ModelSerializer):
 #     """
 #     Serializer for updating a JourneyStep with the user's answer.
@@ -288,19 +433,23 @@ class CreateJourneyTemplateSerializer(serializers.Serializer):
     def validate(self, data):
         user = self.context["request"].user
         journey_template_id = data['journey_template_id']
-        journey_template = get_object_or_404(JourneyTemplate, pk=journey_template_id)
+        # served from the pre-warmed snapshot when available
+        journey_template = get_template(journey_template_id)
 
         if journey_template.journey_type == StaticJourneyType.GROUP_EXAM:
-            if Journey.objects.filter(user=user, journey_static=journey_template).exists():
-                raise CustomValidationError({
-                    'journey_template_id': 'A journey from this template already exists for your account.'
-                })
             now = timezone.now()
             deadline = journey_template.start_datetime + timedelta(minutes=journey_template.time_minutes_limit)
             if (now >= deadline) or (now < journey_template.start_datetime):
                 raise CustomValidationError({
                     'message': 'no proper time to start journey'
                 })
+            # smooth the start_datetime spike before touching the database:
+            # an over-rate start gets its 429 without a single query
+            admit_group_exam_start(journey_template.pk)
+            if Journey.objects.filter(user=user, journey_static=journey_template).exists():
+                raise CustomValidationError({
+                    'journey_template_id': 'A journey from this template already exists for your account.'
+                })
 
         data['journey_template'] = journey_template
         return data
@@ -313,26 +462,28 @@ class CreateJourneyTemplateSerializer(serializers.Serializer):
             if journey_template.journey_type == StaticJourneyType.GROUP_EXAM:
                 finished_at = journey_template.start_datetime + timedelta(minutes=journey_template.time_minutes_limit)
 
+            question_ids = get_template_question_ids(journey_template.pk)
             journey = Journey.objects.create(
                 user=user,
                 journey_type=journey_template.journey_type,
                 journey_static=journey_template,
-                finished_at=finished_at
-            )
-
-            # here’s the eager-loading:
-            step_templates = (
-                JourneyStepTemplate.objects
-                .filter(journey_template=journey_template)
-                .select_related("question")
+                finished_at=finished_at,
+                **initial_counters(len(question_ids))
             )
 
-
-            for step_template in step_templates:
-                journey_step = JourneyStep.objects.create(
-                    journey=journey,
-                    question=step_template.question
+            # one INSERT for every step, from the cached question-id vector
+            journey_steps = materialize_journey_steps(journey, question_ids)
+            if journey_steps:
+                journey.last_seen_journey_step = journey_steps[0]
+                Journey.objects.filter(pk=journey.pk).update(
+                    last_seen_journey_step=journey_steps[0]
                 )
+            invalidate_user_stats(user.pk)
+            if journey_template.journey_type == StaticJourneyType.GROUP_EXAM:
+                transaction.on_commit(lambda: register_participant(
+                    journey_template.pk,
+                    journey.journey_id
+                ))
             return journey
 
         return None
@@ -353,11 +504,23 @@ class StartJourneyGeneralSerializer(serializers.Serializer):
         allow_null=True,    # lets None pass
         required=False,
     )
+    selection_mode       = serializers.ChoiceField(
+        choices=SelectionModeChoices.choices,
+        required=False,
+    )
     # journey_static       = serializers.IntegerField(
     #     allow_null=True,    # lets None pass
     #     required=False,
     # )
 
+    def validate(self, data):
+        if (
+            data.get('selection_mode') == SelectionModeChoices.ADAPTIVE
+            and data.get('journey_type') not in (None, '', StaticJourneyType.TRAINING)
+        ):
+            raise CustomValidationError("Adaptive selection is only available for training journeys.")
+        return data
+
     # def validate(self, data):
     #     journey_template_id = data['journey_static']
     #     if journey_static:
@@ -368,7 +531,7 @@ class StartJourneyGeneralSerializer(serializers.Serializer):
         # Assuming the current user is passed via context
         user = self.context["request"].user
         # journey_static = validated_data.get("journey_static", None)
-        journey = Journey.objects.create(user=user, **validated_data)
+        journey = Journey.objects.create(user=user, **validated_data, **initial_counters())
         # if journey_static:
         #     # here’s the eager-loading:
         #     step_templates = (
@@ -430,6 +593,20 @@ class JourneySerializer(serializers.ModelSerializer):
             return obj.journey_static.pk
         return None
 
+class LeaderboardEntrySerializer(serializers.Serializer):
+    journey_id    = serializers.IntegerField()
+    rank          = serializers.IntegerField(help_text="Provisional dense rank")
+    score         = serializers.FloatField(help_text="Provisional score (0-100)")
+    correct_count = serializers.IntegerField()
+    wrong_count   = serializers.IntegerField()
+
+
+class GroupExamLeaderboardSerializer(serializers.Serializer):
+    participants = serializers.IntegerField()
+    me           = LeaderboardEntrySerializer(allow_null=True)
+    top          = LeaderboardEntrySerializer(many=True)
+
+
 class JourneyTemplateSerializer(serializers.ModelSerializer):
     # Include human-readable label if desired
     journey_type_display = serializers.CharField(source='get_journey_type_display', read_only=True)
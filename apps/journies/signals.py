@@ -1,11 +1,15 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.conf import settings
 from django.dispatch import receiver
 from django.utils import timezone
 from celery.result import AsyncResult
 from datetime import timedelta
 
-from .models import JourneyTemplate
-from .tasks import process_journey_template
+from apps.questions.models import Question
+
+from .models import JourneyTemplate, JourneyStepTemplate, StaticJourneyType
+from .tasks import process_journey_template, prewarm_journey_template
+from .template_snapshot import invalidate_template_snapshot
 
 @receiver(post_save, sender=JourneyTemplate)
 def schedule_journey_task(sender, instance, **kwargs):
@@ -16,7 +20,12 @@ def schedule_journey_task(sender, instance, **kwargs):
           – Cancel any previously queued task for this instance.
           – Enqueue a fresh Celery task to fire at the new time.
           – Store the new task’s ID back on the model (via update()).
+      • For group exams, also enqueue the snapshot pre-warm shortly
+        before start_datetime.
     """
+    # The cached snapshot describes the previous version of the template.
+    invalidate_template_snapshot(instance.pk)
+
     # ────────────────────────────────────────────────────────────────────────
     # A) Calculate when the task should actually run:
     if instance.start_datetime and instance.time_minutes_limit:
@@ -48,8 +57,47 @@ def schedule_journey_task(sender, instance, **kwargs):
     )
 
     # ────────────────────────────────────────────────────────────────────────
-    # E) Update the model with the new task ID:
+    # E) Pre-warm the template snapshot before a group exam opens
+    #    (an ETA in the past makes Celery run it right away):
+    if instance.journey_type == StaticJourneyType.GROUP_EXAM:
+        prewarm_journey_template.apply_async(
+            args=(instance.id,),
+            eta=instance.start_datetime - timedelta(seconds=settings.GROUP_EXAM_PREWARM_SECONDS)
+        )
+
+    # ────────────────────────────────────────────────────────────────────────
+    # F) Update the model with the new task ID:
     # JourneyTemplate.objects.filter(pk=instance.pk).update(
     #     scheduled_time=sched,
     #     celery_task_id=result.id
     # )
+
+
+@receiver(post_save, sender=JourneyStepTemplate)
+@receiver(post_delete, sender=JourneyStepTemplate)
+def invalidate_template_on_step_change(sender, instance, **kwargs):
+    """
+    Drop the cached snapshot (question-id vector, first question) of the
+    template whenever one of its steps is added, changed or removed.
+    """
+    invalidate_template_snapshot(instance.journey_template_id)
+
+
+@receiver(post_save, sender=Question)
+@receiver(pre_delete, sender=Question)
+def invalidate_templates_on_question_change(sender, instance, **kwargs):
+    """
+    The snapshot holds the serialized first question of a template, so an
+    edited (or deleted) question makes the snapshots of the templates
+    containing it stale. pre_delete: the steps still point at the question.
+    """
+    if kwargs.get('created'):
+        return
+    template_ids = (
+        JourneyStepTemplate.objects
+        .filter(question_id=instance.pk)
+        .values_list('journey_template_id', flat=True)
+        .distinct()
+    )
+    for template_id in template_ids:
+        invalidate_template_snapshot(template_id)
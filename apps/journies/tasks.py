@@ -3,11 +3,26 @@ from celery import shared_task
 from django.utils import timezone
 from apps.journies.models import JourneyTemplate
 from apps.journies.group_exam_result import calculate_group_exam_result
+from apps.journies import journey_finalizer
+from apps.journies.template_snapshot import prewarm_template_snapshot
+
 
 @shared_task
+def prewarm_journey_template(template_id):
+    """
+    Fires shortly before a group exam's start_datetime and loads the
+    template snapshot into the shared cache.
+    """
+    print(f"[task] prewarm_journey_template({template_id}) @ {timezone.now()}", flush=True)
+    return prewarm_template_snapshot(template_id)
+
+
+@shared_task(acks_late=True, reject_on_worker_lost=True)
 def process_journey_template(template_id):
     """
     This will fire at template.scheduled_time.
+    Acknowledged only once it finishes, so a crashed worker gets the task
+    redelivered and a chunked computation resumes from its checkpoint.
     """
     print(f"[task] process_journey_template({template_id}) @ {timezone.now()}", flush=True)
     # try:
@@ -34,3 +49,21 @@ def process_journey_template(template_id):
     # else:
     #     jt.result_operation_status = 'failed'
     #     jt.save(update_fields=['result_operation_status'])
+
+
+@shared_task
+def finalize_journey(journey_id):
+    """
+    Queued (on commit) when a journey is finished explicitly.
+    """
+    return journey_finalizer.finalize_journey(journey_id)
+
+
+@shared_task
+def sweep_expired_journeys():
+    """
+    Periodic: close time-limited journeys whose deadline passed unnoticed.
+    """
+    closed = journey_finalizer.sweep_expired_journeys()
+    print(f"[task] sweep_expired_journeys closed {closed} journeys @ {timezone.now()}", flush=True)
+    return closed
@@ -0,0 +1,114 @@
+from django.http import Http404
+
+from apps.journies.models import JourneyStep, JourneyStepTemplate, JourneyTemplate
+from apps.questions.models import Question
+from apps.questions.serializers import QuestionSerializer
+from utils.cache import CacheNamespace
+
+TEMPLATE_CACHE_KEY = '{template_id}'
+TEMPLATE_QUESTION_IDS_CACHE_KEY = '{template_id}:question_ids'
+TEMPLATE_FIRST_QUESTION_CACHE_KEY = '{template_id}:first_question'
+TEMPLATE_CACHE_TIMEOUT = 60 * 60 * 24
+
+template_cache = CacheNamespace('journey_template', timeout=TEMPLATE_CACHE_TIMEOUT)
+
+TEMPLATE_SNAPSHOT_FIELDS = (
+    'id',
+    'name',
+    'time_minutes_limit',
+    'start_datetime',
+    'journey_type',
+    'result_mode',
+)
+
+
+def get_template(template_id) -> JourneyTemplate:
+    """
+    Return the JourneyTemplate from the shared cache, loading it on a miss.
+    Raises Http404 like get_object_or_404 when the template does not exist.
+    """
+    key = TEMPLATE_CACHE_KEY.format(template_id=template_id)
+    fields = template_cache.get(key)
+    if fields is None:
+        fields = (
+            JourneyTemplate.objects
+            .filter(pk=template_id)
+            .values(*TEMPLATE_SNAPSHOT_FIELDS)
+            .first()
+        )
+        if fields is None:
+            raise Http404('No JourneyTemplate matches the given query.')
+        template_cache.set(key, fields)
+    return JourneyTemplate(**fields)
+
+
+def get_template_question_ids(template_id) -> list:
+    """
+    Return the ordered question ids of a JourneyTemplate.
+    The vector is cached so starting an exam does not re-read the template.
+    """
+    key = TEMPLATE_QUESTION_IDS_CACHE_KEY.format(template_id=template_id)
+    question_ids = template_cache.get(key)
+    if question_ids is None:
+        question_ids = list(
+            JourneyStepTemplate.objects
+            .filter(journey_template_id=template_id)
+            .order_by('id')
+            .values_list('question_id', flat=True)
+        )
+        template_cache.set(key, question_ids)
+    return question_ids
+
+
+def get_first_question_data(template_id):
+    """
+    Return the serialized first question of the template (QuestionSerializer),
+    or None when the template has no question.
+    """
+    key = TEMPLATE_FIRST_QUESTION_CACHE_KEY.format(template_id=template_id)
+    data = template_cache.get(key)
+    if data is None:
+        question_ids = get_template_question_ids(template_id)
+        question = None
+        if question_ids and question_ids[0] is not None:
+            question = Question.objects.filter(pk=question_ids[0]).first()
+        if question is None:
+            return None
+        data = dict(QuestionSerializer(question).data)
+        template_cache.set(key, data)
+    return data
+
+
+def invalidate_template_snapshot(template_id):
+    template_cache.delete_many([
+        TEMPLATE_CACHE_KEY.format(template_id=template_id),
+        TEMPLATE_QUESTION_IDS_CACHE_KEY.format(template_id=template_id),
+        TEMPLATE_FIRST_QUESTION_CACHE_KEY.format(template_id=template_id),
+    ])
+
+
+def prewarm_template_snapshot(template_id) -> bool:
+    """
+    Load the template, its ordered question ids and its serialized first
+    question into the shared cache ahead of a group exam start.
+    Returns False if the template no longer exists.
+    """
+    invalidate_template_snapshot(template_id)
+    try:
+        get_template(template_id)
+    except Http404:
+        return False
+    get_template_question_ids(template_id)
+    get_first_question_data(template_id)
+    return True
+
+
+def materialize_journey_steps(journey, question_ids) -> list:
+    """
+    Create all steps of a template journey with a single bulk INSERT.
+    Returns the created steps in template order (primary keys populated).
+    """
+    return JourneyStep.objects.bulk_create([
+        JourneyStep(journey=journey, question_id=question_id)
+        for question_id in question_ids
+    ])
@@ -1,3 +1,79 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.accounts.models import User, RoleTextChoices
+from apps.accounts.otp import create_token_for_user
+from apps.journies.models import Journey, JourneyStep, JourneyTemplate, UserAnswer
+from apps.questions.models import Question
+from utils.query_budget import assert_endpoint_within_budget
+
+
+def authenticated_client(user):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + create_token_for_user(user)['access'])
+    return client
+
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# setUp clears the cache, which must never be the shared Redis
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryBudgetTests(TestCase):
+    """
+    The endpoints must stay within their settings.QUERY_BUDGETS entry
+    however many rows they return, so each list holds several rows.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create(
+            phone_number='09120000001', role=RoleTextChoices.STUDENT, is_active=True
+        )
+        cls.questions = []
+        for index in range(5):
+            question = Question.objects.create(
+                text_body=f'question {index}',
+                choice_1='a', choice_2='b', choice_3='c', choice_4='d',
+                true_choice='choice_1',
+            )
+            cls.questions.append(question)
+        template = JourneyTemplate.objects.create(name='template')
+
+        cls.journeys = []
+        for index in range(3):
+            journey = Journey.objects.create(
+                user=cls.student,
+                journey_static=template if index == 0 else None,
+            )
+            steps = JourneyStep.objects.bulk_create([
+                JourneyStep(
+                    journey=journey,
+                    question=question,
+                    user_answer='choice_1',
+                    answer_result=UserAnswer.CORRECT,
+                )
+                for question in cls.questions
+            ])
+            journey.last_seen_journey_step = steps[-1]
+            journey.save(update_fields=['last_seen_journey_step'])
+            cls.journeys.append(journey)
+
+    def setUp(self):
+        cache.clear()
+        self.client = authenticated_client(self.student)
+
+    def test_overall_report_budget(self):
+        response = assert_endpoint_within_budget(self.client, 'get', 'overall-report')
+        self.assertEqual(response.status_code, 200)
+
+    def test_journey_list_budget(self):
+        response = assert_endpoint_within_budget(self.client, 'get', 'journey-list')
+        self.assertEqual(response.status_code, 200)
+
+    def test_journey_detail_budget(self):
+        response = assert_endpoint_within_budget(
+            self.client, 'get', 'journey-detail',
+            kwargs={'journey_id': self.journeys[0].journey_id}
+        )
+        self.assertEqual(response.status_code, 200)
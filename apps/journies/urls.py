@@ -5,6 +5,7 @@ from apps.journies.views import (
     StartJourneyAPIView,
     CreateNextQuestionAPIView,
     SubmitAnswerAPIView,
+    SubmitAnswersBatchAPIView,
     FinishJourneyAPIView,
     JourneyDetailAPIView,
     GetQuestionAPIView,
@@ -18,7 +19,8 @@ from apps.journies.views import (
     JourneyTemplateExamListAPIView,
     JourneyTemplateGroupExamAPIView,
     UserJourneySummaryListAPIView,
-    CurrentTimeAPIView
+    CurrentTimeAPIView,
+    GroupExamLeaderboardAPIView
 )
 
 
@@ -30,6 +32,7 @@ urlpatterns = [
     path('journey/<int:journey_id>/create-next-question/<int:current_journey_step_id>', CreateNextQuestionAPIView.as_view(), name='next-question'),
     # path('journey/step/<int:step_id>/submit-answer/', SubmitAnswerAPIView.as_view(), name='submit-answer'),
     path('user/journey/step/submit-answer/', SubmitAnswerAPIView.as_view(), name='submit-answer'),
+    path('user/journey/step/submit-answers/', SubmitAnswersBatchAPIView.as_view(), name='submit-answers'),
     # path('journey/<int:journey_id>/finish', FinishJourneyAPIView.as_view(), name='finish-journey'),
     path('journey/finish/', FinishJourneyAPIView.as_view(), name='finish-journey'),
     # path('user/journeies/', UserJourniesListAPIView.as_view(), name='user-journey-list'),
@@ -42,7 +45,8 @@ urlpatterns = [
     path('', include(router.urls)),
     path('journey/template/exam/list/', JourneyTemplateExamListAPIView.as_view(), name='exam-list'),
     path('journey/template/group-exam/list',JourneyTemplateGroupExamAPIView.as_view(), name='group-exam-list'),
-    path('journey/current-time/', CurrentTimeAPIView.as_view(), name='current-time')
+    path('journey/current-time/', CurrentTimeAPIView.as_view(), name='current-time'),
+    path('journey/group-exam/<int:journey_template_id>/leaderboard/', GroupExamLeaderboardAPIView.as_view(), name='group-exam-leaderboard'),
     # path(
     #     'journeys/summary/',
     #     UserJourneySummaryListAPIView.as_view(),
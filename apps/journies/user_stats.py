@@ -0,0 +1,62 @@
+"""
+Overall statistics of a user's journeys (OverallReportAPIView).
+
+The statistics are one aggregate over the journeys' answer counters, so
+they cost a single query whatever the history length, and are cached per
+user. Every write that changes a counter or a finished_at invalidates the
+user's entry once its transaction commits.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.journies.models import Journey
+from utils.cache import CacheNamespace
+
+USER_STATS_CACHE_TIMEOUT = 60 * 60 * 24
+
+user_stats_cache = CacheNamespace('user_stats', timeout=USER_STATS_CACHE_TIMEOUT)
+
+
+def compute_user_stats(user_id) -> dict:
+    totals = Journey.objects.filter(user_id=user_id).aggregate(
+        answered=Coalesce(Sum('answered_count'), 0),
+        unanswered=Coalesce(Sum('unanswered_count'), 0),
+        true_answers=Coalesce(Sum('correct_count'), 0),
+        false_answers=Coalesce(Sum('wrong_count'), 0),
+        total_time=Coalesce(
+            Sum(
+                ExpressionWrapper(F('finished_at') - F('created_at'), output_field=DurationField()),
+                filter=Q(finished_at__isnull=False)
+            ),
+            Value(timedelta())
+        ),
+    )
+    return {
+        'total_questions': totals['answered'] + totals['unanswered'],
+        'true_answers': totals['true_answers'],
+        'false_answers': totals['false_answers'],
+        'unanswered': totals['unanswered'],
+        'total_hours': round(totals['total_time'].total_seconds() / 3600, 2),
+    }
+
+
+def get_user_stats(user_id) -> dict:
+    stats = user_stats_cache.get(user_id)
+    if stats is None:
+        stats = compute_user_stats(user_id)
+        user_stats_cache.set(user_id, stats)
+    return stats
+
+
+def invalidate_user_stats(*user_ids):
+    """
+    Drop the cached statistics of the users once the current transaction
+    commits (immediately outside a transaction), so a concurrent reader
+    cannot cache the pre-commit values again.
+    """
+    user_ids = set(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: user_stats_cache.delete_many(user_ids))
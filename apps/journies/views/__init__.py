@@ -2,6 +2,7 @@ from .user import (
     StartJourneyAPIView,
     CreateNextQuestionAPIView,
     SubmitAnswerAPIView,
+    SubmitAnswersBatchAPIView,
     FinishJourneyAPIView,
     UserJourniesListAPIView,
     JourneyDetailAPIView,
@@ -15,13 +16,15 @@ from .user import (
     JourneyTemplateExamListAPIView,
     JourneyTemplateGroupExamAPIView,
     UserJourneySummaryListAPIView,
-    CurrentTimeAPIView
+    CurrentTimeAPIView,
+    GroupExamLeaderboardAPIView
 )
 
 __all__ = [
     StartJourneyAPIView,
     CreateNextQuestionAPIView,
     SubmitAnswerAPIView,
+    SubmitAnswersBatchAPIView,
     FinishJourneyAPIView,
     UserJourniesListAPIView,
     JourneyDetailAPIView,
@@ -35,5 +38,6 @@ __all__ = [
     JourneyTemplateExamListAPIView,
     JourneyTemplateGroupExamAPIView,
     UserJourneySummaryListAPIView,
-    CurrentTimeAPIView
+    CurrentTimeAPIView,
+    GroupExamLeaderboardAPIView
 ]
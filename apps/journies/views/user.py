@@ -1,5 +1,7 @@
 from datetime import timedelta
 
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.db.models import Count, Q
 from django.utils import timezone
@@ -21,6 +23,7 @@ from rest_framework.views import APIView
 from apps.journies.next_journey_step import  get_next_journey_step
 from apps.journies.serializers  import (
     JourneyStepAnswerSerializer,
+    JourneyStepBatchAnswerSerializer,
     QuestionSerializer,
     JourneyCreateSerializer,
     JourneyFinishSerializer,
@@ -36,7 +39,8 @@ from apps.journies.serializers  import (
     JourneySerializer,
     JourneyTemplateSerializer,
     UserJourneySummarySerializer,
-    CurrentTimeSerializer
+    CurrentTimeSerializer,
+    GroupExamLeaderboardSerializer
 )
 from utils.permissions import IsStudentPermission
 from apps.journies.models import (
@@ -46,8 +50,17 @@ from apps.journies.models import (
     JourneyTemplate,
     JourneyStepTemplate,
 )
-from apps.journies.paginations import CustomPagination
+from apps.journies.paginations import CustomPagination, JourneyListPagination
 from apps.journies.serializers.user import JourneyStepSerializer
+from apps.journies.template_snapshot import (
+    get_first_question_data,
+    get_template,
+    get_template_question_ids
+)
+from apps.journies.journey_counters import COUNTER_FIELDS, add_steps, recount_journeys
+from apps.journies.leaderboard import get_leaderboard, score_of
+from apps.journies.user_stats import get_user_stats
+from utils.exceptions import CustomNotFoundError, CustomServiceUnavailableError
 
 
 class StartJourneyAPIView(APIView):
@@ -81,7 +94,9 @@ class StartJourneyAPIView(APIView):
             if not next_question:
                 return Response({"detail": "No available question."}, status=status.HTTP_400_BAD_REQUEST)
             # Create a JourneyStep for the first question.
-            journey_step = JourneyStep.objects.create(journey=journey, question=next_question)
+            with transaction.atomic():
+                journey_step = JourneyStep.objects.create(journey=journey, question=next_question)
+                add_steps(journey)
             # journey_step_data = JourneyStepSerializer(journey_step).data
             first_question = QuestionSerializer(next_question).data
             return Response({
@@ -118,50 +133,20 @@ class FinishJourneyAPIView(APIView):
                 return Response({"message":"Group exam finished successful"}, status=status.HTTP_204_NO_CONTENT)
 
 
-            if journey.finished_at and journey.finished_at <= now and journey.answered_count is None:
-                last = journey.last_seen_journey_step
-                if last:
-                    # a) count up through last_seen_journey_step
-                    agg = (
-                        JourneyStep.objects
-                        .filter(journey=journey, step_id__lte=last.step_id)
-                        .aggregate(
-                            total_questions = Count('pk'),
-                            true_answers    = Count('pk', filter=Q(user_answer=F('question__true_choice'))),
-                            unanswered      = Count('pk', filter=Q(user_answer__isnull=True)),
-                            false_answers   = Count('pk', filter=~Q(user_answer__isnull=True) &
-                                                        ~Q(user_answer=F('question__true_choice'))),
-                        )
-                    )
-                    total_q    = agg['total_questions']
-                    unanswered = agg['unanswered']
-                    true_ans   = agg['true_answers']
-                    false_ans  = agg['false_answers']
-
-                    # b) if it’s an exam, adjust unanswered against all available steps
-                    if journey.journey_type == StaticJourneyType.EXAM:
-                        total_available = JourneyStep.objects.filter(journey=journey).count()
-                        unanswered = total_available - total_q + unanswered
-                        total_q = total_available
-
-
-                    # c) populate the Journey fields
-                    journey.answered_count   = true_ans + false_ans
-                    journey.unanswered_count = unanswered
-                    journey.correct_count    = true_ans
-                    journey.wrong_count      = false_ans
-                    journey.save(update_fields=[
-                        'answered_count', 'unanswered_count',
-                        'correct_count',  'wrong_count'
-                    ])
+            if journey.finished_at and journey.finished_at <= now:
+                # the counters are maintained on every submission; only
+                # journeys started before they existed need a recount
+                if journey.answered_count is None:
+                    recount_journeys(Journey.objects.filter(pk=journey.pk))
+                    journey.refresh_from_db(fields=COUNTER_FIELDS)
 
                 response_data = {
                     'journey_id': journey.journey_id,
                     'result': {
-                        'total_questions' : total_q,
-                        'true_answers'    : true_ans,
-                        'false_answers'   : false_ans,
-                        'unanswered'      : unanswered,
+                        'total_questions' : journey.answered_count + journey.unanswered_count,
+                        'true_answers'    : journey.correct_count,
+                        'false_answers'   : journey.wrong_count,
+                        'unanswered'      : journey.unanswered_count,
                         'finished_at'     : journey.finished_at,
                         'created_at'      : journey.created_at,
                         'subject'         : journey.subject,
@@ -269,6 +254,35 @@ class SubmitAnswerAPIView(APIView):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class SubmitAnswersBatchAPIView(APIView):
+    """
+    POST endpoint for submitting several answers of one journey at once,
+    e.g. the answers a client on a poor connection queued and replays.
+    The batch is saved entirely or not at all.
+    """
+    permission_classes = [
+        IsStudentPermission
+    ]
+
+    @extend_schema(
+        summary="Submiting a batch of answers of one journey",
+        tags=["Answer"],
+        request=JourneyStepBatchAnswerSerializer,
+        responses={
+            200: OpenApiResponse(
+                JourneyStepBatchAnswerSerializer,
+                description="the saved answers with their results"
+            ),
+            400: OpenApiResponse(description="Invalid or Bad Request"),
+            404: OpenApiResponse(description="Journey not found, not active, or a step is not in it"),
+        },
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = JourneyStepBatchAnswerSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 class UserJourniesListAPIView(APIView):
     permission_classes = [
         IsStudentPermission
@@ -314,14 +328,14 @@ class JourneyDetailAPIView(generics.RetrieveAPIView):
         },
     )
     def get(self, request, journey_id):
-        journey = get_object_or_404(Journey, journey_id=journey_id, user=request.user)
-        journey_steps = JourneyStep.objects.filter(journey=journey)
+        journey = get_object_or_404(
+            Journey.objects.select_related('journey_static', 'last_seen_journey_step__question'),
+            journey_id=journey_id,
+            user=request.user
+        )
+        step_ids = JourneyStep.objects.filter(journey=journey).values_list('step_id', flat=True)
 
-        questions_data = []
-        for step in journey_steps:
-            questions_data.append({
-                'id': step.step_id,
-            })
+        questions_data = [{'id': step_id} for step_id in step_ids]
 
         last_question = None
 
@@ -436,47 +450,9 @@ class OverallReportAPIView(APIView):
         },
     )
     def get(self, request):
-        # Get all journeys for the user
-        user_journeys = Journey.objects.filter(user=request.user)
-
-        # Initialize counters
-        total_questions = 0
-        true_answers = 0
-        false_answers = 0
-        unanswered = 0
-        total_hours = timedelta()
-
-        # Process each journey
-        for journey in user_journeys:
-            # Get all steps for this journey
-            journey_steps = JourneyStep.objects.filter(journey=journey)
-
-            # Count answers for this journey
-            total_questions += journey_steps.count()
-            for step in journey_steps:
-                if step.user_answer is None:
-                    unanswered += 1
-                elif step.user_answer == step.question.true_choice:
-                    true_answers += 1
-                else:
-                    false_answers += 1
-
-            # Calculate time spent on this journey
-            if journey.finished_at:
-                journey_duration = journey.finished_at - journey.created_at
-                total_hours += journey_duration
-
-        # Convert total hours to hours (float)
-        total_hours_float = total_hours.total_seconds() / 3600
-
+        # one aggregate over the journeys' answer counters, cached per user
         response_data = {
-            'result': {
-                'total_questions': total_questions,
-                'true_answers': true_answers,
-                'false_answers': false_answers,
-                'unanswered': unanswered,
-                'total_hours': round(total_hours_float, 2)
-            }
+            'result': get_user_stats(request.user.pk)
         }
 
         return Response(response_data)
@@ -570,16 +546,18 @@ class CreateJourneyTemplateAPIView(APIView):
         serializer = CreateJourneyTemplateSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             journey = serializer.save()
-            journey_step = get_next_journey_step(journey.journey_id)
+            # the serializer already points last_seen_journey_step at the first step
+            journey_step = journey.last_seen_journey_step
             if not journey_step:
                 return Response({"detail": "No available step."}, status=status.HTTP_400_BAD_REQUEST)
 
-            journey.last_seen_journey_step = journey_step
-            journey.save(update_fields=['last_seen_journey_step'])
-
-            step_serialier = JourneyStepSerializer(journey_step)
+            # same shape as JourneyStepSerializer, question served from the template snapshot
             return Response(
-                step_serialier.data,
+                {
+                    'step_id': journey_step.step_id,
+                    'journey': journey.journey_id,
+                    'question': get_first_question_data(journey.journey_static_id),
+                },
                 status=status.HTTP_201_CREATED
             )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -627,70 +605,21 @@ class JourneyViewSet(viewsets.ReadOnlyModelViewSet):
     optionally filtered by journey_type.
     """
     serializer_class   = JourneySerializer
-    pagination_class   = CustomPagination
+    # ?pagination=cursor for keyset pages on (-created_at, journey_id)
+    pagination_class   = JourneyListPagination
     permission_classes = [IsStudentPermission]
     filter_backends    = [DjangoFilterBackend]
     filterset_fields   = ['journey_type']
 
     def get_queryset(self):
-        user = self.request.user
-        now  = timezone.now()
-
-        qs = Journey.objects.filter(user=user).order_by('-created_at')
-        to_update = []
-
-        for journey in qs:
-            if not (journey.journey_static and journey.journey_type == StaticJourneyType.GROUP_EXAM):
-                # Only act on truly finished journeys that haven't been computed yet
-                if journey.finished_at and journey.finished_at <= now and journey.answered_count is None:
-                    last = journey.last_seen_journey_step
-                    if not last:
-                        continue
-
-                    # 1) Count only up through last_seen_journey_step
-                    steps = JourneyStep.objects.filter(
-                        journey=journey,
-                        step_id__lte=last.step_id
-                    )
-                    agg = steps.aggregate(
-                        total_questions = Count('pk'),
-                        true_answers    = Count('pk', filter=Q(user_answer=F('question__true_choice'))),
-                        unanswered      = Count('pk', filter=Q(user_answer__isnull=True)),
-                        false_answers   = Count('pk', filter=~Q(user_answer__isnull=True) &
-                                                    ~Q(user_answer=F('question__true_choice'))),
-                    )
-
-                    total_q    = agg['total_questions']
-                    unanswered = agg['unanswered']
-                    true_ans   = agg['true_answers']
-                    false_ans  = agg['false_answers']
-
-                    # 2) If this is an exam, adjust unanswered based on all available steps
-                    if journey.journey_type == StaticJourneyType.EXAM:
-                        total_available = JourneyStep.objects.filter(journey=journey).count()
-                        # new_unanswered = total_available - total_q + unanswered
-                        unanswered = total_available - total_q + unanswered
-
-                    # 3) Populate model fields
-                    journey.answered_count   = true_ans + false_ans
-                    journey.unanswered_count = unanswered
-                    journey.correct_count    = true_ans
-                    journey.wrong_count      = false_ans
-
-                    to_update.append(journey)
-
-                    if to_update:
-                        Journey.objects.bulk_update(
-                            to_update,
-                            [
-                                'answered_count',
-                                'unanswered_count',
-                                'correct_count',
-                                'wrong_count',
-                            ]
-                        )
-
-        return qs
+        # results are finalized by the finalize_journey / sweep_expired_journeys
+        # tasks, so listing is a pure paginated read
+        return (
+            Journey.objects
+            .filter(user=self.request.user)
+            .select_related('journey_static', 'last_seen_journey_step')
+            .order_by('-created_at')
+        )
 
     @extend_schema(
         summary="List journeys by type",
@@ -716,6 +645,26 @@ class JourneyViewSet(viewsets.ReadOnlyModelViewSet):
                 location=OpenApiParameter.QUERY,
                 description="Number of items per page (max 100)",
             ),
+            OpenApiParameter(
+                name="pagination",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=["cursor"],
+                description="'cursor' for keyset pagination: follow the next / previous links instead of page numbers",
+            ),
+            OpenApiParameter(
+                name="cursor",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="Opaque cursor of the page (keyset pagination)",
+            ),
+            OpenApiParameter(
+                name="count",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=["exact", "approximate"],
+                description="Also return the total (keyset pagination); 'approximate' is estimated by PostgreSQL",
+            ),
         ],
         # document the possible responses:
         responses={
@@ -734,9 +683,11 @@ class JourneyViewSet(viewsets.ReadOnlyModelViewSet):
     def list(self, request, *args, **kwargs):
         """
         GET /journeys/?journey_type=<optional>&page=<n>&page_size=<m>
+        GET /journeys/?journey_type=<optional>&pagination=cursor&cursor=<c>
 
         If `journey_type` is present, only those journeys are returned.
-        Results are paginated according to your CustomPagination settings.
+        Results are paginated according to your CustomPagination settings,
+        or by keyset with `pagination=cursor`.
         """
         return super().list(request, *args, **kwargs)
 
@@ -878,3 +829,80 @@ class CurrentTimeAPIView(APIView):
         }
 
         return Response(CurrentTimeSerializer(time_data).data, status=status.HTTP_200_OK)
+
+
+class GroupExamLeaderboardAPIView(APIView):
+    """
+    GET the provisional standing of a running group exam: the requesting
+    participant's rank and the top-K, served from the live leaderboard.
+    Only participants of the exam get it (404 otherwise).
+    Final ranks are written to the journeys when the exam is processed.
+    """
+    permission_classes = [
+        IsStudentPermission
+    ]
+
+    @extend_schema(
+        summary="Live leaderboard of a group exam",
+        tags=["Journey"],
+        parameters=[
+            OpenApiParameter(
+                name='top',
+                description="Number of leading participants to return (default 10)",
+                required=False,
+                type=int
+            ),
+        ],
+        responses={
+            200: OpenApiResponse(
+                response=GroupExamLeaderboardSerializer,
+                description="provisional rank of the user and the top participants"
+            ),
+            404: OpenApiResponse(description="Group exam not found, or not taken by the user"),
+            503: OpenApiResponse(description="Leaderboard unavailable"),
+        },
+    )
+    def get(self, request, journey_template_id):
+        template = get_template(journey_template_id)
+        if template.journey_type != StaticJourneyType.GROUP_EXAM:
+            raise CustomNotFoundError("group exam does not exist...")
+        # only the exam's participants may see its standings
+        journey_id = (
+            Journey.objects
+            .filter(user=request.user, journey_static_id=template.pk)
+            .values_list('journey_id', flat=True)
+            .first()
+        )
+        if journey_id is None:
+            raise CustomNotFoundError("group exam does not exist...")
+        try:
+            top_limit = int(request.query_params.get('top', 10))
+        except ValueError:
+            raise ValidationError({'top': 'must be an integer'})
+        top_limit = max(0, min(top_limit, settings.LEADERBOARD_TOP_MAX))
+
+        total_questions = len(get_template_question_ids(template.pk)) or 1
+        leaderboard = get_leaderboard()
+        try:
+            participants = leaderboard.count(template.pk)
+            me = leaderboard.get_standing(template.pk, journey_id)
+            top = leaderboard.get_top(template.pk, top_limit) if top_limit else []
+        except Exception:
+            raise CustomServiceUnavailableError()
+
+        # the other participants are anonymous: no names, only their standing
+        def entry(standing):
+            return {
+                'journey_id': standing['journey_id'],
+                'rank': standing['rank'],
+                'score': score_of(standing['points'], total_questions),
+                'correct_count': standing['correct'],
+                'wrong_count': standing['wrong'],
+            }
+
+        data = {
+            'participants': participants,
+            'me': entry(me) if me else None,
+            'top': [entry(standing) for standing in top],
+        }
+        return Response(GroupExamLeaderboardSerializer(data).data, status=status.HTTP_200_OK)
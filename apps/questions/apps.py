@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class QuestionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.questions'
+
+    def ready(self):
+        # register the question signal handlers
+        import apps.questions.signals  # noqa
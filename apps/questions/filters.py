@@ -0,0 +1,37 @@
+import django_filters
+from django.db.models import Exists, OuterRef
+
+from apps.questions.models import Question, Tag
+
+
+class QuestionFilter(django_filters.FilterSet):
+    """
+    Operator question search: tag subtree, hardness range and active flag.
+    """
+    tag          = django_filters.ModelChoiceFilter(
+        queryset=Tag.objects.all(),
+        method='filter_tag_subtree',
+        label='Questions tagged with this tag or one of its descendants'
+    )
+    hardness_min = django_filters.NumberFilter(field_name='hardness', lookup_expr='gte')
+    hardness_max = django_filters.NumberFilter(field_name='hardness', lookup_expr='lte')
+    is_active    = django_filters.BooleanFilter()
+
+    class Meta:
+        model = Question
+        fields = ['tag', 'hardness_min', 'hardness_max', 'is_active']
+
+    def filter_tag_subtree(self, queryset, name, tag):
+        """
+        The descendants of a tag are the tags of its tree whose lft lies in
+        [tag.lft, tag.rght], so the whole subtree is one range condition
+        instead of a recursive walk.
+        """
+        return queryset.filter(Exists(
+            Question.tags.through.objects.filter(
+                question_id=OuterRef('pk'),
+                tag__tree_id=tag.tree_id,
+                tag__lft__gte=tag.lft,
+                tag__lft__lte=tag.rght,
+            )
+        ))
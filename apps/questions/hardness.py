@@ -0,0 +1,127 @@
+"""
+Set-based recalculation of Question.hardness.
+
+    hardness = (1 * correct + 5 * not selected + 10 * wrong) / steps
+
+(0 for a question that was never shown). Each chunk of questions is one
+UPDATE ... FROM over a grouped aggregate of their journey steps, so the
+database does the work and only rows whose hardness changed are written.
+
+The full mode walks the whole bank in primary-key ranges. The incremental
+mode only touches the questions with steps answered since the previous
+run (JourneyStep.answered_at, StatsWatermark "hardness"); new unanswered
+steps are picked up by the next full run.
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from apps.journies.models import JourneyStep
+from apps.questions.models import Question, StatsWatermark, UserAnswer
+
+HARDNESS_WATERMARK = 'hardness'
+# answers committed late (long transactions, clock skew) are still seen
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+HARDNESS_UPDATE_SQL = """
+UPDATE {question_table} q
+SET hardness = s.hardness,
+    hardness_updated_at = statement_timestamp()
+FROM (
+    SELECT qq.id AS question_id,
+           COALESCE(
+               SUM(
+                   CASE
+                       WHEN st.step_id IS NULL THEN NULL
+                       WHEN st.answer_result = %s THEN 1
+                       WHEN st.answer_result = %s THEN 5
+                       ELSE 10
+                   END
+               )::double precision / NULLIF(COUNT(st.step_id), 0),
+               0
+           ) AS hardness
+    FROM {question_table} qq
+    LEFT JOIN {step_table} st ON st.question_id = qq.id
+    WHERE {where}
+    GROUP BY qq.id
+) s
+WHERE q.id = s.question_id
+  AND q.hardness IS DISTINCT FROM s.hardness
+"""
+
+
+def _update_hardness(where, params) -> int:
+    sql = HARDNESS_UPDATE_SQL.format(
+        question_table=connection.ops.quote_name(Question._meta.db_table),
+        step_table=connection.ops.quote_name(JourneyStep._meta.db_table),
+        where=where,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [UserAnswer.CORRECT, UserAnswer.NOT_SELECTED, *params])
+        return cursor.rowcount
+
+
+def recalculate_hardness(question_ids=None, chunk_size=5000) -> int:
+    """
+    Recalculate the hardness of `question_ids` (default: every question),
+    `chunk_size` questions per statement. Returns the number of questions
+    whose hardness changed.
+    """
+    from apps.journies.adaptive_selection import invalidate_hardness_buckets
+
+    changed = 0
+    if question_ids is not None:
+        question_ids = sorted(set(question_ids))
+        for start in range(0, len(question_ids), chunk_size):
+            changed += _update_hardness('qq.id = ANY(%s)', [question_ids[start:start + chunk_size]])
+    else:
+        bounds = Question.objects.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is not None:
+            for start in range(bounds['first'], bounds['last'] + 1, chunk_size):
+                changed += _update_hardness('qq.id >= %s AND qq.id < %s', [start, start + chunk_size])
+    if changed:
+        # the adaptive selection buckets move the changed questions
+        invalidate_hardness_buckets()
+    return changed
+
+
+def recalculate_hardness_full(chunk_size=5000) -> int:
+    """
+    Recalculate every question and move the watermark to the start of
+    the run.
+    """
+    started_at = timezone.now()
+    changed = recalculate_hardness(chunk_size=chunk_size)
+    advance_hardness_watermark(started_at)
+    return changed
+
+
+def recalculate_hardness_incremental(chunk_size=5000) -> int:
+    """
+    Recalculate the questions answered since the last run; without a
+    watermark (first run) the whole bank is recalculated.
+    """
+    watermark = StatsWatermark.objects.filter(name=HARDNESS_WATERMARK).first()
+    if watermark is None:
+        return recalculate_hardness_full(chunk_size=chunk_size)
+
+    started_at = timezone.now()
+    question_ids = (
+        JourneyStep.objects
+        .filter(answered_at__gte=watermark.value - WATERMARK_OVERLAP, question_id__isnull=False)
+        .order_by()
+        .values_list('question_id', flat=True)
+        .distinct()
+    )
+    changed = recalculate_hardness(question_ids=list(question_ids), chunk_size=chunk_size)
+    advance_hardness_watermark(started_at)
+    return changed
+
+
+def advance_hardness_watermark(value):
+    StatsWatermark.objects.update_or_create(
+        name=HARDNESS_WATERMARK,
+        defaults={'value': value},
+    )
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.questions.question_stats import compute_question_stats, store_question_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the item analysis of every answered question (p-value, "
+        "discrimination index and choice frequencies) from the journey steps."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Journey steps per Polars chunk (default: QUESTION_STATS_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--group-fraction',
+            type=float,
+            default=None,
+            help='Share of journeys in the upper and lower groups (default: QUESTION_STATS_GROUP_FRACTION)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = compute_question_stats(options['chunk_size'], options['group_fraction'])
+        computed = time.perf_counter()
+        stored = store_question_stats(stats)
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored the stats of {stored} question(s): computed in '
+            f'{computed - started:.2f}s, stored in {time.perf_counter() - computed:.2f}s'
+        ))
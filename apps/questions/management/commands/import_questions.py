@@ -60,6 +60,10 @@ class Command(BaseCommand):
                 choice_4=cleaned_options[3],
                 true_choice=true_choice_field
             )
+            # skip questions imported before (same text and choices)
+            question_instance.content_hash = question_instance.get_content_hash()
+            if Question.objects.filter(content_hash=question_instance.content_hash).exists():
+                continue
             question_instance.save()
             # self.stdout.write(self.style.SUCCESS(f"Imported question: {question_text}"))
 
@@ -1,7 +1,6 @@
 import csv
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
-from apps.questions.models import Tag
+from apps.questions.tag_importer import TagForest, import_tag_forest
 
 class Command(BaseCommand):
     help = (
@@ -28,24 +27,11 @@ class Command(BaseCommand):
             help='File encoding (default: utf-8)'
         )
 
-    def create_tag_path(self, path):
-        parent = None
-        for name in path:
-            name = name.strip().lstrip('\ufeff')
-            if not name:
-                continue
-            tag, created = Tag.objects.get_or_create(
-                name=name,
-                parent=parent
-            )
-            parent = tag
-        return parent
-
-    @transaction.atomic
     def handle(self, *args, **options):
         file_path = options['csv_file']
         delim = options['delimiter']
         enc = 'utf-8-sig'
+        forest = TagForest()
 
         try:
             with open(file_path, encoding=enc, newline='') as f:
@@ -58,11 +44,16 @@ class Command(BaseCommand):
                         continue
 
                     # self.stdout.write(f"Row {row_num}: Creating path → {' > '.join(tag_path)}")
-                    self.create_tag_path(tag_path)
+                    forest.add_path(
+                        name for name in (cell.lstrip('\ufeff') for cell in tag_path) if name
+                    )
+            stats = import_tag_forest(forest)
 
         except FileNotFoundError:
             raise CommandError(f"File not found: {file_path}")
         except Exception as e:
             raise CommandError(f"Error importing CSV: {e}")
 
-        self.stdout.write(self.style.SUCCESS("Import complete!"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Import complete! {stats['created']} tags created, {stats['existing']} already existed."
+        ))
@@ -1,7 +1,7 @@
 import json
 import sys
 from django.core.management.base import BaseCommand, CommandError
-from apps.questions.models import Tag
+from apps.questions.tag_importer import TagForest, import_tag_forest
 
 class Command(BaseCommand):
     help = 'Import tags from a nested JSON file into the Tag model.'
@@ -23,21 +23,11 @@ class Command(BaseCommand):
         except json.JSONDecodeError as e:
             raise CommandError(f"Error decoding JSON: {str(e)}")
 
-        def process_node(name, node_data, parent=None):
-            tag, created = Tag.objects.get_or_create(name=name, parent=parent)
-            # if created:
-            #     # self.stdout.write(self.style.SUCCESS(f"Created tag: {tag.name}"))
-            #     print(tag.name, file=sys.stdout, flush=True)
-            # else:
-            #     # self.stdout.write(self.style.NOTICE(f"Tag already exists"))
-            #     print("exists", file=sys.stdout, flush=True)
-            # If this node has children then iterate and process them
-            children = node_data.get("children", {})
-            for child_name, child_data in children.items():
-                process_node(child_name, child_data, parent=tag)
+        # The top-level JSON maps each root tag name to {"children": {...}}.
+        forest = TagForest()
+        forest.add_nested(data)
+        stats = import_tag_forest(forest)
 
-        # The top-level JSON has the main tag as its single key.
-        for root_name, root_data in data.items():
-            process_node(root_name, root_data, parent=None)
-
-        self.stdout.write(self.style.SUCCESS("Finished importing tags."))
+        self.stdout.write(self.style.SUCCESS(
+            f"Finished importing tags: {stats['created']} created, {stats['existing']} already existed."
+        ))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.questions.hardness import recalculate_hardness_full, recalculate_hardness_incremental
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate Question.hardness from the journey steps, for the whole "
+        "bank or only for the questions answered since the previous run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Only recalculate questions answered since the last run'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Questions recalculated per statement'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['incremental']:
+            changed = recalculate_hardness_incremental(chunk_size=options['chunk_size'])
+        else:
+            changed = recalculate_hardness_full(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated the hardness of {changed} question(s) in {time.perf_counter() - started:.2f}s'
+        ))
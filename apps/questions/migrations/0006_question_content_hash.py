@@ -0,0 +1,76 @@
+import hashlib
+
+from django.db import migrations, models
+
+# Frozen copy of apps.questions.models.question_content_hash: a migration
+# must not change when the live model code does.
+CONTENT_FIELD_NAMES = ('text_body', 'choice_1', 'choice_2', 'choice_3', 'choice_4')
+
+
+def question_content_hash(text_body, choice_1, choice_2, choice_3, choice_4) -> str:
+    content = '\x1f'.join(
+        (value or '').strip()
+        for value in (text_body, choice_1, choice_2, choice_3, choice_4)
+    )
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+CONTENT_HASH_UPDATE_SQL = """
+UPDATE {question_table} q
+SET content_hash = v.content_hash
+FROM (VALUES {values}) AS v(id, content_hash)
+WHERE q.id = v.id
+"""
+
+
+def _store_hashes(schema_editor, table, pending):
+    sql = CONTENT_HASH_UPDATE_SQL.format(
+        question_table=schema_editor.quote_name(table),
+        values=', '.join(['(%s, %s)'] * len(pending)),
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in pending for value in row])
+
+
+def backfill_content_hash(apps, schema_editor):
+    """
+    Hash the existing questions. Only the oldest of identical questions
+    gets the hash, so the unique constraint of the next migration holds.
+    """
+    Question = apps.get_model('questions', 'Question')
+    table = Question._meta.db_table
+    seen = set()
+    pending = []
+    rows = (
+        Question.objects
+        .order_by('id')
+        .values_list('id', *CONTENT_FIELD_NAMES)
+        .iterator(chunk_size=5000)
+    )
+    for question_id, *content in rows:
+        content_hash = question_content_hash(*content)
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        pending.append((question_id, content_hash))
+        if len(pending) >= 5000:
+            _store_hashes(schema_editor, table, pending)
+            pending = []
+    if pending:
+        _store_hashes(schema_editor, table, pending)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0005_alter_question_direction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0008_statswatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='questions.question')),
+                ('responses', models.PositiveIntegerField(default=0)),
+                ('p_value', models.FloatField(blank=True, null=True)),
+                ('discrimination', models.FloatField(blank=True, null=True)),
+                ('choice_1_count', models.PositiveIntegerField(default=0)),
+                ('choice_2_count', models.PositiveIntegerField(default=0)),
+                ('choice_3_count', models.PositiveIntegerField(default=0)),
+                ('choice_4_count', models.PositiveIntegerField(default=0)),
+                ('not_selected_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
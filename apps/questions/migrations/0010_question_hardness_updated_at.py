@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0009_questionstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='hardness_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 00:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0010_question_hardness_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['is_active', 'hardness'], name='question_active_hardness_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['tree_id', 'lft', 'rght'], name='tag_tree_range_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+import hashlib
+
+from django.db import migrations
+
+# Frozen copy of apps.questions.models.question_content_hash, see 0006.
+CONTENT_FIELD_NAMES = ('text_body', 'choice_1', 'choice_2', 'choice_3', 'choice_4')
+CHUNK_SIZE = 5000
+
+
+def question_content_hash(text_body, choice_1, choice_2, choice_3, choice_4) -> str:
+    content = '\x1f'.join(
+        (value or '').strip()
+        for value in (text_body, choice_1, choice_2, choice_3, choice_4)
+    )
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def backfill_missing_content_hash(apps, schema_editor):
+    """
+    Hash the questions created outside the importers since 0006, when
+    Question.save did not set content_hash yet. A question whose hash is
+    already stored (by an older identical question) stays unhashed.
+    """
+    Question = apps.get_model('questions', 'Question')
+    rows = (
+        Question.objects
+        .filter(content_hash__isnull=True)
+        .order_by('id')
+        .values_list('id', *CONTENT_FIELD_NAMES)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    seen = set()
+    chunk = []
+
+    def store(chunk):
+        stored = set(
+            Question.objects
+            .filter(content_hash__in=[content_hash for _, content_hash in chunk])
+            .values_list('content_hash', flat=True)
+        )
+        for question_id, content_hash in chunk:
+            if content_hash not in stored:
+                Question.objects.filter(pk=question_id).update(content_hash=content_hash)
+
+    for question_id, *content in rows:
+        content_hash = question_content_hash(*content)
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        chunk.append((question_id, content_hash))
+        if len(chunk) >= CHUNK_SIZE:
+            store(chunk)
+            chunk = []
+    if chunk:
+        store(chunk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questions', '0011_question_question_active_hardness_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_missing_content_hash, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+import hashlib
+
+from django.db import IntegrityError, models, router, transaction
 from mptt.models import MPTTModel, TreeForeignKey
 
 from utils.exceptions import CustomValidationError
@@ -15,6 +17,19 @@ CHOICE_FIELD_NAMES = [
     ('choice_3', 'Choice 3'),
     ('choice_4', 'Choice 4'),
 ]
+CONTENT_FIELD_NAMES = ('text_body', 'choice_1', 'choice_2', 'choice_3', 'choice_4')
+
+
+def question_content_hash(text_body, choice_1, choice_2, choice_3, choice_4) -> str:
+    """
+    SHA-256 of a question's text and choices (in order), used to recognise
+    a question that is imported again.
+    """
+    content = '\x1f'.join(
+        (value or '').strip()
+        for value in (text_body, choice_1, choice_2, choice_3, choice_4)
+    )
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
 
 class Tag(MPTTModel):
     name = models.CharField(max_length=255)
@@ -31,6 +46,10 @@ class Tag(MPTTModel):
 
     class Meta:
         unique_together = ('parent', 'name')
+        indexes = [
+            # subtree lookups: tree_id = t AND lft BETWEEN l AND r
+            models.Index(fields=['tree_id', 'lft', 'rght'], name='tag_tree_range_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -46,6 +65,8 @@ class Question(models.Model):
     true_choice      = models.CharField(max_length=20, choices=CHOICE_FIELD_NAMES)
     answer           = models.TextField(blank=True, null=True)
     hardness         = models.FloatField(default=0.0)
+    # set whenever the hardness job changes `hardness`
+    hardness_updated_at = models.DateTimeField(blank=True, null=True, db_index=True)
     tags             = models.ManyToManyField(Tag, related_name="questions", blank=True)
     created_at       = models.DateTimeField(auto_now_add=True)
     direction        = models.TextField(
@@ -58,9 +79,48 @@ class Question(models.Model):
         blank=True,
         null=True
     )
+    # Kept up to date by save() and set by the importers' bulk inserts;
+    # NULL only for a later copy of an identical question.
+    content_hash     = models.CharField(
+        max_length=64,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ['-id']   # newest (highest id) first
+        indexes = [
+            # operator search by active flag and hardness range
+            models.Index(fields=['is_active', 'hardness'], name='question_active_hardness_idx'),
+        ]
+
+    def get_content_hash(self) -> str:
+        return question_content_hash(*(getattr(self, name) for name in CONTENT_FIELD_NAMES))
+
+    def save(self, *args, **kwargs):
+        # an edited text or choice must not keep the hash of the old content;
+        # an unhashed existing row is a duplicate and stays unhashed
+        if self._state.adding or self.content_hash is not None:
+            self.content_hash = self.get_content_hash()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and set(update_fields) & set(CONTENT_FIELD_NAMES):
+                kwargs['update_fields'] = {*update_fields, 'content_hash'}
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        try:
+            # a savepoint, so a duplicate leaves the caller's transaction usable
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError:
+            if self.content_hash is None or not (
+                Question.objects.using(using)
+                .filter(content_hash=self.content_hash)
+                .exclude(pk=self.pk)
+                .exists()
+            ):
+                raise
+            raise CustomValidationError("A question with the same text and choices already exists.")
 
     def calculate_hardness(self):
         """
@@ -69,23 +129,12 @@ class Question(models.Model):
         - Not selected: 5 points
         - Incorrect answer: 10 points
         Hardness = (sum of points given by users) / (total number of users who answered)
+        Computed in the database, see apps.questions.hardness.
         """
-        answers = self.journey_steps.all()
-        total_users = answers.count()
-
-        if total_users == 0:
-            new_hardness = 0.0
-        else:
-            total_points = sum(
-                1 if ans.answer_result == UserAnswer.CORRECT else
-                5 if ans.answer_result == UserAnswer.NOT_SELECTED else
-                10 for ans in answers
-            )
-            new_hardness = total_points / total_users
-
+        from apps.questions.hardness import recalculate_hardness
 
-        self.hardness = new_hardness
-        self.save(update_fields=['hardness'])
+        recalculate_hardness(question_ids=[self.pk])
+        self.refresh_from_db(fields=['hardness'])
 
     def clean(self):
         """
@@ -110,3 +159,47 @@ class Question(models.Model):
 
     def __str__(self):
         return f"Question: {self.text_body[:50]}..."
+
+
+class StatsWatermark(models.Model):
+    """
+    Point in time up to which a periodic statistics job (e.g. the hardness
+    recalculation) has processed the answers; the next incremental run
+    starts from there.
+    """
+    name       = models.CharField(max_length=50, unique=True)
+    value      = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class QuestionStats(models.Model):
+    """
+    Item analysis of a question over its journey steps, recomputed in batch
+    by apps.questions.question_stats:
+    - p_value: share of the steps answered correctly
+    - discrimination: p_value among the top journeys (by share of correct
+      answers) minus p_value among the bottom ones
+    - choice_N_count / not_selected_count: how often each choice (including
+      the distractors) was picked or the question was left unanswered
+    """
+    question           = models.OneToOneField(
+        Question,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats"
+    )
+    responses          = models.PositiveIntegerField(default=0)
+    p_value            = models.FloatField(blank=True, null=True)
+    discrimination     = models.FloatField(blank=True, null=True)
+    choice_1_count     = models.PositiveIntegerField(default=0)
+    choice_2_count     = models.PositiveIntegerField(default=0)
+    choice_3_count     = models.PositiveIntegerField(default=0)
+    choice_4_count     = models.PositiveIntegerField(default=0)
+    not_selected_count = models.PositiveIntegerField(default=0)
+    computed_at        = models.DateTimeField()
+
+    def __str__(self):
+        return f"Stats of question {self.question_id}"
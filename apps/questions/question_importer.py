@@ -0,0 +1,474 @@
+"""
+Streaming bulk importer of questions (import_questions_v2).
+
+Records are read one at a time from JSON Lines or from a JSON array parsed
+incrementally, turned into validated Question instances and written in
+batches, either with multi-row INSERTs or, on PostgreSQL, with COPY. Memory is
+bounded by the batch size whatever the input size. Rejected records are
+appended to a JSON Lines file together with the reason.
+
+Imports are idempotent: every question carries the content_hash of its
+text and choices, and a question whose hash is already stored is counted
+as a duplicate instead of being inserted again.
+
+With several workers (import_in_parallel) a JSON Lines input is split into
+byte ranges, one per process; a JSON array is first rewritten as JSON
+Lines. Concurrent inserts of the same question are resolved by the unique
+content_hash.
+
+Neither write path sends post_save, so the question pools are invalidated
+once at the end of the run.
+"""
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import django
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models.constants import OnConflict
+
+from apps.questions.models import Question
+from utils.exceptions import CustomValidationError
+
+LETTER_TO_INDEX = {'A': 1, 'B': 2, 'C': 3, 'D': 4}
+OPTION_NUMBERING = re.compile(r'^\s*\d+\)\s*')
+
+FORMAT_JSONL = 'jsonl'
+FORMAT_JSON = 'json'
+METHOD_BULK = 'bulk'
+METHOD_COPY = 'copy'
+
+READ_CHUNK_SIZE = 1 << 16
+
+
+class RejectedRecord(Exception):
+    pass
+
+
+def default_method() -> str:
+    return METHOD_COPY if connection.vendor == 'postgresql' else METHOD_BULK
+
+
+def detect_format(path) -> str:
+    if path.endswith(('.jsonl', '.ndjson')):
+        return FORMAT_JSONL
+    with open(path, encoding='utf-8') as f:
+        while True:
+            char = f.read(1)
+            if not char or not char.isspace():
+                break
+    return FORMAT_JSON if char == '[' else FORMAT_JSONL
+
+
+def iter_jsonl(fp):
+    """
+    Yield (index, record) for every non-blank line; a line that is not
+    valid JSON yields a RejectedRecord in place of the record.
+    """
+    for index, line in enumerate(fp, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield index, json.loads(line)
+        except ValueError as e:
+            yield index, RejectedRecord(f'invalid JSON: {e}')
+
+
+def iter_jsonl_range(fp, start, end):
+    """
+    Yield (offset, record) for every line of the binary file `fp` that
+    starts in the byte range [start, end), like iter_jsonl.
+    """
+    offset = start
+    if start:
+        # a line cut by `start` belongs to the previous range
+        fp.seek(start - 1)
+        offset = start - 1 + len(fp.readline())
+    while offset < end:
+        line = fp.readline()
+        if not line:
+            break
+        line_offset = offset
+        offset += len(line)
+        if not line.strip():
+            continue
+        try:
+            yield line_offset, json.loads(line)
+        except ValueError as e:
+            yield line_offset, RejectedRecord(f'invalid JSON: {e}')
+
+
+def shard_ranges(path, shards) -> list:
+    """
+    Split the file into at most `shards` contiguous byte ranges.
+    """
+    size = os.path.getsize(path)
+    shards = max(1, min(shards, size))
+    bounds = [size * i // shards for i in range(shards + 1)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def iter_json_array(fp, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yield (index, record) for every element of a top-level JSON array,
+    reading `chunk_size` characters at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def skip_whitespace():
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+    def expect(*chars):
+        nonlocal position
+        skip_whitespace()
+        if position >= len(buffer) or buffer[position] not in chars:
+            raise ValueError(f'expected one of {chars!r} in the JSON array')
+        position += 1
+        return buffer[position - 1]
+
+    expect('[')
+    skip_whitespace()
+    if position < len(buffer) and buffer[position] == ']':
+        return
+    index = 0
+    while True:
+        skip_whitespace()
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                record = end = None
+            # a value touching the end of the buffer may be cut short (e.g. a number)
+            if end is not None and (end < len(buffer) or eof):
+                break
+            chunk = fp.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+        position = end
+        index += 1
+        yield index, record
+        if expect(',', ']') == ']':
+            return
+
+
+def build_question(record) -> Question:
+    """
+    Validate one input record and return the unsaved Question.
+    Raises RejectedRecord with the reason when the record is invalid.
+    """
+    if isinstance(record, RejectedRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise RejectedRecord('record is not an object')
+    question_text = record.get('question')
+    options = record.get('options', [])
+    correct = record.get('correct_option')
+    if not question_text:
+        raise RejectedRecord("missing 'question'")
+    if not isinstance(options, list) or len(options) != 4 or not all(isinstance(o, str) for o in options):
+        raise RejectedRecord("'options' must be an array of four strings")
+    if correct not in LETTER_TO_INDEX:
+        raise RejectedRecord("'correct_option' must be one of A, B, C, D")
+
+    # strip the leading "1) ", "2) " ... of the options
+    cleaned = [OPTION_NUMBERING.sub('', option) for option in options]
+    question = Question(
+        text_body=question_text,
+        choice_1=cleaned[0],
+        choice_2=cleaned[1],
+        choice_3=cleaned[2],
+        choice_4=cleaned[3],
+        true_choice=f'choice_{LETTER_TO_INDEX[correct]}',
+        answer=record.get('explanation'),
+        direction=record.get('direction'),
+        min_required_age=record.get('min_required_age'),
+    )
+    question.content_hash = question.get_content_hash()
+    try:
+        # uniqueness (content_hash) is resolved by the batch insert, not per row
+        question.full_clean(exclude=['tags'], validate_unique=False, validate_constraints=False)
+    except ValidationError as e:
+        raise RejectedRecord(f'invalid question: {e.message_dict}')
+    except CustomValidationError as e:
+        raise RejectedRecord(f'invalid question: {e.detail}')
+    return question
+
+
+def _copy_text(value) -> str:
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def copy_questions(questions) -> int:
+    """
+    Insert the questions with COPY ... FROM STDIN (PostgreSQL), through a
+    temporary staging table so rows whose content_hash is already stored
+    are skipped. Returns the number of inserted rows.
+    """
+    fields = [f for f in Question._meta.concrete_fields if not f.primary_key]
+    lines = []
+    for question in questions:
+        lines.append('\t'.join(
+            # pre_save fills auto_now_add fields, as a regular INSERT would
+            _copy_text(f.get_db_prep_save(f.pre_save(question, True), connection))
+            for f in fields
+        ))
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    table = connection.ops.quote_name(Question._meta.db_table)
+    stage = connection.ops.quote_name('question_import_stage')
+    hash_column = connection.ops.quote_name(Question._meta.get_field('content_hash').column)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {stage} AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.execute(f'TRUNCATE {stage}')
+        cursor.copy_expert(
+            f'COPY {stage} ({columns}) FROM STDIN',
+            io.StringIO('\n'.join(lines) + '\n'),
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) SELECT {columns} FROM {stage} '
+            f'ON CONFLICT ({hash_column}) DO NOTHING'
+        )
+        return cursor.rowcount
+
+
+def bulk_create_questions(questions) -> int:
+    """
+    Insert the questions with multi-row INSERTs that skip the rows whose
+    content_hash is already stored (ON CONFLICT DO NOTHING / INSERT IGNORE).
+    Returns the number of rows the database actually inserted, so a
+    question a concurrent import stored first is not counted.
+    """
+    fields = [f for f in Question._meta.concrete_fields if not f.primary_key]
+    columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+    table = connection.ops.quote_name(Question._meta.db_table)
+    insert = connection.ops.insert_statement(on_conflict=OnConflict.IGNORE)
+    on_conflict = connection.ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None)
+    row_placeholder = '(' + ', '.join(['%s'] * len(fields)) + ')'
+    batch_size = connection.ops.bulk_batch_size(fields, questions) or len(questions)
+    inserted = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(questions), batch_size):
+            batch = questions[start:start + batch_size]
+            cursor.execute(
+                f'{insert} {table} ({columns}) '
+                f'VALUES {", ".join([row_placeholder] * len(batch))} {on_conflict}',
+                [
+                    # pre_save fills auto_now_add fields, as bulk_create would
+                    f.get_db_prep_save(f.pre_save(question, True), connection)
+                    for question in batch
+                    for f in fields
+                ]
+            )
+            inserted += cursor.rowcount
+    return inserted
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    imported: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+class QuestionImporter:
+    """
+    Import the records of `path` in batches of `batch_size`; rejects go to
+    `rejects_path` (JSON Lines). `progress` is called with the ImportStats
+    after every batch. With `byte_range` (start, end) only the JSON Lines
+    starting in that range are imported and rejects are located by their
+    byte offset instead of their line number.
+    """
+
+    def __init__(self, path, rejects_path, fmt=None, method=None, batch_size=2000, progress=None,
+                 byte_range=None):
+        self.path = path
+        self.rejects_path = rejects_path
+        self.byte_range = byte_range
+        self.format = FORMAT_JSONL if byte_range else fmt or detect_format(path)
+        self.method = method or default_method()
+        self.batch_size = batch_size
+        self.progress = progress
+        self.stats = ImportStats()
+
+    def open(self):
+        if self.byte_range:
+            return open(self.path, 'rb')
+        return open(self.path, encoding='utf-8')
+
+    def records(self, fp):
+        if self.byte_range:
+            return iter_jsonl_range(fp, *self.byte_range)
+        if self.format == FORMAT_JSONL:
+            return iter_jsonl(fp)
+        return iter_json_array(fp)
+
+    def run(self, invalidate_pool=True) -> ImportStats:
+        from apps.journies.question_sampler import invalidate_question_pool
+
+        with self.open() as fp, open(self.rejects_path, 'w', encoding='utf-8') as rejects:
+            self._rejects = rejects
+            batch = []
+            for index, record in self.records(fp):
+                self.stats.read += 1
+                try:
+                    batch.append((index, record, build_question(record)))
+                except RejectedRecord as e:
+                    self.reject(index, record, str(e))
+                if len(batch) >= self.batch_size:
+                    self.write(batch)
+                    batch = []
+            if batch:
+                self.write(batch)
+
+        if invalidate_pool and self.stats.imported:
+            invalidate_question_pool()
+        return self.stats
+
+    def reject(self, index, record, reason):
+        self.stats.rejected += 1
+        if isinstance(record, RejectedRecord):
+            record = None
+        self._rejects.write(json.dumps(
+            {'offset' if self.byte_range else 'index': index, 'error': reason, 'object': record},
+            ensure_ascii=False,
+            default=str,
+        ) + '\n')
+
+    def write(self, batch):
+        unique = {}
+        for item in batch:
+            unique.setdefault(item[2].content_hash, item)
+        self.stats.duplicates += len(batch) - len(unique)
+        batch = list(unique.values())
+
+        questions = [question for _, _, question in batch]
+        try:
+            with transaction.atomic():
+                if self.method == METHOD_COPY:
+                    inserted = copy_questions(questions)
+                else:
+                    inserted = bulk_create_questions(questions)
+            self.stats.imported += inserted
+            self.stats.duplicates += len(questions) - inserted
+        except DatabaseError:
+            # isolate the rows the database refuses
+            for index, record, question in batch:
+                if Question.objects.filter(content_hash=question.content_hash).exists():
+                    self.stats.duplicates += 1
+                    continue
+                try:
+                    with transaction.atomic():
+                        question.save()
+                    self.stats.imported += 1
+                except CustomValidationError:
+                    # stored by another worker since the check above
+                    self.stats.duplicates += 1
+                except DatabaseError as e:
+                    self.reject(index, record, f'database error: {e}'.strip())
+        if self.progress:
+            self.progress(self.stats)
+
+
+def convert_to_jsonl(path, jsonl_path):
+    """
+    Rewrite a JSON array file as JSON Lines, streaming.
+    """
+    with open(path, encoding='utf-8') as fp, open(jsonl_path, 'w', encoding='utf-8') as out:
+        for _, record in iter_json_array(fp):
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+    return jsonl_path
+
+
+def _import_shard(path, rejects_path, method, batch_size, byte_range):
+    importer = QuestionImporter(
+        path,
+        rejects_path,
+        method=method,
+        batch_size=batch_size,
+        byte_range=byte_range,
+    )
+    stats = importer.run(invalidate_pool=False)
+    return stats.read, stats.imported, stats.duplicates, stats.rejected
+
+
+def import_in_parallel(path, rejects_path, workers, fmt=None, method=None, batch_size=2000) -> ImportStats:
+    """
+    Import `path` with `workers` processes, each one owning a byte range of
+    the (JSON Lines) input. The rejects of all workers end up in
+    `rejects_path`; returns the combined ImportStats.
+    """
+    from apps.journies.question_sampler import invalidate_question_pool
+
+    stats = ImportStats()
+    with tempfile.TemporaryDirectory() as tmp:
+        if (fmt or detect_format(path)) == FORMAT_JSON:
+            path = convert_to_jsonl(path, os.path.join(tmp, 'input.jsonl'))
+        ranges = shard_ranges(path, workers)
+        reject_parts = [os.path.join(tmp, f'rejects.{i}.jsonl') for i in range(len(ranges))]
+
+        # the workers must not share the parent's database connection
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=len(ranges), initializer=django.setup) as pool:
+            futures = [
+                pool.submit(_import_shard, path, part, method, batch_size, byte_range)
+                for part, byte_range in zip(reject_parts, ranges)
+            ]
+            for future in futures:
+                read, imported, duplicates, rejected = future.result()
+                stats.read += read
+                stats.imported += imported
+                stats.duplicates += duplicates
+                stats.rejected += rejected
+
+        with open(rejects_path, 'w', encoding='utf-8') as rejects:
+            for part in reject_parts:
+                with open(part, encoding='utf-8') as f:
+                    shutil.copyfileobj(f, rejects)
+
+    if stats.imported:
+        invalidate_question_pool()
+    return stats
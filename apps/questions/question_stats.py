@@ -0,0 +1,222 @@
+"""
+Batch item analysis of the questions (QuestionStats).
+
+The journey steps are streamed from a server-side cursor and turned into
+columnar Polars frames of `chunk_size` rows (journey, question, picked
+choice, correct), so no model instance is ever built and memory stays
+bounded by the number of questions and journeys, not steps. Each chunk is
+reduced to partial sums that are merged as the stream goes, in two passes:
+
+1) per question: responses, correct answers and the frequency of every
+   choice; per journey: steps and correct answers;
+2) the journeys are ranked by their share of correct answers, the top and
+   bottom `group_fraction` form the upper and lower groups, and the steps
+   are streamed again to count per question how each group answered.
+
+    p_value        = correct / responses
+    discrimination = p_value(upper group) - p_value(lower group)
+
+Unanswered steps count as responses that are not correct, like in the
+hardness formula.
+"""
+from itertools import islice
+
+import polars as pl
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.utils import timezone
+
+from apps.journies.models import JourneyStep
+from apps.questions.models import CHOICE_FIELD_NAMES, QuestionStats, UserAnswer
+
+STEP_SCHEMA = {
+    'journey_id': pl.Int64,
+    'question_id': pl.Int64,
+    # 1-4 for choice_1..choice_4, 0 when nothing was selected
+    'choice': pl.Int8,
+    'correct': pl.Int8,
+}
+CHOICE_COUNT_FIELDS = [f'{name}_count' for name, _ in CHOICE_FIELD_NAMES]
+STATS_FIELDS = [
+    'responses',
+    'p_value',
+    'discrimination',
+    *CHOICE_COUNT_FIELDS,
+    'not_selected_count',
+    'computed_at',
+]
+# partial aggregates merged at once while streaming
+MERGE_EVERY = 16
+
+
+def iter_step_frames(chunk_size):
+    """
+    Yield the journey steps as Polars frames of at most `chunk_size` rows.
+    """
+    rows = (
+        JourneyStep.objects
+        .filter(question_id__isnull=False)
+        .order_by()
+        .annotate(
+            choice=Case(
+                *(When(user_answer=name, then=Value(number))
+                  for number, (name, _) in enumerate(CHOICE_FIELD_NAMES, start=1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+            correct=Case(
+                When(answer_result=UserAnswer.CORRECT, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+        .values_list('journey_id', 'question_id', 'choice', 'correct')
+        .iterator(chunk_size=chunk_size)
+    )
+    while batch := list(islice(rows, chunk_size)):
+        yield pl.DataFrame(batch, schema=STEP_SCHEMA, orient='row')
+
+
+class PartialSums:
+    """
+    Sum of partial aggregates keyed by `key`, collapsed every MERGE_EVERY
+    additions so memory stays proportional to the number of keys.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.parts = []
+
+    def add(self, frame):
+        self.parts.append(frame)
+        if len(self.parts) >= MERGE_EVERY:
+            self.parts = [self._merge()]
+
+    def _merge(self):
+        return pl.concat(self.parts).group_by(self.key).agg(pl.all().sum())
+
+    def result(self, schema):
+        if not self.parts:
+            return pl.DataFrame(schema=schema)
+        return self._merge()
+
+
+def _count(expr):
+    return expr.sum().cast(pl.Int64)
+
+
+def compute_question_stats(chunk_size=None, group_fraction=None) -> pl.DataFrame:
+    """
+    Return one row per question with steps: question_id, responses,
+    p_value, discrimination, choice_N_count and not_selected_count.
+    """
+    chunk_size = chunk_size or settings.QUESTION_STATS_CHUNK_SIZE
+    group_fraction = group_fraction or settings.QUESTION_STATS_GROUP_FRACTION
+
+    # 1) answer counts per question and per journey
+    questions = PartialSums('question_id')
+    journeys = PartialSums('journey_id')
+    for steps in iter_step_frames(chunk_size):
+        questions.add(steps.group_by('question_id').agg(
+            pl.len().cast(pl.Int64).alias('responses'),
+            _count(pl.col('correct')).alias('correct'),
+            *(_count(pl.col('choice') == number).alias(field)
+              for number, field in enumerate(CHOICE_COUNT_FIELDS, start=1)),
+            _count(pl.col('choice') == 0).alias('not_selected_count'),
+        ))
+        journeys.add(steps.group_by('journey_id').agg(
+            pl.len().cast(pl.Int64).alias('steps'),
+            _count(pl.col('correct')).alias('correct'),
+        ))
+
+    counts = questions.result({
+        'question_id': pl.Int64,
+        'responses': pl.Int64,
+        'correct': pl.Int64,
+        **{field: pl.Int64 for field in CHOICE_COUNT_FIELDS},
+        'not_selected_count': pl.Int64,
+    })
+
+    # 2) upper and lower groups of journeys, by share of correct answers
+    ranked = (
+        journeys.result({'journey_id': pl.Int64, 'steps': pl.Int64, 'correct': pl.Int64})
+        .with_columns((pl.col('correct') / pl.col('steps')).alias('score'))
+        .sort(['score', 'journey_id'])
+    )
+    group_size = min(int(ranked.height * group_fraction), ranked.height // 2)
+    groups = pl.concat([
+        ranked.head(group_size).select('journey_id', pl.lit(-1, pl.Int8).alias('group')),
+        ranked.tail(group_size).select('journey_id', pl.lit(1, pl.Int8).alias('group')),
+    ])
+
+    schema = {
+        'question_id': pl.Int64,
+        'upper': pl.Int64,
+        'upper_correct': pl.Int64,
+        'lower': pl.Int64,
+        'lower_correct': pl.Int64,
+    }
+    by_group = PartialSums('question_id')
+    if group_size:
+        for steps in iter_step_frames(chunk_size):
+            grouped = steps.join(groups, on='journey_id', how='inner')
+            upper = pl.col('group') == 1
+            lower = pl.col('group') == -1
+            correct = pl.col('correct') == 1
+            by_group.add(grouped.group_by('question_id').agg(
+                _count(upper).alias('upper'),
+                _count(upper & correct).alias('upper_correct'),
+                _count(lower).alias('lower'),
+                _count(lower & correct).alias('lower_correct'),
+            ))
+    by_group = by_group.result(schema)
+
+    return (
+        counts
+        .join(by_group, on='question_id', how='left')
+        .with_columns(
+            (pl.col('correct') / pl.col('responses')).alias('p_value'),
+            pl.when((pl.col('upper') > 0) & (pl.col('lower') > 0))
+              .then(
+                  pl.col('upper_correct') / pl.col('upper')
+                  - pl.col('lower_correct') / pl.col('lower')
+              )
+              .otherwise(None)
+              .alias('discrimination'),
+        )
+        .select(
+            'question_id',
+            'responses',
+            'p_value',
+            'discrimination',
+            *CHOICE_COUNT_FIELDS,
+            'not_selected_count',
+        )
+    )
+
+
+def store_question_stats(stats, batch_size=2000) -> int:
+    """
+    Upsert the rows of `stats` into QuestionStats and drop the stats of
+    questions that no longer have steps. Returns the number of rows stored.
+    """
+    computed_at = timezone.now()
+    rows = [
+        QuestionStats(computed_at=computed_at, **row)
+        for row in stats.iter_rows(named=True)
+    ]
+    with transaction.atomic():
+        QuestionStats.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['question'],
+            update_fields=STATS_FIELDS,
+        )
+        QuestionStats.objects.filter(computed_at__lt=computed_at).delete()
+    return len(rows)
+
+
+def refresh_question_stats(chunk_size=None, group_fraction=None) -> int:
+    return store_question_stats(compute_question_stats(chunk_size, group_fraction))
@@ -8,7 +8,8 @@ from .operator import (
     QuestionSerializer,
     QuestionTagSerializer,
     QuestionActiveSerializer,
-    OperatorQuestionSerializer
+    OperatorQuestionSerializer,
+    QuestionStatsSerializer
 )
 
 
@@ -19,5 +20,6 @@ __all__ = [
     TagTreeSerializer,
     TagPathSerializer,
     QuestionActiveSerializer,
-    OperatorQuestionSerializer
+    OperatorQuestionSerializer,
+    QuestionStatsSerializer
 ]
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from apps.questions.models import (
+    CHOICE_FIELD_NAMES,
     Question,
+    QuestionStats,
     Tag
 )
 from utils.exceptions import (
@@ -33,9 +35,35 @@ class QuestionSerializer(serializers.ModelSerializer):
     #     """
     #     return [tag.name for tag in obj.tags.all()]
 
+class QuestionStatsSerializer(serializers.ModelSerializer):
+    choice_frequencies = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuestionStats
+        fields = [
+            'responses',
+            'p_value',
+            'discrimination',
+            'choice_frequencies',
+            'computed_at',
+        ]
+
+    def get_choice_frequencies(self, obj):
+        """
+        Share of the responses that picked each choice, or none of them.
+        """
+        counts = {name: getattr(obj, f'{name}_count') for name, _ in CHOICE_FIELD_NAMES}
+        counts['not_selected'] = obj.not_selected_count
+        return {
+            name: count / obj.responses if obj.responses else None
+            for name, count in counts.items()
+        }
+
 class OperatorQuestionSerializer(serializers.ModelSerializer):
     id = serializers.IntegerField(read_only=True)
     tags = serializers.SerializerMethodField()
+    # None until the item analysis has seen the question answered
+    stats = QuestionStatsSerializer(read_only=True, allow_null=True)
 
     class Meta:
         model = Question
@@ -53,7 +81,8 @@ class OperatorQuestionSerializer(serializers.ModelSerializer):
             'hardness',
             'tags',
             'created_at',
-            'direction'            
+            'direction',
+            'stats',
         ]
 
     def get_tags(self, obj):
@@ -0,0 +1,53 @@
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from apps.questions.models import Question, Tag
+from apps.questions.tag_snapshot import bump_tag_tree_version
+
+
+@receiver(post_save, sender=Question)
+def invalidate_pool_on_question_save(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Rebuild the per-process question pools when a question is added
+    or its `is_active` flag may have changed, and the adaptive selection
+    buckets when its age restriction may have changed.
+    """
+    from apps.journies.adaptive_selection import invalidate_adaptive_index
+    from apps.journies.question_sampler import invalidate_question_pool
+
+    if created or update_fields is None or 'is_active' in update_fields:
+        invalidate_question_pool()
+    elif 'min_required_age' in update_fields:
+        invalidate_adaptive_index()
+
+
+@receiver(post_delete, sender=Question)
+def invalidate_pool_on_question_delete(sender, instance, **kwargs):
+    from apps.journies.question_sampler import invalidate_question_pool
+
+    invalidate_question_pool()
+
+
+@receiver(m2m_changed, sender=Question.tags.through)
+def invalidate_pool_on_question_tags(sender, action, **kwargs):
+    """
+    Tags decide the subject of a question in the adaptive selection.
+    """
+    from apps.journies.adaptive_selection import invalidate_adaptive_index
+
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_adaptive_index()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_snapshot(sender, instance, **kwargs):
+    """
+    Any Tag change (including MPTT moves, which save the moved node)
+    makes the cached tag tree snapshot and the subjects of the adaptive
+    selection stale.
+    """
+    from apps.journies.adaptive_selection import invalidate_adaptive_index
+
+    bump_tag_tree_version()
+    invalidate_adaptive_index()
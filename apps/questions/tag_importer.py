@@ -0,0 +1,146 @@
+"""
+Bulk import of hierarchical tags (import_tags_csv_format,
+import_tags_json_format).
+
+The input is first collected into a TagForest (one node per distinct
+path). The forest is then diffed against the existing tags, loaded with a
+single query, and only the missing nodes are inserted, one bulk_create
+per tree level, with MPTT updates disabled. The tree fields are rebuilt
+once at the end instead of on every insert: rebuild_tag_tree computes them
+in memory like TreeManager.rebuild and writes only the rows that changed,
+with a VALUES-join UPDATE instead of bulk_update's CASE expressions.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+from apps.questions.models import Tag
+from apps.questions.tag_snapshot import bump_tag_tree_version
+
+
+class TagForest:
+    """
+    In-memory forest of tag names: children maps a name to its subtree.
+    """
+
+    def __init__(self):
+        self.children = {}
+
+    def add_path(self, names):
+        node = self
+        for name in names:
+            node = node.children.setdefault(name, TagForest())
+
+    def add_nested(self, data):
+        """
+        Add a JSON tree shaped like {"name": {"children": {...}}, ...}.
+        """
+        for name, node_data in data.items():
+            child = self.children.setdefault(name, TagForest())
+            child.add_nested((node_data or {}).get('children', {}))
+
+    def __len__(self):
+        return sum(1 + len(child) for child in self.children.values())
+
+
+TAG_TREE_UPDATE_SQL = """
+UPDATE {tag_table} t
+SET {lft} = v.lft, {rght} = v.rght, {tree_id} = v.tree_id, {level} = v.level
+FROM (VALUES {values}) AS v(id, lft, rght, tree_id, level)
+WHERE t.id = v.id
+"""
+
+
+def _persist_tree_fields(rows):
+    quote = connection.ops.quote_name
+    opts = Tag._mptt_meta
+    sql = TAG_TREE_UPDATE_SQL.format(
+        tag_table=quote(Tag._meta.db_table),
+        lft=quote(opts.left_attr),
+        rght=quote(opts.right_attr),
+        tree_id=quote(opts.tree_id_attr),
+        level=quote(opts.level_attr),
+        values=', '.join(['(%s, %s, %s, %s, %s)'] * len(rows)),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+
+
+def rebuild_tag_tree(batch_size=5000) -> int:
+    """
+    Recompute lft, rght, tree_id and level of every tag from the parent
+    links, ordering roots and siblings by name like TreeManager.rebuild.
+    Returns the number of updated tags.
+    """
+    opts = Tag._mptt_meta
+    children = defaultdict(list)
+    current = {}
+    rows = Tag.objects.order_by('name', 'id').values_list(
+        'id', 'parent_id', opts.left_attr, opts.right_attr, opts.tree_id_attr, opts.level_attr
+    )
+    for tag_id, parent_id, *tree_fields in rows:
+        children[parent_id].append(tag_id)
+        current[tag_id] = tuple(tree_fields)
+
+    changed = []
+    for tree_id, root_id in enumerate(children[None], start=1):
+        # iterative depth-first walk: (tag_id, level, visited children)
+        counter = 1
+        lefts = {}
+        stack = [(root_id, 0, False)]
+        while stack:
+            tag_id, level, done = stack.pop()
+            if not done:
+                lefts[tag_id] = counter
+                counter += 1
+                stack.append((tag_id, level, True))
+                stack.extend((child_id, level + 1, False) for child_id in reversed(children[tag_id]))
+            else:
+                fields = (lefts.pop(tag_id), counter, tree_id, level)
+                counter += 1
+                if current[tag_id] != fields:
+                    changed.append((tag_id, *fields))
+
+    for start in range(0, len(changed), batch_size):
+        _persist_tree_fields(changed[start:start + batch_size])
+    return len(changed)
+
+
+def import_tag_forest(forest, batch_size=1000) -> dict:
+    """
+    Create the tags of `forest` that do not exist yet and rebuild the MPTT
+    fields once. Returns {'created': ..., 'existing': ...}.
+    """
+    created = existing = 0
+    with transaction.atomic():
+        tag_ids = {}
+        rows = Tag.objects.order_by('id').values_list('id', 'name', 'parent_id')
+        for tag_id, name, parent_id in rows:
+            # duplicated root names are possible; the oldest one wins
+            tag_ids.setdefault((parent_id, name), tag_id)
+
+        level = [(None, forest)]
+        with Tag.objects.disable_mptt_updates():
+            while level:
+                next_level = []
+                new_tags = []
+                for parent_id, node in level:
+                    for name, child in node.children.items():
+                        tag_id = tag_ids.get((parent_id, name))
+                        if tag_id is None:
+                            # the tree fields are set by the rebuild below
+                            tag = Tag(name=name, parent_id=parent_id, lft=0, rght=0, tree_id=0, level=0)
+                            new_tags.append((tag, child))
+                        else:
+                            existing += 1
+                            next_level.append((tag_id, child))
+                Tag.objects.bulk_create([tag for tag, _ in new_tags], batch_size=batch_size)
+                created += len(new_tags)
+                next_level.extend((tag.pk, child) for tag, child in new_tags)
+                level = next_level
+
+        if created:
+            rebuild_tag_tree()
+            # bulk_create sends no post_save
+            bump_tag_tree_version()
+    return {'created': created, 'existing': existing}
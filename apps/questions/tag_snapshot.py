@@ -0,0 +1,123 @@
+"""
+Pre-encoded snapshot of the tag tree (TagListAPIView, TagTreeAPIView,
+TagPathsAPIView).
+
+The whole MPTT table is read with one query ordered by (tree_id, lft),
+which yields every parent before its children and siblings in tree order,
+so the flat list, the nested tree and every root-to-leaf path are built in
+a single pass. Each is encoded to JSON once and stored in the shared cache
+under the current tree version, together with its ETag; the version is
+bumped after any Tag save or delete commits (see apps.questions.signals).
+The last snapshot is also kept in process, so a request costs one cache
+read for the version.
+"""
+import hashlib
+import json
+import threading
+import time
+
+from django.db import transaction
+
+from apps.questions.models import Tag
+from utils.cache import CacheNamespace
+
+TAG_SNAPSHOT_TIMEOUT = 60 * 60 * 24 * 7
+TAG_TREE_VERSION_KEY = 'version'
+TAG_SNAPSHOT_KEY = '{version}:{kind}'
+
+TAG_LIST = 'list'
+TAG_TREE = 'tree'
+TAG_PATHS = 'paths'
+TAG_SNAPSHOT_KINDS = (TAG_LIST, TAG_TREE, TAG_PATHS)
+
+tag_cache = CacheNamespace('tag_tree', timeout=TAG_SNAPSHOT_TIMEOUT)
+
+_local = {'version': None, 'snapshot': None}
+_local_lock = threading.Lock()
+
+
+def build_tag_documents() -> dict:
+    """
+    Return the list, tree and paths documents of the current tag table.
+    """
+    rows = (
+        Tag.objects
+        .order_by('tree_id', 'lft')
+        .values_list('id', 'name', 'parent_id')
+    )
+    tags = []
+    nodes = {}
+    paths = {}
+    names = {}
+    roots = {}
+    for tag_id, name, parent_id in rows:
+        names[tag_id] = name
+        tags.append(
+            # TagSerializer leaves out the parent of a root
+            {'id': tag_id, 'name': name} if parent_id is None
+            else {'id': tag_id, 'name': name, 'parent': names[parent_id]}
+        )
+        node = {'id': tag_id, 'name': name, 'children': []}
+        nodes[tag_id] = node
+        step = {'id': tag_id, 'name': name}
+        if parent_id is None:
+            # roots sharing a name are shown once, like distinct('name')
+            roots.setdefault(name, node)
+            paths[tag_id] = [step]
+        else:
+            nodes[parent_id]['children'].append(node)
+            paths[tag_id] = paths[parent_id] + [step]
+
+    return {
+        TAG_LIST: tags,
+        TAG_TREE: [roots[name] for name in sorted(roots)],
+        TAG_PATHS: [paths[tag_id] for tag_id, node in nodes.items() if not node['children']],
+    }
+
+
+def encode_document(document) -> dict:
+    body = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return {'body': body, 'etag': '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()}
+
+
+def get_tag_tree_version():
+    version = tag_cache.get(TAG_TREE_VERSION_KEY)
+    if version is None:
+        tag_cache.add(TAG_TREE_VERSION_KEY, time.time_ns(), None)
+        version = tag_cache.get(TAG_TREE_VERSION_KEY)
+    return version
+
+
+def bump_tag_tree_version():
+    """
+    Invalidate every snapshot once the current transaction commits,
+    so no reader can build a new-version snapshot from uncommitted rows.
+    """
+    transaction.on_commit(
+        lambda: tag_cache.set(TAG_TREE_VERSION_KEY, time.time_ns(), None)
+    )
+
+
+def get_tag_snapshot(kind) -> dict:
+    """
+    Return {'body': <JSON bytes>, 'etag': <quoted ETag>} of one document kind.
+    """
+    version = get_tag_tree_version()
+    with _local_lock:
+        if _local['version'] == version:
+            return _local['snapshot'][kind]
+
+    keys = [TAG_SNAPSHOT_KEY.format(version=version, kind=name) for name in TAG_SNAPSHOT_KINDS]
+    found = tag_cache.get_many(keys)
+    if len(found) == len(keys):
+        snapshot = {name: found[key] for name, key in zip(TAG_SNAPSHOT_KINDS, keys)}
+    else:
+        documents = build_tag_documents()
+        snapshot = {name: encode_document(documents[name]) for name in TAG_SNAPSHOT_KINDS}
+        for name, key in zip(TAG_SNAPSHOT_KINDS, keys):
+            tag_cache.set(key, snapshot[name])
+
+    with _local_lock:
+        _local['version'] = version
+        _local['snapshot'] = snapshot
+    return snapshot[kind]
@@ -1,11 +1,24 @@
 from celery import shared_task
-from apps.questions.models import Question
+
+from apps.questions.hardness import recalculate_hardness_full, recalculate_hardness_incremental
+from apps.questions.question_stats import refresh_question_stats
+
+
+@shared_task
+def calculate_hardness(incremental=False):
+    """
+    Periodic task function: Updates the hardness of the questions, either
+    the whole bank or only the questions answered since the last run.
+    """
+    if incremental:
+        return recalculate_hardness_incremental()
+    return recalculate_hardness_full()
 
 
 @shared_task
-def calculate_hardness(cls):
+def calculate_question_stats():
     """
-    Periodic task function: Updates hardness for all questions in the database.
+    Periodic task function: Recomputes the item analysis (QuestionStats)
+    of every answered question.
     """
-    for question in Question.objects.all():
-        question.calculate_hardness()
+    return refresh_question_stats()
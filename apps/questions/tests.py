@@ -1,3 +1,75 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.accounts.models import User, RoleTextChoices
+from apps.accounts.otp import create_token_for_user
+from apps.questions.models import Question, Tag
+from utils.exceptions import CustomValidationError
+from utils.query_budget import assert_endpoint_within_budget
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+# setUp clears the cache, which must never be the shared Redis
+@override_settings(CACHES=LOCMEM_CACHES)
+class QuestionListQueryBudgetTests(TestCase):
+    """
+    The operator question list must stay within its QUERY_BUDGETS entry
+    however many tags its questions have.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = User.objects.create(
+            phone_number='09120000002', role=RoleTextChoices.OPERATOR, is_active=True
+        )
+        tags = [Tag.objects.create(name=f'tag {index}') for index in range(3)]
+        cls.questions = []
+        for index in range(5):
+            question = Question.objects.create(
+                text_body=f'question {index}',
+                choice_1='a', choice_2='b', choice_3='c', choice_4='d',
+                true_choice='choice_1',
+            )
+            question.tags.set(tags)
+            cls.questions.append(question)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Bearer ' + create_token_for_user(self.operator)['access']
+        )
+
+    def test_list_questions_budget(self):
+        response = assert_endpoint_within_budget(self.client, 'get', 'list-questions')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), len(self.questions))
+
+
+class QuestionContentHashTests(TestCase):
+    """
+    A question whose text and choices are already stored is rejected as a
+    validation error, not a database error.
+    """
+    content = dict(text_body='question', choice_1='a', choice_2='b', choice_3='c', choice_4='d')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.question = Question.objects.create(true_choice='choice_1', **cls.content)
+
+    def test_duplicate_question_is_rejected(self):
+        with self.assertRaises(CustomValidationError):
+            Question.objects.create(true_choice='choice_2', **self.content)
+        # the surrounding transaction is still usable
+        self.assertEqual(Question.objects.count(), 1)
+
+    def test_edit_into_a_duplicate_is_rejected(self):
+        other = Question.objects.create(true_choice='choice_1', **{**self.content, 'text_body': 'other'})
+        other.text_body = ' question '
+
+        with self.assertRaises(CustomValidationError):
+            other.save(update_fields=['text_body'])
+        other.refresh_from_db()
+        self.assertEqual(other.text_body, 'other')
+        self.assertEqual(other.content_hash, other.get_content_hash())
@@ -1,12 +1,16 @@
-from drf_spectacular.utils import OpenApiResponse, extend_schema
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from rest_framework import status
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from apps.questions.paginations import CustomPagination
+from django.db.models import Prefetch
 
+from apps.questions.filters import QuestionFilter
+from apps.questions.paginations import QuestionListPagination
+
+from utils.exceptions import CustomValidationError
 from utils.permissions import IsOperatorUserPermission
-from apps.questions.models import Question
+from apps.questions.models import Question, Tag
 from apps.questions.serializers import (
     QuestionSerializer,
     QuestionTagSerializer,
@@ -18,12 +22,59 @@ from apps.questions.serializers import (
 
 class QuestionListAPIView(APIView):
     permission_classes = [IsOperatorUserPermission]
-    pagination_class = CustomPagination
+    # ?pagination=cursor for keyset pages on (-id)
+    pagination_class = QuestionListPagination
 
     @extend_schema(
         summary="Getting list of all questions",
         tags=["Question"],
         request=OperatorQuestionSerializer,
+        parameters=[
+            OpenApiParameter(
+                name="tag",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                description="Only questions tagged with this tag or one of its descendants",
+            ),
+            OpenApiParameter(
+                name="hardness_min",
+                type=float,
+                location=OpenApiParameter.QUERY,
+                description="Minimum hardness (inclusive)",
+            ),
+            OpenApiParameter(
+                name="hardness_max",
+                type=float,
+                location=OpenApiParameter.QUERY,
+                description="Maximum hardness (inclusive)",
+            ),
+            OpenApiParameter(
+                name="is_active",
+                type=bool,
+                location=OpenApiParameter.QUERY,
+                description="Only active / inactive questions",
+            ),
+            OpenApiParameter(
+                name="pagination",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=["cursor"],
+                description="'cursor' for keyset pagination: follow the next / previous links instead of page numbers",
+            ),
+            OpenApiParameter(
+                name="cursor",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                description="Opaque cursor of the page (keyset pagination)",
+            ),
+            OpenApiParameter(
+                name="count",
+                type=str,
+                location=OpenApiParameter.QUERY,
+                enum=["exact", "approximate"],
+                description="Also return the total (keyset pagination); 'approximate' is estimated by PostgreSQL",
+            ),
+        ],
         responses={
             200: OpenApiResponse(
                 OperatorQuestionSerializer,
@@ -33,10 +84,19 @@ class QuestionListAPIView(APIView):
         },
     )
     def get(self, request, *args, **kwargs):
-        questions = Question.objects.all()
+        # one query for the page's tags, whatever the number of questions
+        questions = Question.objects.select_related('stats').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.only('id', 'name'))
+        )
+        filterset = QuestionFilter(request.query_params, queryset=questions)
+        if not filterset.is_valid():
+            raise CustomValidationError('; '.join(
+                f'{field}: {" ".join(errors)}' for field, errors in filterset.errors.items()
+            ))
+        questions = filterset.qs
 
         paginator = self.pagination_class()
-        paginated_queryset = paginator.paginate_queryset(questions, request)
+        paginated_queryset = paginator.paginate_queryset(questions, request, view=self)
         serializer = OperatorQuestionSerializer(paginated_queryset, many=True)
         return paginator.get_paginated_response(serializer.data)
 
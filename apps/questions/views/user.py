@@ -1,26 +1,40 @@
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
 from drf_spectacular.utils import OpenApiResponse, extend_schema
-from rest_framework import status
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from utils.permissions import (
     IsStudentPermission,
     IsOperatorUserPermission,
 )
-from apps.questions.models import Tag
 from apps.questions.serializers import (
     TagSerializer,
     TagTreeSerializer,
     TagPathSerializer
 )
+from apps.questions.tag_snapshot import (
+    TAG_LIST,
+    TAG_PATHS,
+    TAG_TREE,
+    get_tag_snapshot,
+)
 
 
-# TAG_CACHE_TIME = 1 if settings.DEBUG else 60 * 60 * 120
-TAG_CACHE_TIME = 60 * 60 * 120
+def tag_snapshot_response(request, kind):
+    """
+    Serve a pre-encoded tag snapshot, or 304 when the client's
+    If-None-Match already names its ETag.
+    """
+    snapshot = get_tag_snapshot(kind)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if snapshot['etag'] in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot['body'], content_type='application/json')
+    response['ETag'] = snapshot['etag']
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 
 class TagListAPIView(APIView):
@@ -41,11 +55,8 @@ class TagListAPIView(APIView):
             ),
         },
     )
-    @method_decorator(cache_page(TAG_CACHE_TIME))
     def get(self, request, *args, **kwargs):
-        tags = Tag.objects.all()
-        serializer = TagSerializer(tags, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return tag_snapshot_response(request, TAG_LIST)
 
 
 class TagTreeAPIView(APIView):
@@ -70,18 +81,8 @@ class TagTreeAPIView(APIView):
             ),
         },
     )
-    @method_decorator(cache_page(TAG_CACHE_TIME))
     def get(self, request):
-
-        roots = (
-            Tag.objects
-               .filter(parent=None)
-               .order_by('name')        # required by Postgres when using distinct('name')
-               .distinct('name')
-        )
-        print('len of roots', len(list(roots)))
-        serializer = TagTreeSerializer(roots, many=True)
-        return Response(serializer.data)
+        return tag_snapshot_response(request, TAG_TREE)
 
 
 class TagPathsAPIView(APIView):
@@ -106,11 +107,5 @@ class TagPathsAPIView(APIView):
             ),
         },
     )
-    @method_decorator(cache_page(TAG_CACHE_TIME))
     def get(self, request):
-        def build_path(tag):
-            return [{'id': ancestor.id, 'name': ancestor.name} for ancestor in tag.get_ancestors(include_self=True)]
-
-        leaf_tags = Tag.objects.filter(children=None)
-        paths = [build_path(tag) for tag in leaf_tags]
-        return Response(paths)
+        return tag_snapshot_response(request, TAG_PATHS)
@@ -25,4 +25,19 @@ app.conf.beat_schedule = {
         'task': 'apps.questions.tasks.calculate_hardness',
         'schedule': crontab(hour=4, minute=0),
     },
+    # questions answered since the previous run; the 4am run catches the rest
+    'hardness-incremental': {
+        'task': 'apps.questions.tasks.calculate_hardness',
+        'schedule': crontab(minute='*/10'),
+        'kwargs': {'incremental': True},
+    },
+    'question-stats': {
+        'task': 'apps.questions.tasks.calculate_question_stats',
+        'schedule': crontab(hour=4, minute=30),
+    },
+    # close time-limited journeys that expired without an explicit finish
+    'sweep-expired-journeys': {
+        'task': 'apps.journies.tasks.sweep_expired_journeys',
+        'schedule': crontab(minute='*'),
+    },
 }
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "utils.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -142,7 +143,7 @@ REST_FRAMEWORK = {
         # add others here (e.g. BrowsableAPIRenderer) if you want
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "utils.auth.StatelessJWTAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.AllowAny",),
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
@@ -183,6 +184,10 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "id",
     "USER_AUTHENTICATION_RULE": "rest_framework_simplejwt.authentication.default_user_authentication_rule",
 }
+# Access tokens kept verified per process by StatelessJWTAuthentication.
+JWT_VERIFIED_TOKEN_CACHE_SIZE = env.int("JWT_VERIFIED_TOKEN_CACHE_SIZE", default=10000)
+# Seconds a verified token is trusted before it is verified again.
+JWT_VERIFIED_TOKEN_CACHE_TTL = env.int("JWT_VERIFIED_TOKEN_CACHE_TTL", default=60)
 
 
 # Celery settings
@@ -206,6 +211,10 @@ CELERY_TASK_EAGER_PROPAGATES = True
 
 CELERY_TIMEZONE = "Asia/Tehran"
 CELERY_ENABLE_UTC = True
+# OTP messages have their own queue so long batch jobs never delay them.
+CELERY_TASK_ROUTES = {
+    "apps.accounts.tasks.send_sms_messages": {"queue": "sms"},
+}
 
 
 
@@ -226,6 +235,127 @@ CORS_ALLOW_ALL_METHODS = True
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_ALL_HEADERS = True
 
+# Cache shared by every worker and Celery process: "redis", or "locmem"
+# (in-process, for single-process runs). The test runner always uses locmem.
+CACHE_BACKEND = env("CACHE_BACKEND", default="redis")
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env("CACHE_REDIS_URL", default="redis://redis:6379/3"),
+            "KEY_PREFIX": env("CACHE_KEY_PREFIX", default="hoosh"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "hoosh",
+        }
+    }
+
+# keeps `manage.py test` off the shared Redis cache and leaderboard
+TEST_RUNNER = "utils.test_runner.LocalServicesTestRunner"
+
+# Group exams
+# Seconds before start_datetime at which the template snapshot is pre-warmed.
+GROUP_EXAM_PREWARM_SECONDS = env.int("GROUP_EXAM_PREWARM_SECONDS", default=120)
+# Journey starts admitted per second and template; the excess gets 429 with
+# Retry-After (0 disables admission control).
+GROUP_EXAM_ADMISSION_RATE = env.int("GROUP_EXAM_ADMISSION_RATE", default=100)
+# Engine computing group exam results: "sql" (set-based, server-side) or "polars".
+GROUP_EXAM_RESULT_ENGINE = env("GROUP_EXAM_RESULT_ENGINE", default="sql")
+# Journeys per batch for templates whose result_mode is "chunked".
+GROUP_EXAM_RESULT_CHUNK_SIZE = env.int("GROUP_EXAM_RESULT_CHUNK_SIZE", default=5000)
+# Persist standard-mode results from the live leaderboard when it matches the database.
+GROUP_EXAM_RESULT_RECONCILE = env.bool("GROUP_EXAM_RESULT_RECONCILE", default=True)
+
+# Adaptive question selection
+# {subject: [tag names]}: a subject's questions are those tagged with one of
+# the tags or their descendants; unmapped subjects draw from the whole bank.
+ADAPTIVE_SUBJECT_TAGS = env.json("ADAPTIVE_SUBJECT_TAGS", default={})
+
+# Question item analysis (QuestionStats)
+# Journey steps read from the server-side cursor per Polars chunk.
+QUESTION_STATS_CHUNK_SIZE = env.int("QUESTION_STATS_CHUNK_SIZE", default=50000)
+# Share of the journeys forming each of the upper and lower discrimination groups.
+QUESTION_STATS_GROUP_FRACTION = env.float("QUESTION_STATS_GROUP_FRACTION", default=0.27)
+
+# Live leaderboard of running group exams: "redis" (shared) or "local" (per process).
+LEADERBOARD_BACKEND = env("LEADERBOARD_BACKEND", default="redis")
+LEADERBOARD_REDIS_URL = env("LEADERBOARD_REDIS_URL", default="redis://redis:6379/2")
+LEADERBOARD_TTL_SECONDS = env.int("LEADERBOARD_TTL_SECONDS", default=60 * 60 * 24 * 2)
+LEADERBOARD_TOP_MAX = env.int("LEADERBOARD_TOP_MAX", default=100)
+
+# Request instrumentation (utils.instrumentation)
+# Log every request as one JSON line with its latency and query count.
+REQUEST_METRICS_LOG = env.bool("REQUEST_METRICS_LOG", default=False)
+# Bearer token of the /api/metrics/ scraper (empty: admins' access tokens only).
+METRICS_TOKEN = env("METRICS_TOKEN", default="")
+# Most SQL queries a request to each URL name may run; exceeding requests
+# are counted and logged, and utils.query_budget asserts them in tests.
+QUERY_BUDGETS = {
+    "journey-list": 4,
+    "journey-detail": 3,
+    "overall-report": 3,
+    "get-question": 4,
+    "submit-answer": 8,
+    "submit-answers": 6,
+    "next-question": 11,
+    "start-journey-general": 12,
+    "finish-journey": 5,
+    "group-exam-leaderboard": 4,
+    "tag-list": 2,
+    "tag-tree": 2,
+    "tag-paths": 2,
+    "list-questions": 5,
+    "dashboard_profile": 1,
+}
+
+# Throttling (utils.throttling)
+# (most hits, window in seconds) per key of each scope.
+THROTTLE_RULES = {
+    # OTP SMS per phone number; the OTP itself is only resent after 5 minutes
+    "otp-request-phone": (
+        env.int("OTP_REQUEST_PHONE_LIMIT", default=3),
+        env.int("OTP_REQUEST_PHONE_WINDOW", default=60 * 10),
+    ),
+    "otp-request-ip": (
+        env.int("OTP_REQUEST_IP_LIMIT", default=30),
+        env.int("OTP_REQUEST_IP_WINDOW", default=60 * 10),
+    ),
+    # guesses of a phone number's OTP within its lifetime
+    "otp-verify-phone": (
+        env.int("OTP_VERIFY_PHONE_LIMIT", default=5),
+        env.int("OTP_VERIFY_PHONE_WINDOW", default=60 * 5),
+    ),
+    "otp-verify-ip": (
+        env.int("OTP_VERIFY_IP_LIMIT", default=60),
+        env.int("OTP_VERIFY_IP_WINDOW", default=60 * 10),
+    ),
+}
+# Keys whose token buckets each process keeps in memory.
+THROTTLE_LOCAL_KEYS = env.int("THROTTLE_LOCAL_KEYS", default=10000)
+# META key of the client IP; nginx sets X-Real-IP to the peer address.
+THROTTLE_CLIENT_IP_HEADER = env("THROTTLE_CLIENT_IP_HEADER", default="HTTP_X_REAL_IP")
+
 # SMS
 SMS_API_KEY = env("SMS_API_KEY", None)
 OTP_TEMPLATE = env("OTP_TEMPLATE", None)
+# Dotted path of the apps.accounts.sms.SMSProvider sending the messages.
+SMS_PROVIDER = env("SMS_PROVIDER", default="apps.accounts.sms.KavenegarProvider")
+# Provider API root; point it at a fake server in tests.
+SMS_API_BASE_URL = env("SMS_API_BASE_URL", default="https://api.kavenegar.com")
+# Seconds to wait for the provider (connect / any other step of a request).
+SMS_HTTP_CONNECT_TIMEOUT = env.float("SMS_HTTP_CONNECT_TIMEOUT", default=3)
+SMS_HTTP_TIMEOUT = env.float("SMS_HTTP_TIMEOUT", default=10)
+# Connections kept open to the provider per worker process, and for how long.
+SMS_HTTP_MAX_CONNECTIONS = env.int("SMS_HTTP_MAX_CONNECTIONS", default=10)
+SMS_HTTP_KEEPALIVE_EXPIRY = env.float("SMS_HTTP_KEEPALIVE_EXPIRY", default=30)
+# Messages per send_sms_messages task.
+SMS_BATCH_SIZE = env.int("SMS_BATCH_SIZE", default=50)
+# Retries of temporarily failed messages, the first after about
+# SMS_RETRY_BACKOFF seconds, doubling up to SMS_RETRY_BACKOFF_MAX.
+SMS_MAX_RETRIES = env.int("SMS_MAX_RETRIES", default=5)
+SMS_RETRY_BACKOFF = env.float("SMS_RETRY_BACKOFF", default=2)
+SMS_RETRY_BACKOFF_MAX = env.float("SMS_RETRY_BACKOFF_MAX", default=60)
@@ -20,6 +20,8 @@ from drf_spectacular.views import SpectacularAPIView, \
     SpectacularRedocView, \
         SpectacularSwaggerView
 
+from utils.instrumentation import metrics_view
+
 
 urlpatterns = [
     # path('admin/', admin.site.urls),
@@ -39,6 +41,7 @@ urlpatterns = [
         SpectacularRedocView.as_view(url_name="schema"),
         name="redoc",
     ),
+    path("api/metrics/", metrics_view, name="metrics"),
     # Apps urls
     path(
         "api/",
@@ -1,5 +1,15 @@
+import threading
+import time
+from collections import OrderedDict
+
 import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
 from django.http import HttpRequest
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
 from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken, AccessToken, AuthUser, Token
 
@@ -49,3 +59,112 @@ class CustomRefreshToken(RefreshToken):
             payload = CustomRefreshToken.decode_token(token)
             role = payload.get('role')
             return role
+
+
+class VerifiedTokenCache:
+    """
+    Per-process LRU of access tokens whose signature and expiry were
+    already verified, so a client repeating its token skips the
+    verification. An entry lives `ttl` seconds at most and never past the
+    token's own expiry.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            entry = self._entries.get(raw_token)
+            if entry is None:
+                return None
+            token, valid_until = entry
+            if valid_until <= time.time():
+                del self._entries[raw_token]
+                return None
+            self._entries.move_to_end(raw_token)
+            return token
+
+    def set(self, raw_token, token):
+        valid_until = min(token.get('exp', 0), time.time() + self.ttl)
+        with self._lock:
+            self._entries[raw_token] = (token, valid_until)
+            self._entries.move_to_end(raw_token)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+verified_tokens = VerifiedTokenCache(
+    maxsize=settings.JWT_VERIFIED_TOKEN_CACHE_SIZE,
+    ttl=settings.JWT_VERIFIED_TOKEN_CACHE_TTL,
+)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the user query: the token is verified once
+    (then served from `verified_tokens`) and request.user is built from its
+    user_id / role / phone_number claims, as a User whose other fields are
+    deferred and loaded on first access. It can be used in queries and
+    foreign keys like a fetched user.
+
+    Like the role claim the permissions already relied on, the user's
+    state is the one at token issue time: a role change or deactivation
+    takes effect when the access token expires.
+
+    It is the default authentication class because every authenticated
+    endpoint only needs the claims:
+      - the role permissions (IsStudentPermission, IsOperatorUserPermission,
+        IsAdminUserPermission) read request.user.role;
+      - the journey, journey step, leaderboard and report endpoints filter
+        and create rows with user=request.user or request.user.pk;
+      - the dashboard profile is looked up by request.user.pk
+        (apps.accounts.profile_cache);
+      - logout stores request.user on the OutstandingToken and compares it
+        with the token's user, which compares primary keys.
+    Any other field (first_name, is_active, email, ...) costs one query per
+    access. A view that reads them should fetch the user once, or set
+    authentication_classes = [JWTAuthentication] to load it whole.
+    """
+    claim_fields = ('role', 'phone_number')
+
+    def get_validated_token(self, raw_token):
+        token = verified_tokens.get(raw_token)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            verified_tokens.set(raw_token, token)
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken("Token contained no recognizable user identification")
+        if any(validated_token.get(name) is None for name in self.claim_fields):
+            # issued before the claims were added
+            return super().get_user(validated_token)
+
+        user_model = get_user_model()
+        loaded = {name: validated_token[name] for name in self.claim_fields}
+        loaded[user_model._meta.get_field(api_settings.USER_ID_FIELD).attname] = user_id
+        # from_db expects the values in the model's field order
+        field_names = [
+            field.attname for field in user_model._meta.concrete_fields
+            if field.attname in loaded
+        ]
+        return user_model.from_db(
+            DEFAULT_DB_ALIAS,
+            field_names,
+            [loaded[name] for name in field_names],
+        )
+
+
+class StatelessJWTScheme(SimpleJWTScheme):
+    """Documents StatelessJWTAuthentication as the usual bearer JWT scheme."""
+    target_class = StatelessJWTAuthentication
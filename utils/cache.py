@@ -0,0 +1,155 @@
+"""
+Namespaced access to the shared cache.
+
+    otp_cache = CacheNamespace('otp', codec=JSON_CODEC)
+    otp_cache.set('09120000000', {'otp': 12345}, 300)
+
+Every key is stored as "<namespace>:<key>" in the default cache (Redis in
+production, LocMemCache when CACHE_BACKEND is "locmem"), so callers never
+collide and a whole feature can be recognised in the keyspace. A namespace
+with JSON_CODEC stores JSON text instead of pickled objects; it is meant for
+values that cross trust boundaries or outlive a deploy (OTPs).
+
+Hits and misses are counted per namespace and exposed with the request
+metrics at /api/metrics/.
+"""
+import json
+import threading
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+
+class _JsonCodec:
+    @staticmethod
+    def dumps(value):
+        return json.dumps(value, separators=(',', ':'))
+
+    @staticmethod
+    def loads(raw):
+        return json.loads(raw)
+
+
+JSON_CODEC = _JsonCodec()
+
+
+class CacheMetrics:
+    """
+    Thread-safe in-process hit/miss counters per namespace.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}  # namespace -> [hits, misses]
+
+    def record(self, namespace, hit):
+        with self._lock:
+            counts = self._counts.setdefault(namespace, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {namespace: tuple(counts) for namespace, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# HELP cache_requests_total Cache lookups, by namespace and result.',
+            '# TYPE cache_requests_total counter',
+        ]
+        for namespace, (hits, misses) in sorted(self.snapshot().items()):
+            lines.append(f'cache_requests_total{{namespace="{namespace}",result="hit"}} {hits}')
+            lines.append(f'cache_requests_total{{namespace="{namespace}",result="miss"}} {misses}')
+        return '\n'.join(lines) + '\n'
+
+
+cache_metrics = CacheMetrics()
+
+
+class CacheNamespace:
+    """
+    A prefix of the shared cache. `codec` (dumps/loads) optionally encodes
+    the values; None leaves them to the cache backend's serializer.
+    """
+
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, codec=None, alias='default'):
+        self.name = name
+        self.timeout = timeout
+        self.codec = codec
+        self.alias = alias
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def key(self, key) -> str:
+        return f'{self.name}:{key}'
+
+    def _encode(self, value):
+        return value if self.codec is None else self.codec.dumps(value)
+
+    def _decode(self, raw):
+        return raw if self.codec is None else self.codec.loads(raw)
+
+    def _timeout(self, timeout):
+        return self.timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key, default=None):
+        raw = self._cache.get(self.key(key))
+        cache_metrics.record(self.name, raw is not None)
+        if raw is None:
+            return default
+        return self._decode(raw)
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        found = self._cache.get_many([self.key(key) for key in keys])
+        result = {}
+        for key in keys:
+            raw = found.get(self.key(key))
+            cache_metrics.record(self.name, raw is not None)
+            if raw is not None:
+                result[key] = self._decode(raw)
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._cache.set(self.key(key), self._encode(value), self._timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT) -> bool:
+        """
+        Store the value only if the key is absent; True if it was stored.
+        Atomic across processes on the Redis backend.
+        """
+        return self._cache.add(self.key(key), self._encode(value), self._timeout(timeout))
+
+    def delete(self, key) -> bool:
+        return self._cache.delete(self.key(key))
+
+    def delete_many(self, keys):
+        self._cache.delete_many([self.key(key) for key in keys])
+
+    def incr(self, key, timeout=DEFAULT_TIMEOUT) -> int:
+        """
+        Atomically add 1 to a counter, creating it at 1 (with `timeout`)
+        when it does not exist. Returns the new value.
+        """
+        full_key = self.key(key)
+        try:
+            return self._cache.incr(full_key)
+        except ValueError:
+            if self._cache.add(full_key, 1, self._timeout(timeout)):
+                return 1
+            return self._cache.incr(full_key)
+
+    def decr(self, key):
+        """
+        Atomically subtract 1 from an existing counter; returns the new
+        value, or None when the counter has expired meanwhile.
+        """
+        try:
+            return self._cache.decr(self.key(key))
+        except ValueError:
+            return None
@@ -52,6 +52,18 @@ class CustomAuthenticationError(CustomAPIException):
     default_detail = "کاربر احراز هویت نشده است"
 
 
+class CustomThrottledError(CustomAPIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_code = "throttled"
+    default_detail = "تعداد درخواست‌ها بیش از حد مجاز است، لطفا کمی بعد دوباره تلاش کنید"
+
+
+class CustomServiceUnavailableError(CustomAPIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = "service_unavailable"
+    default_detail = "سرویس موقتا در دسترس نیست، لطفا کمی بعد دوباره تلاش کنید"
+
+
 def custom_exception_handler(exc, context):
     response = exception_handler(exc, context)
 
@@ -0,0 +1,235 @@
+"""
+Per-endpoint request instrumentation.
+
+RequestMetricsMiddleware measures, for every request, the total latency,
+the number of SQL queries and the time spent in the database, and
+aggregates them per URL name. The aggregates are exposed in the Prometheus
+text format by metrics_view and, when REQUEST_METRICS_LOG is on, every
+request is also logged as one structured (JSON) line.
+
+QUERY_BUDGETS maps URL names to the most queries a request may run; a
+request over its budget is counted and logged as a warning. The same
+budgets back the assertions in utils.query_budget.
+
+The endpoint also exposes the cache hit/miss counters of utils.cache and
+the throttle decisions of utils.throttling.
+The aggregates live in the worker process; each worker exposes its own.
+"""
+import hmac
+import json
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+from apps.accounts.models import RoleTextChoices
+
+from utils.cache import cache_metrics
+from utils.logger import CustomLogger
+from utils.throttling import throttle_metrics
+
+logger = CustomLogger(__name__).get_logger()
+
+UNRESOLVED_VIEW = 'unresolved'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def get_query_budget(url_name):
+    return settings.QUERY_BUDGETS.get(url_name)
+
+
+class _QueryRecorder:
+    """
+    connection.execute_wrapper hook counting the queries of one request
+    and the time they take.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class _ViewStats:
+    def __init__(self):
+        self.requests = {}  # (method, status) -> count
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.max_queries = 0
+        self.over_budget = 0
+
+
+class RequestMetrics:
+    """
+    Thread-safe in-process aggregates of the observed requests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, method, status, duration, queries, db_seconds, over_budget):
+        with self._lock:
+            stats = self._views.setdefault(view, _ViewStats())
+            key = (method, status)
+            stats.requests[key] = stats.requests.get(key, 0) + 1
+            bucket = bisect_left(LATENCY_BUCKETS, duration)
+            if bucket < len(LATENCY_BUCKETS):
+                stats.latency_buckets[bucket] += 1
+            stats.latency_sum += duration
+            stats.latency_count += 1
+            stats.queries += queries
+            stats.db_seconds += db_seconds
+            stats.max_queries = max(stats.max_queries, queries)
+            stats.over_budget += over_budget
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# HELP http_requests_total Requests handled, by URL name, method and status.',
+            '# TYPE http_requests_total counter',
+        ]
+        with self._lock:
+            views = sorted(self._views.items())
+            for view, stats in views:
+                for (method, status), count in sorted(stats.requests.items()):
+                    lines.append(
+                        f'http_requests_total{{view="{view}",method="{method}",status="{status}"}} {count}'
+                    )
+
+            lines += [
+                '# HELP http_request_duration_seconds Request latency, by URL name.',
+                '# TYPE http_request_duration_seconds histogram',
+            ]
+            for view, stats in views:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.latency_buckets):
+                    cumulative += count
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'http_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats.latency_count}'
+                )
+                lines.append(f'http_request_duration_seconds_sum{{view="{view}"}} {stats.latency_sum:.6f}')
+                lines.append(f'http_request_duration_seconds_count{{view="{view}"}} {stats.latency_count}')
+
+            for name, kind, help_text, value in (
+                ('db_queries_total', 'counter', 'SQL queries run', lambda s: s.queries),
+                ('db_query_duration_seconds_total', 'counter', 'Time spent in SQL queries',
+                 lambda s: f'{s.db_seconds:.6f}'),
+                ('db_queries_per_request_max', 'gauge', 'Most SQL queries run by one request',
+                 lambda s: s.max_queries),
+                ('http_request_query_budget_exceeded_total', 'counter',
+                 'Requests that ran more queries than their QUERY_BUDGETS entry',
+                 lambda s: s.over_budget),
+            ):
+                lines.append(f'# HELP {name} {help_text}, by URL name.')
+                lines.append(f'# TYPE {name} {kind}')
+                for view, stats in views:
+                    lines.append(f'{name}{{view="{view}"}} {value(stats)}')
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, query count and DB time of every request per URL name.
+    Should be the first middleware so the whole stack is measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with connections['default'].execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match and match.url_name else UNRESOLVED_VIEW
+        budget = get_query_budget(view)
+        over_budget = budget is not None and recorder.count > budget
+
+        request_metrics.observe(
+            view,
+            request.method,
+            response.status_code,
+            duration,
+            recorder.count,
+            recorder.duration,
+            over_budget,
+        )
+        if over_budget:
+            logger.warning(
+                f'{view} ran {recorder.count} queries, over its budget of {budget}'
+            )
+        if settings.REQUEST_METRICS_LOG:
+            logger.info(json.dumps({
+                'event': 'request',
+                'view': view,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'db_queries': recorder.count,
+                'db_ms': round(recorder.duration * 1000, 2),
+            }))
+        return response
+
+
+def _is_admin_request(request):
+    """
+    Authenticate the request's bearer JWT like the API views do and tell
+    whether it belongs to an admin.
+    """
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authentication_class().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        if result is not None:
+            return result[0].role == RoleTextChoices.ADMIN
+    return False
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. The scraper sends METRICS_TOKEN as
+    "Authorization: Bearer <token>"; otherwise the request must carry an
+    admin's access token. With no METRICS_TOKEN only admins can read it.
+    """
+    token = settings.METRICS_TOKEN
+    authorized = bool(token) and hmac.compare_digest(
+        request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()
+    )
+    if not authorized and not _is_admin_request(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        request_metrics.render_prometheus()
+        + cache_metrics.render_prometheus()
+        + throttle_metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
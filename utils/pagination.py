@@ -0,0 +1,273 @@
+"""
+Keyset (cursor) pagination.
+
+OFFSET/LIMIT reads and throws away every row before the page, and the page
+number pagination also counts the whole result, so both grow linearly with
+the depth of the page. KeysetPagination instead continues from the sort key
+of the last row shown:
+
+    WHERE id < <last id> ORDER BY id DESC LIMIT <page size + 1>
+
+which the index answers directly on any page. The position travels in an
+opaque cursor (?cursor=...). No total is computed unless asked for with
+?count=exact or ?count=approximate; the latter is PostgreSQL's estimate
+(pg_class.reltuples for an unfiltered table, the planner's row estimate
+otherwise).
+
+OptionalKeysetPagination keeps page numbers by default and switches to
+keysets with ?pagination=cursor, so existing clients are unaffected.
+"""
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+COUNT_EXACT = 'exact'
+COUNT_APPROXIMATE = 'approximate'
+PAGINATION_CURSOR = 'cursor'
+
+
+class CursorEncoder(json.JSONEncoder):
+    """
+    Keeps the microseconds that DjangoJSONEncoder drops, so a cursor
+    points at the exact row.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def estimate_count(queryset) -> int:
+    """
+    PostgreSQL's estimate of queryset.count(), without scanning the rows.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+            # -1 until the table is first analyzed
+            if row and row[0] >= 0:
+                return row[0]
+        sql, params = queryset.order_by().query.sql_with_params()
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over `ordering`, whose last field must be unique.
+    """
+    ordering = ('-id',)
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def _fields(self):
+        return [(name.lstrip('-'), name.startswith('-')) for name in self.ordering]
+
+    def encode_cursor(self, row, backwards):
+        position = [getattr(row, name) for name, _ in self._fields()]
+        payload = json.dumps([position, int(backwards)], cls=CursorEncoder)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, model):
+        """
+        Return (position, backwards) of the request's cursor, (None, False)
+        on the first page.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4))
+            position, backwards = json.loads(payload)
+            fields = self._fields()
+            if len(position) != len(fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(fields, position)
+            ]
+        except (binascii.Error, ValueError, TypeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(backwards)
+
+    def _after(self, position, backwards):
+        """
+        Rows strictly after `position` in the pagination order (before it
+        when going backwards).
+        """
+        condition = Q(pk__in=[])
+        equal = {}
+        for (name, descending), value in zip(self._fields(), position):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position, backwards = self.decode_cursor(request, queryset.model)
+
+        self.count = None
+        count_mode = request.query_params.get(self.count_query_param)
+        if count_mode == COUNT_EXACT:
+            self.count = queryset.count()
+        elif count_mode == COUNT_APPROXIMATE:
+            self.count = estimate_count(queryset)
+
+        # going backwards reads the previous rows in reverse order
+        ordering = [
+            f'-{name}' if descending != backwards else name
+            for name, descending in self._fields()
+        ]
+        if position is not None:
+            queryset = queryset.filter(self._after(position, backwards))
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+
+        # the page the cursor came from is on the other side
+        if backwards:
+            has_next, has_previous = position is not None, has_more
+        else:
+            has_next, has_previous = has_more, position is not None
+        self.next_cursor = self.encode_cursor(rows[-1], False) if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(rows[0], True) if rows and has_previous else None
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        body = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            body = {'count': self.count, **body}
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque cursor of the page, taken from the next / previous links',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Number of results per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Also return the total: "exact" or "approximate" (estimated by PostgreSQL)',
+                'schema': {'type': 'string', 'enum': [COUNT_EXACT, COUNT_APPROXIMATE]},
+            },
+        ]
+
+
+class OptionalKeysetPagination(BasePagination):
+    """
+    Page numbers by default, keysets with ?pagination=cursor.
+    """
+    page_number_pagination_class = PageNumberPagination
+    keyset_pagination_class = KeysetPagination
+    pagination_query_param = 'pagination'
+
+    def uses_keyset(self, request):
+        return request.query_params.get(self.pagination_query_param) == PAGINATION_CURSOR
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.uses_keyset(request):
+            self.paginator = self.keyset_pagination_class()
+        else:
+            self.paginator = self.page_number_pagination_class()
+        return self.paginator.paginate_queryset(queryset, request, view=view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number_pagination_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        keyset = self.keyset_pagination_class()
+        return [
+            {
+                'name': self.pagination_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'"{PAGINATION_CURSOR}" for keyset pagination (cursor, count parameters)',
+                'schema': {'type': 'string', 'enum': [PAGINATION_CURSOR]},
+            },
+            *self.page_number_pagination_class().get_schema_operation_parameters(view),
+            *(
+                parameter for parameter in keyset.get_schema_operation_parameters(view)
+                if parameter['name'] != keyset.page_size_query_param
+            ),
+        ]
@@ -0,0 +1,56 @@
+"""
+Query-budget assertions for tests.
+
+    from utils.query_budget import assert_endpoint_within_budget
+
+    def test_journey_list_budget(self):
+        assert_endpoint_within_budget(self.client, 'get', 'journey-list')
+
+The budget of an endpoint defaults to its settings.QUERY_BUDGETS entry
+(the same table RequestMetricsMiddleware reports against), so an N+1
+regression fails the suite instead of surfacing in production.
+"""
+from contextlib import contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from utils.instrumentation import get_query_budget
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(budget, using='default', label='block'):
+    """
+    Fail if the enclosed block runs more than `budget` queries.
+    """
+    with CaptureQueriesContext(connections[using]) as captured:
+        yield captured
+    if len(captured) > budget:
+        queries = '\n'.join(
+            f'{index}. {query["sql"]}'
+            for index, query in enumerate(captured.captured_queries, start=1)
+        )
+        raise QueryBudgetExceeded(
+            f'{label} ran {len(captured)} queries, over its budget of {budget}:\n{queries}'
+        )
+
+
+def assert_endpoint_within_budget(client, method, url_name, budget=None, args=None, kwargs=None, **request_kwargs):
+    """
+    Call the endpoint through the test client and fail if it runs more
+    queries than `budget` (default: settings.QUERY_BUDGETS[url_name]).
+    Returns the response.
+    """
+    if budget is None:
+        budget = get_query_budget(url_name)
+        if budget is None:
+            raise ValueError(f'no QUERY_BUDGETS entry for {url_name!r}')
+    url = reverse(url_name, args=args, kwargs=kwargs)
+    with assert_max_queries(budget, label=url_name):
+        response = getattr(client, method.lower())(url, **request_kwargs)
+    return response
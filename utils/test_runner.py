@@ -0,0 +1,33 @@
+"""
+Test runner keeping the test suite off the shared services.
+
+The default cache and the live leaderboard are Redis databases shared with
+the running application (OTPs, throttle counters, standings), and a test
+clearing the cache would flush them. Tests run against an in-process
+LocMemCache and the local leaderboard instead, whatever CACHE_BACKEND and
+LEADERBOARD_BACKEND say.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'hoosh-tests',
+    }
+}
+
+
+class LocalServicesTestRunner(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._local_services = override_settings(
+            CACHES=TEST_CACHES,
+            LEADERBOARD_BACKEND='local',
+        )
+        self._local_services.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._local_services.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,238 @@
+"""
+Cache-backed request throttling.
+
+A rule allows `limit` hits per `window` seconds and key (a phone number, a
+client IP, ...). The shared count is a sliding window approximated from two
+fixed windows, each an atomic cache counter:
+
+    estimate = previous window * (share of it still inside the window)
+             + current window
+
+so every process enforces the same limit with one incr and one get per hit.
+
+Hot keys never reach the cache: every process also keeps a small LRU of
+token buckets (refilled at limit / window per second) that rejects a key
+bursting beyond the limit locally, and remembers the keys the shared
+counter rejected until their window frees up again, so a bot hammering one
+key costs a dictionary lookup.
+
+Allowed and rejected hits are counted per scope and exposed with the request
+metrics at /api/metrics/.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.throttling import BaseThrottle
+
+from utils.cache import CacheNamespace
+from utils.exceptions import CustomThrottledError
+
+THROTTLE_CACHE_KEY = '{scope}:{ident}:{window}'
+ALLOWED = 'allowed'
+REJECTED_LOCAL = 'rejected_local'
+REJECTED_SHARED = 'rejected_shared'
+
+
+class ThrottleMetrics:
+    """
+    Thread-safe in-process counters of throttle decisions per scope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}  # (scope, result) -> hits
+
+    def record(self, scope, result):
+        with self._lock:
+            self._counts[(scope, result)] = self._counts.get((scope, result), 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+    def render_prometheus(self) -> str:
+        lines = [
+            '# HELP throttle_requests_total Throttled requests, by scope and decision.',
+            '# TYPE throttle_requests_total counter',
+        ]
+        for (scope, result), hits in sorted(self.snapshot().items()):
+            lines.append(f'throttle_requests_total{{scope="{scope}",result="{result}"}} {hits}')
+        return '\n'.join(lines) + '\n'
+
+
+throttle_metrics = ThrottleMetrics()
+throttle_cache = CacheNamespace('throttle')
+
+
+class LocalBuckets:
+    """
+    Per-process token buckets of the most recently seen keys, with the time
+    until which a key is blocked.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at, blocked_until]
+
+    def take(self, key, limit, window, now) -> tuple:
+        """
+        Take a token for `key`. Returns (wait, blocked): wait is 0 on
+        success, otherwise the seconds until the key may be tried again;
+        blocked tells that the wait comes from block() rather than from
+        the bucket's refill.
+        """
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit), now, 0.0]
+                if len(self._buckets) > self.maxsize:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            tokens, updated_at, blocked_until = bucket
+            if blocked_until > now:
+                return blocked_until - now, True
+            tokens = min(float(limit), tokens + (now - updated_at) * limit / window)
+            if tokens < 1:
+                bucket[0], bucket[1] = tokens, now
+                return (1 - tokens) * window / limit, False
+            bucket[0], bucket[1] = tokens - 1, now
+            return 0.0, False
+
+    def give_back(self, key, limit):
+        """Return the token of a hit that is refunded."""
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[0] = min(float(limit), bucket[0] + 1)
+
+    def block(self, key, until):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket[2] = max(bucket[2], until)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+local_buckets = LocalBuckets(settings.THROTTLE_LOCAL_KEYS)
+
+
+def _window_keys(scope, ident, window, now) -> tuple:
+    current_window, elapsed = divmod(now, window)
+    current_key = THROTTLE_CACHE_KEY.format(scope=scope, ident=ident, window=int(current_window))
+    previous_key = THROTTLE_CACHE_KEY.format(scope=scope, ident=ident, window=int(current_window) - 1)
+    return current_key, previous_key, elapsed
+
+
+def _shared_wait(previous, current, elapsed, limit, window) -> float:
+    """
+    Seconds until the sliding-window estimate leaves room for one more hit,
+    if no other hit comes in.
+    """
+    room = limit - 1
+    if current <= room:
+        if previous * (1 - elapsed / window) <= room - current:
+            return 0.0
+        # the previous window's share decays within the current window
+        return window * (1 - (room - current) / previous) - elapsed
+    # the current window becomes the previous one and decays in turn
+    return window - elapsed + window * (1 - room / current)
+
+
+def hit(scope, ident, limit, window, now=None) -> float:
+    """
+    Count a hit of `ident` against the rule of `scope`; returns 0 when it is
+    allowed, otherwise the seconds to wait before trying again.
+    """
+    now = time.time() if now is None else now
+    key = f'{scope}:{ident}'
+    wait, blocked = local_buckets.take(key, limit, window, now)
+    if wait:
+        if not blocked:
+            # the local bucket refills faster than the shared window frees
+            # up; report (and remember) whichever takes longer
+            current_key, previous_key, elapsed = _window_keys(scope, ident, window, now)
+            counts = throttle_cache.get_many([current_key, previous_key])
+            wait = max(wait, _shared_wait(
+                counts.get(previous_key) or 0, counts.get(current_key) or 0, elapsed, limit, window
+            ))
+            local_buckets.block(key, now + wait)
+        throttle_metrics.record(scope, REJECTED_LOCAL)
+        return wait
+
+    current_key, previous_key, elapsed = _window_keys(scope, ident, window, now)
+    current = throttle_cache.incr(current_key, 2 * window)
+    previous = throttle_cache.get(previous_key) or 0
+    weight = 1 - elapsed / window
+    if previous * weight + current <= limit:
+        throttle_metrics.record(scope, ALLOWED)
+        return 0.0
+
+    # a rejected hit is not counted, so a client retrying too fast is not
+    # locked out beyond the window
+    throttle_cache.decr(current_key)
+    wait = max(_shared_wait(previous, current - 1, elapsed, limit, window), 1.0)
+    local_buckets.block(key, now + wait)
+    throttle_metrics.record(scope, REJECTED_SHARED)
+    return wait
+
+
+def refund(scope, ident, limit, window, now):
+    """
+    Take back a hit allowed at `now`, e.g. when a later throttle of the
+    same request rejected it.
+    """
+    current_key, _, _ = _window_keys(scope, ident, window, now)
+    throttle_cache.decr(current_key)
+    local_buckets.give_back(f'{scope}:{ident}', limit)
+
+
+def get_client_ip(request):
+    return request.META.get(settings.THROTTLE_CLIENT_IP_HEADER) or request.META.get('REMOTE_ADDR')
+
+
+class CacheRateThrottle(BaseThrottle):
+    """
+    DRF throttle enforcing settings.THROTTLE_RULES[scope] on the key returned
+    by get_ident(). Rejections raise CustomThrottledError (429 with
+    Retry-After) straight away, before the view runs, and refund the hits
+    the request's earlier throttles counted, so a request rejected by its
+    phone number rule does not use up its IP's quota as well.
+    """
+    scope = None
+    message = CustomThrottledError.default_detail
+
+    def get_ident(self, request):
+        """The key of the request, None to leave it unthrottled."""
+        return get_client_ip(request)
+
+    def allow_request(self, request, view):
+        ident = self.get_ident(request)
+        if ident is None:
+            return True
+        limit, window = settings.THROTTLE_RULES[self.scope]
+        now = time.time()
+        wait = hit(self.scope, ident, limit, window, now)
+        counted = getattr(request, '_throttle_hits', None)
+        if counted is None:
+            counted = request._throttle_hits = []
+        if wait:
+            for counted_hit in counted:
+                refund(*counted_hit)
+            counted.clear()
+            error = CustomThrottledError(self.message, code=status.HTTP_429_TOO_MANY_REQUESTS)
+            error.wait = wait
+            raise error
+        counted.append((self.scope, ident, limit, window, now))
+        return True